@@ -0,0 +1,316 @@
+"""
+Admission control: per-path concurrency limits and per-user rate limits.
+
+AdmissionMiddleware sits in front of the routes and decides, before any
+work is queued on the executor, whether a request is served:
+
+- Rate limiting: on rate-limited paths, each user_id (read from the JSON
+  body) has a token bucket; a request without a token gets a 429.
+- Concurrency limiting: each limited path serves at most `limit`
+  requests at once. Further requests wait in a bounded FIFO queue; a
+  request that finds the queue full, or waits longer than max_wait, gets
+  a 503. Shedding early keeps latency bounded for the requests that are
+  admitted instead of letting every request queue up in the threadpool.
+
+Both answers carry Retry-After. All state is per process, in memory, and
+every operation is O(1). The middleware runs on the event loop, so it
+needs no locks.
+"""
+
+import asyncio
+import json
+import math
+import time
+import weakref
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from app.core.instrumentation import labelled_metric_lines, metric_lines, register_collector
+from app.settings import get_settings
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see the "fast" extra
+    orjson = None
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` holders at once, with a bounded FIFO queue of waiters.
+
+    A released slot is handed straight to the oldest waiter that is still
+    waiting. Waiters that gave up are skipped lazily.
+    """
+
+    def __init__(self, limit: int, queue_size: int, max_wait: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self.queued = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting up to max_wait; False if the request should be shed."""
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if self.queued >= self.queue_size:
+            self.shed_queue_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            async with asyncio.timeout(self.max_wait):
+                await waiter
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot arrived just as this request gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self.queued -= 1
+            if isinstance(exc, TimeoutError):
+                self.shed_deadline += 1
+                return False
+            raise
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        """Give a slot back, handing it to the next waiter if there is one."""
+        waiters = self._waiters
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                self.queued -= 1
+                waiter.set_result(None)  # The slot moves to the waiter
+                return
+        self.active -= 1
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds to suggest in Retry-After when shedding."""
+        return max(1, math.ceil(self.max_wait))
+
+
+class TokenBuckets:
+    """
+    Token bucket per key, refilled lazily on access.
+
+    Buckets live in an LRU of at most `max_keys`; a key that was evicted
+    starts again with a full bucket.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_keys: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> [tokens, last refill time]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.limited = 0
+
+    def take(self, key: str) -> float:
+        """
+        Take a token for key.
+
+        Returns:
+            0.0 if a token was taken, else the seconds until one is available
+        """
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        self.limited += 1
+        return (1.0 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def _user_id(body: bytes) -> Optional[str]:
+    try:
+        data = orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError:
+        return None
+    user_id = data.get("user_id") if isinstance(data, dict) else None
+    return user_id if isinstance(user_id, str) else None
+
+
+async def _read_body(receive) -> Tuple[bytes, List[dict]]:
+    messages = []
+    chunks = []
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks), messages
+
+
+async def _reject(send, status: int, detail: str, retry_after: int) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying ConcurrencyLimiter and TokenBuckets per path."""
+
+    def __init__(
+        self,
+        app,
+        limits: Iterable[Tuple[str, int]] = (),
+        queue_size: int = 100,
+        max_wait: float = 0.5,
+        rate_limit: float = 0.0,
+        rate_limit_burst: int = 10,
+        rate_limit_paths: Iterable[str] = (),
+        rate_limit_users: int = 100_000,
+    ):
+        self.app = app
+        self.limiters: Dict[str, ConcurrencyLimiter] = {
+            path: ConcurrencyLimiter(limit, queue_size, max_wait) for path, limit in limits
+        }
+        self.buckets = (
+            TokenBuckets(rate_limit, rate_limit_burst, rate_limit_users) if rate_limit > 0 else None
+        )
+        self.rate_limit_paths = frozenset(rate_limit_paths)
+        _middlewares.add(self)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+
+        if self.buckets is not None and path in self.rate_limit_paths:
+            body, messages = await _read_body(receive)
+            user_id = _user_id(body)
+            if user_id is not None:
+                wait = self.buckets.take(user_id)
+                if wait:
+                    await _reject(send, 429, "Rate limit exceeded", math.ceil(wait))
+                    return
+            receive = _replay(messages, receive)
+
+        limiter = self.limiters.get(path)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        if not await limiter.acquire():
+            await _reject(send, 503, "Server overloaded, retry later", limiter.retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+def _replay(messages: List[dict], receive):
+    """A receive callable returning the already-read messages first."""
+    pending = deque(messages)
+
+    async def replay():
+        if pending:
+            return pending.popleft()
+        return await receive()
+
+    return replay
+
+
+def admission_middleware_options() -> Optional[dict]:
+    """AdmissionMiddleware keyword arguments from settings, or None if it is not needed."""
+    settings = get_settings()
+    if not settings.admission_limits and not settings.rate_limit:
+        return None
+    return {
+        "limits": settings.admission_limits,
+        "queue_size": settings.admission_queue_size,
+        "max_wait": settings.admission_max_wait,
+        "rate_limit": settings.rate_limit,
+        "rate_limit_burst": settings.rate_limit_burst,
+        "rate_limit_paths": settings.rate_limit_paths,
+        "rate_limit_users": settings.rate_limit_users,
+    }
+
+
+# Live middleware instances (normally one), for /metrics
+_middlewares: "weakref.WeakSet[AdmissionMiddleware]" = weakref.WeakSet()
+
+
+def _admission_metrics() -> List[str]:
+    middlewares = list(_middlewares)
+    limiters = [(path, limiter) for middleware in middlewares for path, limiter in middleware.limiters.items()]
+    buckets = [middleware.buckets for middleware in middlewares if middleware.buckets is not None]
+    if not limiters and not buckets:
+        return []
+    return [
+        *labelled_metric_lines(
+            "conto_admission_in_flight", "Requests being handled per limited path.", "gauge",
+            (({"path": path}, limiter.active) for path, limiter in limiters),
+        ),
+        *labelled_metric_lines(
+            "conto_admission_queue_depth", "Requests waiting for a slot per limited path.", "gauge",
+            (({"path": path}, limiter.queued) for path, limiter in limiters),
+        ),
+        *labelled_metric_lines(
+            "conto_admission_admitted_total", "Requests admitted per limited path.", "counter",
+            (({"path": path}, limiter.admitted) for path, limiter in limiters),
+        ),
+        *labelled_metric_lines(
+            "conto_admission_shed_total", "Requests rejected with 503 per limited path.", "counter",
+            [
+                sample
+                for path, limiter in limiters
+                for sample in (
+                    ({"path": path, "reason": "queue_full"}, limiter.shed_queue_full),
+                    ({"path": path, "reason": "deadline"}, limiter.shed_deadline),
+                )
+            ],
+        ),
+        *metric_lines(
+            "conto_rate_limited_total", "Requests rejected with 429 by the per-user rate limit.",
+            "counter", sum(bucket.limited for bucket in buckets),
+        ),
+        *metric_lines(
+            "conto_rate_limit_users", "Users with a tracked token bucket.",
+            "gauge", sum(len(bucket) for bucket in buckets),
+        ),
+    ]
+
+
+register_collector(_admission_metrics)
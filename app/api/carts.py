@@ -0,0 +1,128 @@
+"""Cart session routes (/carts)."""
+
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import BaseModel, Field
+
+from app.api.routes import OrderItem, QuoteResponse
+from app.core.instrumentation import timed_handler
+from app.services.carts import CartSession, DuplicateLineError, get_cart_store
+
+router = APIRouter(prefix="/carts", tags=["carts"])
+
+
+class CartCreateRequest(BaseModel):
+    user_id: str
+    tier: Literal["free", "pro", "enterprise"]
+    region: Literal["EU", "US", "APAC"]
+    items: List[OrderItem] = []
+    coupon: Optional[str] = None
+
+
+class CartLine(BaseModel):
+    qty: int = Field(gt=0)
+    unit_price: float = Field(gt=0)
+
+
+class CartResponse(BaseModel):
+    cart_id: str
+    line_count: int
+    quote: QuoteResponse
+
+
+class CartDetailResponse(CartResponse):
+    tier: str
+    region: str
+    coupon: Optional[str]
+    items: List[OrderItem]
+
+
+def _get_session(cart_id: str) -> CartSession:
+    session = get_cart_store().get(cart_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Cart not found")
+    return session
+
+
+def _cart_response(session: CartSession) -> CartResponse:
+    return CartResponse(
+        cart_id=session.cart_id,
+        line_count=len(session.lines),
+        quote=QuoteResponse(**session.quote()),
+    )
+
+
+# Updates are O(1), so these handlers run on the event loop rather than
+# paying for an executor hop.
+
+
+@router.post("", response_model=CartResponse, status_code=201)
+@timed_handler
+async def create_cart(request: CartCreateRequest) -> CartResponse:
+    """Start a cart session, optionally with initial items, and quote it."""
+    try:
+        session = get_cart_store().create(
+            user_id=request.user_id,
+            tier=request.tier,
+            region=request.region,
+            coupon=request.coupon,
+            items=((item.sku, item.qty, item.unit_price) for item in request.items),
+        )
+    except DuplicateLineError as exc:
+        raise HTTPException(status_code=400, detail=f"Duplicate SKU: {exc}")
+    return _cart_response(session)
+
+
+@router.get("/{cart_id}", response_model=CartDetailResponse)
+@timed_handler
+async def get_cart(cart_id: str) -> CartDetailResponse:
+    """Return a cart's settings, lines and current quote."""
+    session = _get_session(cart_id)
+    return CartDetailResponse(
+        **_cart_response(session).model_dump(),
+        tier=session.tier,
+        region=session.region,
+        coupon=session.coupon,
+        items=[
+            OrderItem(sku=sku, qty=qty, unit_price=unit_price)
+            for sku, (qty, unit_price) in session.lines.items()
+        ],
+    )
+
+
+@router.get("/{cart_id}/quote", response_model=QuoteResponse)
+@timed_handler
+async def get_cart_quote(cart_id: str) -> QuoteResponse:
+    """Quote a cart."""
+    return QuoteResponse(**_get_session(cart_id).quote())
+
+
+@router.put("/{cart_id}/lines/{sku}", response_model=CartResponse)
+@timed_handler
+async def put_cart_line(cart_id: str, sku: str, line: CartLine) -> CartResponse:
+    """Add a line or change its qty/price, and return the new quote."""
+    session = _get_session(cart_id)
+    session.set_line(sku, line.qty, line.unit_price)
+    return _cart_response(session)
+
+
+@router.delete("/{cart_id}/lines/{sku}", response_model=CartResponse)
+@timed_handler
+async def delete_cart_line(cart_id: str, sku: str) -> CartResponse:
+    """Remove a line and return the new quote."""
+    session = _get_session(cart_id)
+    try:
+        session.remove_line(sku)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Line not found")
+    return _cart_response(session)
+
+
+@router.delete("/{cart_id}", status_code=204)
+@timed_handler
+async def delete_cart(cart_id: str) -> Response:
+    """End a cart session."""
+    if not get_cart_store().delete(cart_id):
+        raise HTTPException(status_code=404, detail="Cart not found")
+    return Response(status_code=204)
@@ -0,0 +1,71 @@
+"""
+Executor for CPU-bound work offloaded from async route handlers.
+
+The kind and size come from settings (CONTO_EXECUTOR,
+CONTO_EXECUTOR_WORKERS). The executor is created on first use, so worker
+processes that fork after import each get their own.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.instrumentation import profile_prefix, run_profiled
+from app.settings import get_settings
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Optional[Executor]:
+    """Return the configured executor, or None when work runs inline."""
+    global _executor
+    settings = get_settings()
+    if _executor is None and settings.executor_kind != "inline":
+        max_workers = settings.executor_workers or None
+        if settings.executor_kind == "process":
+            # Imported here: multiprocessing is slow to import and rarely used
+            from concurrent.futures import ProcessPoolExecutor
+
+            _executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="conto-compute"
+            )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Shut down the executor, if one was started."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def run_in_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run func(*args, **kwargs) on the configured executor and await the result.
+
+    Thread pool calls run in a copy of the caller's context, so context
+    variables set for the request stay visible. Process pool calls need
+    picklable arguments and see no request context. Calls made for a
+    request sampled for profiling run under cProfile.
+    """
+    prefix = profile_prefix()
+    if prefix is not None:
+        args = (prefix, func, *args)
+        func = run_profiled
+
+    executor = get_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+
+    if not isinstance(executor, ThreadPoolExecutor):
+        call = functools.partial(func, *args, **kwargs)
+    else:
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
@@ -0,0 +1,47 @@
+"""Custom response classes."""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see the "fast" extra
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode JSON compactly, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse encoded with dumps().
+
+    Meant for trusted results from the service layer: returning one from a
+    route skips FastAPI's response_model validation and serialization.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body is read.
+
+    The stock class listens for client disconnects on ``receive`` while it
+    streams, which would swallow the request body messages the body
+    generator is waiting for. Here the generator's own reads (ClientDisconnect)
+    and failed sends surface the disconnect instead.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
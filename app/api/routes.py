@@ -1,14 +1,53 @@
 """API route definitions."""
 
+import json
 from typing import List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 
-from app.services.billing import charge, create_quote
+from app.api.executor import run_in_executor
+from app.api.responses import DuplexStreamingResponse, FastJSONResponse
+from app.core.audit import get_audit_log
+from app.core.cart import Cart
+from app.core.instrumentation import timed_handler
+from app.core.singleflight import AsyncSingleFlight
+from app.services.billing import (
+    charge,
+    charge_batch,
+    create_quote,
+    create_quote_batch,
+    quote_request_key,
+)
+from app.services.customers import get_customer_store
+from app.services.fraud import get_velocity_tracker
+from app.services.streaming import (
+    DEFAULT_CHUNK_SIZE,
+    LineTooLongError,
+    aiter_chunks,
+    aiter_lines,
+    price_order_chunk,
+)
+from app.settings import get_settings
 
 router = APIRouter()
 
+# Return service results as-is instead of re-validating them through the
+# response models (CONTO_FAST_RESPONSES)
+FAST_RESPONSES = get_settings().fast_responses
+
+# Longest NDJSON line /quote/stream buffers (CONTO_STREAM_MAX_LINE_BYTES)
+STREAM_MAX_LINE_BYTES = get_settings().stream_max_line_bytes
+
+# Concurrent identical /quote and /charge requests share one executor call
+# (CONTO_COALESCE); see app.core.singleflight. Not while an audit log is
+# being written, and /charge not while charges are recorded anywhere else
+# (customer order history, velocity tracking): every request must reach
+# the service call that records it
+COALESCE = get_settings().coalesce_requests
+_quote_requests = AsyncSingleFlight("quote_request")
+_charge_requests = AsyncSingleFlight("charge_request")
+
 
 # Request/Response models
 
@@ -35,6 +74,20 @@ class QuoteResponse(BaseModel):
     currency: str = "USD"
 
 
+class CustomerQuoteResponse(QuoteResponse):
+    # Only set for customers with a stored profile (CONTO_CUSTOMER_DB);
+    # routes drop it from the response when unset
+    promotion_eligible: Optional[bool] = None
+
+
+class QuoteBatchRequest(BaseModel):
+    quotes: List[QuoteRequest]
+
+
+class QuoteBatchResponse(BaseModel):
+    quotes: List[CustomerQuoteResponse]
+
+
 class ChargeRequest(BaseModel):
     user_id: str
     amount: float = Field(gt=0)
@@ -49,11 +102,33 @@ class ChargeResponse(BaseModel):
     risk_score: float
 
 
+class ChargeBatchRequest(BaseModel):
+    charges: List[ChargeRequest]
+    include_flags: bool = False
+
+
+class ChargeBatchResult(ChargeResponse):
+    flags: Optional[List[str]] = None
+
+
+class ChargeBatchResponse(BaseModel):
+    charges: List[ChargeBatchResult]
+
+
+def parse_quote_line(line: bytes) -> dict:
+    """Validate one NDJSON order against the /quote request schema."""
+    request = QuoteRequest.model_validate_json(line)
+    if not request.items:
+        raise ValueError("Items list cannot be empty")
+    return request.model_dump()
+
+
 # Endpoints
 
 
-@router.post("/quote", response_model=QuoteResponse)
-def post_quote(request: QuoteRequest) -> QuoteResponse:
+@router.post("/quote", response_model=CustomerQuoteResponse, response_model_exclude_none=True)
+@timed_handler
+async def post_quote(request: QuoteRequest) -> CustomerQuoteResponse:
     """
     Generate a price quote for an order.
 
@@ -63,32 +138,141 @@ def post_quote(request: QuoteRequest) -> QuoteResponse:
     if not request.items:
         raise HTTPException(status_code=400, detail="Items list cannot be empty")
 
-    items = [item.model_dump() for item in request.items]
+    items = Cart.from_order_items(request.items)
 
-    result = create_quote(
-        user_id=request.user_id,
-        tier=request.tier,
-        region=request.region,
-        items=items,
-        coupon=request.coupon,
-    )
+    def quote():
+        return run_in_executor(
+            create_quote,
+            user_id=request.user_id,
+            tier=request.tier,
+            region=request.region,
+            items=items,
+            coupon=request.coupon,
+        )
+
+    if COALESCE and get_audit_log() is None:
+        key = quote_request_key(request.tier, request.region, items, request.coupon)
+        if get_customer_store() is not None:
+            # promotion_eligible depends on who is asking
+            key += (request.user_id,)
+        result = dict(await _quote_requests.do(key, quote))
+    else:
+        result = await quote()
+
+    if FAST_RESPONSES:
+        return FastJSONResponse(result)
+    return CustomerQuoteResponse(**result)
 
-    return QuoteResponse(**result)
+
+@router.post("/quote/batch", response_model=QuoteBatchResponse, response_model_exclude_none=True)
+@timed_handler
+async def post_quote_batch(request: QuoteBatchRequest) -> QuoteBatchResponse:
+    """
+    Generate price quotes for many orders in one call.
+
+    Each order has the same shape as a /quote request. Quotes are returned
+    in request order and match what /quote would return for each order.
+    """
+    for index, quote in enumerate(request.quotes):
+        if not quote.items:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Items list cannot be empty (quote {index})",
+            )
+
+    orders = [quote.model_dump() for quote in request.quotes]
+
+    results = await run_in_executor(create_quote_batch, orders)
+
+    if FAST_RESPONSES:
+        return FastJSONResponse({"quotes": results})
+    return QuoteBatchResponse(quotes=[CustomerQuoteResponse(**result) for result in results])
+
+
+@router.post("/quote/stream", response_class=DuplexStreamingResponse)
+@timed_handler
+async def post_quote_stream(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, gt=0, le=10_000),
+) -> DuplexStreamingResponse:
+    """
+    Price a stream of orders sent as NDJSON.
+
+    Each non-blank line is a /quote request. The response is NDJSON with
+    one line per order, in order: the quote, or {"error": ...} for an
+    invalid order. Orders are read and priced chunk_size at a time, and the
+    next chunk is not read until the previous one has been sent. A line
+    longer than CONTO_STREAM_MAX_LINE_BYTES ends the stream with a final
+    {"error": ...} line.
+    """
+
+    async def quotes():
+        lines = aiter_lines(request.stream(), STREAM_MAX_LINE_BYTES)
+        try:
+            async for chunk in aiter_chunks(lines, chunk_size):
+                yield await run_in_executor(price_order_chunk, chunk, parse_quote_line)
+        except LineTooLongError as exc:
+            yield (json.dumps({"error": str(exc)}) + "\n").encode()
+
+    return DuplexStreamingResponse(quotes(), media_type="application/x-ndjson")
+
+
+def _charge_is_a_pure_decision() -> bool:
+    # charge() writes to the audit log, the customer's order history and the
+    # velocity tracker when they are configured
+    return get_audit_log() is None and get_customer_store() is None and get_velocity_tracker() is None
 
 
 @router.post("/charge", response_model=ChargeResponse)
-def post_charge(request: ChargeRequest) -> ChargeResponse:
+@timed_handler
+async def post_charge(request: ChargeRequest) -> ChargeResponse:
     """
     Process a charge request.
 
     Performs fraud risk assessment and returns approval status.
     """
-    result = charge(
-        user_id=request.user_id,
-        amount=request.amount,
-        currency=request.currency,
-        payment_method=request.payment_method,
-        region=request.region,
-    )
+    def decide():
+        return run_in_executor(
+            charge,
+            user_id=request.user_id,
+            amount=request.amount,
+            currency=request.currency,
+            payment_method=request.payment_method,
+            region=request.region,
+        )
+
+    if COALESCE and _charge_is_a_pure_decision():
+        # Nothing records this charge, so identical in-flight requests
+        # (e.g. parallel client retries) can share its risk decision
+        key = (request.user_id, request.amount, request.currency, request.payment_method, request.region)
+        result = dict(await _charge_requests.do(key, decide))
+    else:
+        result = await decide()
 
+    if FAST_RESPONSES:
+        return FastJSONResponse(result)
     return ChargeResponse(**result)
+
+
+@router.post(
+    "/charge/batch",
+    response_model=ChargeBatchResponse,
+    response_model_exclude_none=True,
+)
+@timed_handler
+async def post_charge_batch(request: ChargeBatchRequest) -> ChargeBatchResponse:
+    """
+    Process many charge requests in one call.
+
+    Risk is scored for the whole batch at once. Set include_flags to get
+    the risk flags behind each decision.
+    """
+    charges = [c.model_dump() for c in request.charges]
+
+    results = await run_in_executor(
+        charge_batch, charges, include_flags=request.include_flags
+    )
+
+    if FAST_RESPONSES:
+        return FastJSONResponse({"charges": results})
+    return ChargeBatchResponse(charges=[ChargeBatchResult(**result) for result in results])
@@ -0,0 +1,188 @@
+"""Command-line entry points."""
+
+import argparse
+import csv
+import json
+import sys
+from typing import List, Optional
+
+from app.api.routes import parse_quote_line
+from app.core import audit
+from app.services import simulation
+from app.services.customers import CustomerProfile, CustomerStore
+from app.services.streaming import DEFAULT_CHUNK_SIZE, quote_ndjson
+
+
+def quote_stream(argv: Optional[List[str]] = None) -> int:
+    """
+    Re-price an NDJSON file of orders, streaming results to NDJSON.
+
+    Each input line is a /quote request; each output line is its quote or
+    {"error": ...}. Memory use is bounded by --chunk-size, not input size.
+    """
+    parser = argparse.ArgumentParser(
+        prog="conto-quote-stream",
+        description="Price NDJSON orders (one /quote request per line).",
+    )
+    parser.add_argument("input", nargs="?", default="-", help="Input file (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Orders priced per chunk (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    args = parser.parse_args(argv)
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    sink = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for block in quote_ndjson(source, parse_quote_line, chunk_size=args.chunk_size):
+            sink.write(block)
+        sink.flush()
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout.buffer:
+            sink.close()
+    return 0
+
+
+def simulate(argv: Optional[List[str]] = None) -> int:
+    """
+    Re-price a historical order dataset under alternative rule tables.
+
+    Prints revenue, discount, tax and total for the current tables and for
+    each scenario, with deltas against the current tables.
+    """
+    parser = argparse.ArgumentParser(
+        prog="conto-simulate",
+        description="What-if pricing over an NDJSON order dataset.",
+    )
+    parser.add_argument("orders", help="NDJSON orders, one /quote request plus weekday or date per line")
+    parser.add_argument(
+        "-s",
+        "--scenario",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="JSON scenario file overriding tax_rates, tier_discounts and/or "
+        "max_discount_rate; may hold a list of scenarios; repeatable",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=0,
+        help="Worker processes (default: one per available CPU)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=simulation.DEFAULT_CHUNK_SIZE,
+        help=f"Orders priced per batch (default: {simulation.DEFAULT_CHUNK_SIZE})",
+    )
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be positive")
+    workers = args.workers
+    if workers <= 0:
+        # Imported here: app.serve pulls in uvicorn
+        from app.serve import default_workers
+
+        workers = default_workers()
+
+    try:
+        scenarios = [scenario for path in args.scenario for scenario in simulation.load_scenarios(path)]
+        report = simulation.simulate(args.orders, scenarios, workers=workers, chunk_size=args.chunk_size)
+    except (OSError, ValueError) as exc:
+        print(f"conto-simulate: {exc}", file=sys.stderr)
+        return 2
+
+    print(simulation.format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+def audit_summary(argv: Optional[List[str]] = None) -> int:
+    """
+    Summarize an audit log directory for reconciliation.
+
+    Prints record counts and cent totals of quotes and charges as JSON.
+    """
+    parser = argparse.ArgumentParser(
+        prog="conto-audit",
+        description="Record counts and cent totals of an audit log (CONTO_AUDIT_DIR).",
+    )
+    parser.add_argument("directory", help="Audit log directory")
+    parser.add_argument(
+        "-u",
+        "--user",
+        action="append",
+        metavar="USER_ID",
+        help="Only count records of this user; repeatable",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        summary = audit.summarize(args.directory, users=args.user)
+    except (OSError, ValueError) as exc:
+        print(f"conto-audit: {exc}", file=sys.stderr)
+        return 2
+    summary["segments"] = len(audit.segment_paths(args.directory))
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+def import_customers(argv: Optional[List[str]] = None) -> int:
+    """
+    Load customer profiles from CSV into a SQLite profile database.
+
+    Each row is user_id,tier,region[,order_count[,total_spent_cents]];
+    existing profiles with the same user_id are replaced.
+    """
+    parser = argparse.ArgumentParser(
+        prog="conto-customers",
+        description="Import customer profiles (CSV) into a CONTO_CUSTOMER_DB database.",
+    )
+    parser.add_argument("database", help="SQLite database (created if missing)")
+    parser.add_argument("csv", nargs="?", default="-", help="CSV file (default: stdin)")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Profiles per transaction")
+    args = parser.parse_args(argv)
+
+    store = CustomerStore(args.database, cache_size=0)
+    source = sys.stdin if args.csv == "-" else open(args.csv, newline="", encoding="utf-8")
+    written = 0
+    try:
+        batch = []
+        for number, row in enumerate(csv.reader(source), 1):
+            if not row or row[0] == "user_id":
+                continue  # Blank line or header
+            try:
+                user_id, tier, region, *history = row
+                batch.append(CustomerProfile(user_id, tier, region, *(int(value) for value in history[:2])))
+            except ValueError:
+                print(
+                    f"conto-customers: line {number}: "
+                    "expected user_id,tier,region[,order_count[,total_spent_cents]]",
+                    file=sys.stderr,
+                )
+                return 2
+            if len(batch) >= args.batch_size:
+                written += store.upsert_many(batch)
+                batch = []
+        written += store.upsert_many(batch)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        store.close()
+    print(f"{written} profiles written to {args.database}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(quote_stream())
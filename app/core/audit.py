@@ -0,0 +1,434 @@
+"""
+Append-only binary audit log of quote and charge decisions.
+
+Every decision becomes one fixed-width 64-byte record (see RECORD): the
+user as a 64-bit key, tier/region/payment-method codes, amounts in integer
+cents, the risk score in basis points, the risk flag bitmask and a
+nanosecond timestamp. Request threads only append a tuple to a queue; a
+background writer thread packs queued records a batch at a time into a
+numpy record array, copies it into a memory-mapped segment file, then
+bumps the record count in the segment header, so a reader never sees a
+partly written record.
+
+Segments are preallocated to a fixed number of records and named
+"<created_ns>-<pid>.audit", so every process (conto-serve workers, process
+pool workers) writes its own files into the shared directory. A full
+segment is truncated to its used size and the writer moves on to a new one.
+
+Writes land in the OS page cache as soon as a batch is packed, so they
+survive the process crashing; records still queued (at most one flush
+interval's worth) do not. Segments are only msync'ed when they are closed.
+
+The queue holds at most max_pending records. While the writer cannot keep
+up or keeps failing (last_error), further records are dropped and counted
+in `dropped` rather than piling up in memory.
+
+Readers map segments read-only as numpy structured arrays, so scanning is
+bounded by disk bandwidth rather than per-record Python work.
+"""
+
+import atexit
+import collections
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import lru_cache
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+from app.core.instrumentation import metric_lines, register_collector
+from app.core.lazy import lazy_import
+from app.settings import get_settings
+
+np = lazy_import("numpy")
+
+# seq, timestamp_ns, user, subtotal, discount, tax, total, risk_bp,
+# kind, tier, region, payment_method, flags, approved
+RECORD = struct.Struct("<QqQqqqqHBBBBBB")
+
+MAGIC = b"CONTOAUD"
+VERSION = 1
+# magic, version, record size, pid, created_ns, record count
+HEADER = struct.Struct("<8sHHIqQ")
+HEADER_SIZE = 64
+_COUNT = struct.Struct("<Q")
+_COUNT_OFFSET = 24
+
+SEGMENT_SUFFIX = ".audit"
+
+KIND_QUOTE = 1
+KIND_CHARGE = 2
+
+# Code 0 is "not applicable / unknown"; a code is its index in the tuple
+TIERS = ("", "free", "pro", "enterprise")
+REGIONS = ("", "EU", "US", "APAC")
+PAYMENT_METHODS = ("", "card", "invoice")
+
+_TIER_CODES = {name: code for code, name in enumerate(TIERS) if name}
+_REGION_CODES = {name: code for code, name in enumerate(REGIONS) if name}
+_METHOD_CODES = {name: code for code, name in enumerate(PAYMENT_METHODS) if name}
+
+
+class AuditRecord(NamedTuple):
+    """One decoded record. Charges keep the charged amount in `total`."""
+
+    seq: int
+    timestamp_ns: int
+    user: int
+    subtotal: int
+    discount: int
+    tax: int
+    total: int
+    risk_bp: int
+    kind: int
+    tier: int
+    region: int
+    payment_method: int
+    flags: int
+    approved: int
+
+
+@lru_cache(maxsize=1)
+def record_dtype():
+    """numpy dtype with the same layout as RECORD."""
+    codes = {"Q": "<u8", "q": "<i8", "H": "<u2", "B": "u1"}
+    return np.dtype([
+        (name, codes[code]) for name, code in zip(AuditRecord._fields, RECORD.format[1:])
+    ])
+
+
+@lru_cache(maxsize=65536)
+def user_key(user_id: str) -> int:
+    """Stable 64-bit key stored for a user_id (same in every process)."""
+    return int.from_bytes(hashlib.blake2b(user_id.encode(), digest_size=8).digest(), "little")
+
+
+class _Segment:
+    __slots__ = ("path", "file", "map", "capacity", "count")
+
+    def __init__(self, directory: str, capacity: int):
+        created = time.time_ns()
+        self.path = os.path.join(directory, f"{created:020d}-{os.getpid()}{SEGMENT_SUFFIX}")
+        self.file = open(self.path, "x+b")
+        size = HEADER_SIZE + capacity * RECORD.size
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, RECORD.size, os.getpid(), created, 0)
+        self.capacity = capacity
+        self.count = 0
+
+    def close(self) -> None:
+        self.map.flush()
+        self.map.close()
+        self.file.truncate(HEADER_SIZE + self.count * RECORD.size)
+        self.file.close()
+
+
+class AuditLog:
+    """
+    Batching writer of audit records into rotating memory-mapped segments.
+
+    record_quote / record_charge are safe to call from any thread and cost
+    one tuple and a deque append; the writer thread writes records every
+    `flush_interval` seconds, or sooner once `batch_size` are queued.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_records: int = 1_000_000,
+        flush_interval: float = 0.05,
+        batch_size: int = 4096,
+        max_pending: int = 100_000,
+    ):
+        # Deferred: multiprocessing costs milliseconds at import time
+        from multiprocessing import util as multiprocessing_util
+
+        if segment_records < 1:
+            raise ValueError("segment_records must be >= 1")
+        if max_pending < 1:
+            raise ValueError("max_pending must be >= 1")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_records = segment_records
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending: collections.deque = collections.deque()
+        self._drop_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._segment: Optional[_Segment] = None
+        self._seq = 0
+        self._closed = False
+        self._pid = os.getpid()
+        self.last_error: Optional[OSError] = None
+        self.written = 0
+        self.dropped = 0
+        self.segments = 0
+        self._thread = threading.Thread(target=self._run, name="conto-audit-writer", daemon=True)
+        self._thread.start()
+        # atexit does not run in process pool workers; multiprocessing
+        # finalizers do, and close() is idempotent
+        atexit.register(self.close)
+        multiprocessing_util.Finalize(None, self.close, exitpriority=10)
+
+    def record_quote(self, user_id: str, tier: str, region: str, quote: dict) -> None:
+        """Queue a create_quote result."""
+        self._append((
+            time.time_ns(), user_id,
+            quote["subtotal"], quote["discount"], quote["tax"], quote["total"], 0.0,
+            KIND_QUOTE, _TIER_CODES.get(tier, 0), _REGION_CODES.get(region, 0), 0, 0, False,
+        ))
+
+    def record_charge(
+        self,
+        user_id: str,
+        region: str,
+        payment_method: str,
+        amount: float,
+        result: dict,
+        flag_mask: int,
+    ) -> None:
+        """Queue a charge decision (result as returned by billing.charge)."""
+        self._append((
+            time.time_ns(), user_id, 0.0, 0.0, 0.0, amount, result["risk_score"],
+            KIND_CHARGE, 0, _REGION_CODES.get(region, 0), _METHOD_CODES.get(payment_method, 0),
+            flag_mask, result["approved"],
+        ))
+
+    def _append(self, entry: tuple) -> None:
+        pending = self._pending
+        if len(pending) >= self.max_pending:
+            with self._drop_lock:
+                self.dropped += 1
+            return
+        pending.append(entry)
+        if len(pending) >= self.batch_size:
+            self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> None:
+        """Write every queued record now, on the calling thread."""
+        with self._write_lock:
+            self._drain()
+
+    def close(self) -> None:
+        """Write queued records, stop the writer and finish the open segment."""
+        if self._closed or os.getpid() != self._pid:
+            return  # A forked child must not touch its parent's segment
+        self._closed = True
+        self._wake.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        with self._write_lock:
+            self._drain()
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                with self._write_lock:
+                    self._drain()
+            except OSError as exc:
+                # Queued records stay queued; retried on the next wake-up
+                self.last_error = exc
+
+    def _drain(self) -> None:
+        pending = self._pending
+        while pending:
+            segment = self._segment
+            if segment is None:
+                segment = self._segment = _Segment(self.directory, self.segment_records)
+                self.segments += 1
+            batch = min(segment.capacity - segment.count, len(pending))
+            rows = self._pack([pending.popleft() for _ in range(batch)])
+            offset = HEADER_SIZE + segment.count * RECORD.size
+            segment.map[offset:offset + rows.nbytes] = rows.tobytes()
+            # Publish the records only once they are fully written
+            segment.count += batch
+            _COUNT.pack_into(segment.map, _COUNT_OFFSET, segment.count)
+            self.written += batch
+            if segment.count == segment.capacity:
+                segment.close()
+                self._segment = None
+
+    def _pack(self, entries: List[tuple]):
+        # Column by column: far cheaper than a struct.pack per record
+        count = len(entries)
+        columns = zip(*entries)
+        rows = np.empty(count, dtype=record_dtype())
+        rows["seq"] = np.arange(self._seq + 1, self._seq + count + 1)
+        self._seq += count
+        rows["timestamp_ns"] = np.fromiter(next(columns), dtype=np.int64, count=count)
+        rows["user"] = np.fromiter(map(user_key, next(columns)), dtype=np.uint64, count=count)
+        for name in ("subtotal", "discount", "tax", "total"):
+            # Service results are already rounded to the cent
+            rows[name] = np.rint(np.fromiter(next(columns), dtype=np.float64, count=count) * 100)
+        rows["risk_bp"] = np.rint(np.fromiter(next(columns), dtype=np.float64, count=count) * 10000)
+        for name in ("kind", "tier", "region", "payment_method", "flags", "approved"):
+            rows[name] = np.fromiter(next(columns), dtype=np.uint8, count=count)
+        return rows
+
+
+# Reading
+
+
+def segment_paths(directory: str) -> List[str]:
+    """Segment files in a directory, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in sorted(names) if name.endswith(SEGMENT_SUFFIX)]
+
+
+def read_segment(path: str):
+    """
+    Records of one segment as a read-only structured array (see record_dtype).
+
+    The array maps the file, so nothing is read until it is used. Segments
+    still being written are read up to the last published batch.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        file_size = os.fstat(f.fileno()).st_size
+    if len(header) < HEADER_SIZE:
+        raise ValueError(f"{path}: truncated audit segment header")
+    magic, version, record_size, _, _, count = HEADER.unpack_from(header)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"{path}: not a version {VERSION} audit segment")
+    count = min(count, (file_size - HEADER_SIZE) // RECORD.size)
+    if count == 0:
+        return np.empty(0, dtype=record_dtype())
+    return np.memmap(path, dtype=record_dtype(), mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+def scan(directory: str, chunk_records: int = 1 << 20) -> Iterator:
+    """Yield the log's records as structured arrays of up to chunk_records, oldest segment first."""
+    for path in segment_paths(directory):
+        records = read_segment(path)
+        for start in range(0, len(records), chunk_records):
+            yield records[start:start + chunk_records]
+
+
+def iter_records(directory: str) -> Iterator[AuditRecord]:
+    """Yield every record as an AuditRecord (slower than scan; for ad-hoc use)."""
+    for chunk in scan(directory):
+        for row in chunk.tolist():
+            yield AuditRecord._make(row)
+
+
+def summarize(directory: str, users: Optional[Sequence[str]] = None) -> dict:
+    """
+    Totals for reconciliation: counts and cent sums of quotes and charges.
+
+    Args:
+        directory: Audit log directory
+        users: Only count records of these user_ids
+
+    Returns:
+        {"quotes": {...}, "charges": {...}} with record counts and sums in cents
+    """
+    keys = np.array([user_key(user) for user in users], dtype=np.uint64) if users is not None else None
+    quotes = dict.fromkeys(("records", "subtotal", "discount", "tax", "total"), 0)
+    charges = dict.fromkeys(("records", "approved", "declined", "amount", "approved_amount"), 0)
+    for chunk in scan(directory):
+        if keys is not None:
+            chunk = chunk[np.isin(chunk["user"], keys)]
+        quote = chunk[chunk["kind"] == KIND_QUOTE]
+        quotes["records"] += len(quote)
+        for field in ("subtotal", "discount", "tax", "total"):
+            quotes[field] += int(quote[field].sum())
+        charge = chunk[chunk["kind"] == KIND_CHARGE]
+        approved = charge["approved"].astype(bool)
+        charges["records"] += len(charge)
+        charges["approved"] += int(approved.sum())
+        charges["declined"] += int((~approved).sum())
+        charges["amount"] += int(charge["total"].sum())
+        charges["approved_amount"] += int(charge["total"][approved].sum())
+    return {"quotes": quotes, "charges": charges}
+
+
+# Process-wide log (CONTO_AUDIT_DIR), opened on first use so that forked
+# workers each start their own writer thread and segments
+
+_UNOPENED = object()
+_audit_log = _UNOPENED
+_audit_log_lock = threading.Lock()
+
+
+def _open_from_settings() -> Optional[AuditLog]:
+    settings = get_settings()
+    if not settings.audit_dir:
+        return None
+    return AuditLog(
+        settings.audit_dir,
+        segment_records=settings.audit_segment_records,
+        flush_interval=settings.audit_flush_seconds,
+        max_pending=settings.audit_max_pending,
+    )
+
+
+def get_audit_log() -> Optional[AuditLog]:
+    """The process's audit log, or None when auditing is not configured."""
+    global _audit_log
+    log = _audit_log
+    if log is _UNOPENED:
+        with _audit_log_lock:
+            if _audit_log is _UNOPENED:
+                _audit_log = _open_from_settings()
+            log = _audit_log
+    return log
+
+
+def configure_audit_log(directory: Optional[str], **options) -> Optional[AuditLog]:
+    """Close the current audit log and write to `directory` instead (None disables auditing)."""
+    global _audit_log
+    with _audit_log_lock:
+        if isinstance(_audit_log, AuditLog):
+            _audit_log.close()
+        _audit_log = AuditLog(directory, **options) if directory else None
+        return _audit_log
+
+
+def close_audit_log() -> None:
+    """Flush and close the audit log; it is reopened on next use."""
+    global _audit_log
+    with _audit_log_lock:
+        if isinstance(_audit_log, AuditLog):
+            _audit_log.close()
+        _audit_log = _UNOPENED
+
+
+def _forget_after_fork() -> None:
+    # The parent's writer thread does not exist in the child; it opens its own
+    global _audit_log, _audit_log_lock
+    _audit_log = _UNOPENED
+    _audit_log_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_after_fork)
+
+
+def _audit_metrics() -> List[str]:
+    log = _audit_log
+    if not isinstance(log, AuditLog):
+        return []
+    return [
+        *metric_lines("conto_audit_records_total", "Audit records written.", "counter", log.written),
+        *metric_lines("conto_audit_pending", "Audit records queued for the writer.", "gauge", log.pending()),
+        *metric_lines("conto_audit_dropped_total", "Audit records dropped with the queue full.", "counter", log.dropped),
+        *metric_lines("conto_audit_segments_total", "Audit segments opened.", "counter", log.segments),
+    ]
+
+
+register_collector(_audit_metrics)
@@ -0,0 +1,96 @@
+"""
+Compact cart representation.
+
+A Cart holds order lines as parallel columns instead of a list of dicts:
+SKUs in a list, quantities in an array('q') and unit prices in an
+array('d'). Routes build one straight from validated request models, and
+pricing reads the columns without re-validating each line.
+"""
+
+import operator
+from array import array
+from functools import reduce
+from typing import Iterable, List, Sequence, Tuple
+
+
+class Cart:
+    """
+    Order lines in parallel columns. Values are assumed already validated.
+
+    qty is an array('q'), or array('d') for quantities beyond int64.
+    """
+
+    __slots__ = ("skus", "qty", "unit_price")
+
+    def __init__(self, skus: List[str], qty: array, unit_price: array):
+        if not len(skus) == len(qty) == len(unit_price):
+            raise ValueError("Cart columns must have the same length")
+        self.skus = skus
+        self.qty = qty
+        self.unit_price = unit_price
+
+    @classmethod
+    def from_order_items(cls, items: Sequence) -> "Cart":
+        """
+        Build a cart from validated line objects.
+
+        Args:
+            items: Objects with sku, qty (int) and unit_price attributes,
+                e.g. OrderItem models
+
+        Returns:
+            Cart with one line per item, in order
+        """
+        qty = [item.qty for item in items]
+        try:
+            qty_column = array("q", qty)
+        except OverflowError:
+            # Beyond int64; float(qty) is what the dict path would use anyway
+            qty_column = array("d", qty)
+        return cls(
+            [item.sku for item in items],
+            qty_column,
+            array("d", [item.unit_price for item in items]),
+        )
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[Tuple[int, float]]) -> "Cart":
+        """Build a cart without SKUs from (qty, unit_price) pairs."""
+        lines = list(lines)
+        qty = [line_qty for line_qty, _ in lines]
+        try:
+            qty_column = array("q", qty)
+        except OverflowError:
+            # Beyond int64, as in from_order_items
+            qty_column = array("d", qty)
+        return cls([""] * len(lines), qty_column, array("d", [line_price for _, line_price in lines]))
+
+    def __len__(self) -> int:
+        return len(self.qty)
+
+    def __repr__(self) -> str:
+        return f"Cart({len(self)} lines)"
+
+    def lines(self) -> List[Tuple[int, float]]:
+        """(qty, unit_price) pairs, in order."""
+        return list(zip(self.qty, self.unit_price))
+
+    def fingerprint(self) -> tuple:
+        """Hashable value equal for carts with the same (qty, unit_price) lines in the same order."""
+        return (self.qty.typecode, self.qty.tobytes(), self.unit_price.tobytes())
+
+    def line_total(self) -> float:
+        """
+        Unrounded sum of qty * unit_price.
+
+        Adds left to right like the dict-based loop in calculate_subtotal,
+        so the float result (and every rounded cent) is identical.
+        """
+        return reduce(operator.add, map(operator.mul, self.qty, self.unit_price), 0.0)
+
+    def to_items(self) -> List[dict]:
+        """The lines as item dicts, for code that still takes dicts."""
+        return [
+            {"sku": sku, "qty": qty, "unit_price": unit_price}
+            for sku, qty, unit_price in zip(self.skus, self.qty, self.unit_price)
+        ]
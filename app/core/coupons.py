@@ -0,0 +1,289 @@
+"""
+Coupon catalogs too large for a dict literal.
+
+A CouponIndex maps millions of codes to their percentage compactly: codes
+are sorted by their 64-bit string hash, kept in an array('q'), and stored
+as UTF-8 bytes packed into one buffer with an array of offsets, next to a
+small index into the catalog's distinct percentages. A Bloom filter in
+front rejects almost every invalid code after a probe or two. That is the
+code's length plus ~14 bytes per code instead of ~150 for a dict of
+str -> float.
+
+A lookup bisects to the code's hash and then compares the stored bytes,
+so a code is only accepted if it is in the catalog: a colliding hash
+(random, or crafted under a fixed PYTHONHASHSEED) costs one more
+comparison, never a wrong discount. str hashes are keyed per process, so
+an index is only meaningful in the process that built it or its forks.
+
+Catalogs load from a text file of "CODE,percentage" lines or from SQLite.
+CouponReloader rebuilds the index in a background thread when the source
+changes and swaps it in with a single assignment, so lookups never wait.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import os
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+from urllib.request import pathname2url
+
+from app.core.lazy import lazy_import
+from app.core.utils import normalize_coupon
+
+np = lazy_import("numpy")
+
+_generations = itertools.count(1)
+
+
+class BloomFilter:
+    """Bloom filter over 64-bit hashes, using double hashing for the k probes."""
+
+    __slots__ = ("_bits", "_size", "_probes")
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        size = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        self._size = max(size, 8)
+        self._probes = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def add(self, hashed: int) -> None:
+        step = ((hashed >> 32) & 0xFFFFFFFF) | 1
+        position = hashed & 0xFFFFFFFF
+        bits, size = self._bits, self._size
+        for _ in range(self._probes):
+            bit = position % size
+            bits[bit >> 3] |= 1 << (bit & 7)
+            position += step
+
+    def add_many(self, hashes: array) -> None:
+        """Add every hash in an array('q'); same bits as calling add on each."""
+        hashed = np.frombuffer(hashes, dtype=np.uint64)
+        step = (hashed >> np.uint64(32)) | np.uint64(1)
+        position = hashed & np.uint64(0xFFFFFFFF)
+        bits = np.frombuffer(self._bits, dtype=np.uint8)
+        size = np.uint64(self._size)
+        for _ in range(self._probes):
+            bit = position % size
+            masks = np.left_shift(1, bit & np.uint64(7)).astype(np.uint8)
+            np.bitwise_or.at(bits, bit >> np.uint64(3), masks)
+            position += step
+
+    def __contains__(self, hashed: int) -> bool:
+        step = ((hashed >> 32) & 0xFFFFFFFF) | 1
+        position = hashed & 0xFFFFFFFF
+        bits, size = self._bits, self._size
+        for _ in range(self._probes):
+            bit = position % size
+            if not bits[bit >> 3] & (1 << (bit & 7)):
+                return False
+            position += step
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class CouponIndex:
+    """Immutable coupon code -> percentage index. Build with CouponIndex.build."""
+
+    def __init__(
+        self,
+        hashes: array,
+        codes: bytes,
+        offsets: array,
+        percentage_ids: array,
+        percentages: Tuple[float, ...],
+        bloom: BloomFilter,
+    ):
+        self._hashes = hashes
+        # Code i is codes[offsets[i]:offsets[i + 1]], UTF-8 encoded
+        self._codes = codes
+        self._offsets = offsets
+        self._percentage_ids = percentage_ids
+        self.percentages = percentages
+        self._bloom = bloom
+        # Identifies this index in pricing_rules_version()
+        self.generation = next(_generations)
+
+    @classmethod
+    def build(
+        cls,
+        coupons: Iterable[Tuple[str, float]],
+        false_positive_rate: float = 0.01,
+    ) -> "CouponIndex":
+        """
+        Index (code, percentage) pairs.
+
+        Codes are normalized like normalize_coupon; blank codes are skipped
+        and a repeated code keeps its last percentage.
+        """
+        hashes = array("q")
+        codes = []
+        percentage_ids = array("I")
+        ids = {}
+        for code, percentage in coupons:
+            code = normalize_coupon(code)
+            if code is None:
+                continue
+            percentage = float(percentage)
+            hashes.append(hash(code))
+            codes.append(code.encode())
+            percentage_ids.append(ids.setdefault(percentage, len(ids)))
+
+        # Stable sort, so within a run of equal hashes codes stay in input order
+        hash_column = np.frombuffer(hashes, dtype=np.int64)
+        order = np.argsort(hash_column, kind="stable")
+        hash_column = hash_column[order]
+        id_column = np.frombuffer(percentage_ids, dtype=np.uint32)[order]
+        keep = np.ones(len(hash_column), dtype=bool)
+        # A run of equal hashes holds a repeated code or (rarely) colliding
+        # codes: keep the last occurrence of each code
+        for position in np.flatnonzero(hash_column[1:] == hash_column[:-1]).tolist():
+            code = codes[order[position]]
+            end = position + 1
+            while end < len(hash_column) and hash_column[end] == hash_column[position]:
+                if codes[order[end]] == code:
+                    keep[position] = False
+                    break
+                end += 1
+        order = order[keep]
+
+        sorted_hashes = array("q", hash_column[keep].tobytes())
+        sorted_codes = b"".join([codes[number] for number in order.tolist()])
+        lengths = np.fromiter((len(codes[number]) for number in order.tolist()), dtype=np.int64, count=len(order))
+        offsets = array("I" if len(sorted_codes) < 1 << 32 else "q")
+        offsets.frombytes(np.concatenate(([0], np.cumsum(lengths))).astype(offsets.typecode).tobytes())
+        sorted_ids = array("B" if len(ids) <= 1 << 8 else "H" if len(ids) <= 1 << 16 else "I")
+        sorted_ids.frombytes(id_column[keep].astype(sorted_ids.typecode).tobytes())
+        del hashes, codes, percentage_ids, hash_column, id_column, order, keep, lengths
+
+        bloom = BloomFilter(len(sorted_hashes), false_positive_rate)
+        bloom.add_many(sorted_hashes)
+        return cls(sorted_hashes, sorted_codes, offsets, sorted_ids, tuple(ids), bloom)
+
+    def get(self, code: str) -> Optional[float]:
+        """Percentage for a normalized code, or None if it is not valid."""
+        hashed = hash(code)
+        if hashed not in self._bloom:
+            return None
+        hashes = self._hashes
+        position = bisect_left(hashes, hashed)
+        if position < len(hashes) and hashes[position] == hashed:
+            encoded = code.encode()
+            codes, offsets = self._codes, self._offsets
+            while True:
+                if codes[offsets[position]:offsets[position + 1]] == encoded:
+                    return self.percentages[self._percentage_ids[position]]
+                position += 1
+                if position == len(hashes) or hashes[position] != hashed:
+                    return None
+        return None
+
+    def __contains__(self, code: str) -> bool:
+        return self.get(code) is not None
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the index."""
+        return (
+            self._hashes.itemsize * len(self._hashes)
+            + len(self._codes)
+            + self._offsets.itemsize * len(self._offsets)
+            + self._percentage_ids.itemsize * len(self._percentage_ids)
+            + self._bloom.nbytes
+        )
+
+
+def read_coupon_file(path: str) -> Iterator[Tuple[str, float]]:
+    """Yield (code, percentage) from "CODE,percentage" lines; blank and # lines are skipped."""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            code, sep, percentage = line.rpartition(",")
+            if not sep:
+                raise ValueError(f"{path}:{number}: expected CODE,percentage")
+            yield code, float(percentage)
+
+
+def read_coupon_sqlite(
+    path: str,
+    query: str = "SELECT code, percentage FROM coupons",
+) -> Iterator[Tuple[str, float]]:
+    """Yield (code, percentage) rows from a SQLite database."""
+    connection = sqlite3.connect(f"file:{pathname2url(path)}?mode=ro", uri=True)
+    try:
+        yield from connection.execute(query)
+    finally:
+        connection.close()
+
+
+def load_coupon_index(path: str) -> CouponIndex:
+    """Build an index from a .db/.sqlite/.sqlite3 database or a text file."""
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return CouponIndex.build(read_coupon_sqlite(path))
+    return CouponIndex.build(read_coupon_file(path))
+
+
+class CouponReloader:
+    """
+    Background thread that reloads a coupon source when it changes.
+
+    Polls the file's mtime and size every `interval` seconds. A new index is
+    built entirely on this thread and then handed to `install`; a source
+    that fails to load leaves the current index in place.
+    """
+
+    def __init__(self, path: str, interval: float, install: Callable[[CouponIndex], None]):
+        self.path = path
+        self.interval = interval
+        self._install = install
+        self._stop = threading.Event()
+        self._signature = self._stat()
+        self._thread = threading.Thread(target=self._run, name="conto-coupon-reload", daemon=True)
+        self.last_error: Optional[Exception] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self) -> bool:
+        """Reload now if the source changed; returns True if a new index was installed."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        try:
+            index = load_coupon_index(self.path)
+        except (OSError, ValueError, sqlite3.Error) as exc:
+            self.last_error = exc
+            return False
+        self._signature = signature
+        self.last_error = None
+        self._install(index)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
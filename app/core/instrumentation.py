@@ -0,0 +1,258 @@
+"""
+Opt-in request instrumentation.
+
+With CONTO_INSTRUMENTATION set, functions decorated with @timed record how
+long each stage of a request takes, both into process-wide histograms
+(served at /metrics in Prometheus text format) and into the current
+request's Server-Timing header. When it is off, @timed returns the function
+unchanged, so the hot path pays nothing.
+
+CONTO_PROFILE_EVERY=N additionally runs the offloaded work of every Nth
+request under cProfile and writes the stats to CONTO_PROFILE_DIR.
+"""
+
+import cProfile
+import functools
+import itertools
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.settings import get_settings
+
+_settings = get_settings()
+ENABLED = _settings.instrumentation
+PROFILE_EVERY = _settings.profile_every
+PROFILE_DIR = _settings.profile_dir
+
+DEFAULT_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+class Histogram:
+    """Thread-safe Prometheus-style histogram with one label."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), then sum and count
+                series = self._series[label_value] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_value, series in sorted(snapshot.items()):
+            label = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{label}}} {int(series[-1])}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+STAGE_SECONDS = Histogram(
+    "conto_stage_duration_seconds",
+    "Time spent in each stage of handling a request.",
+    label="stage",
+)
+
+# Extra metric sources, each returning Prometheus text lines
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def register_collector(collector: Callable[[], Iterable[str]]) -> None:
+    """Add a callable whose lines are appended to /metrics output."""
+    _collectors.append(collector)
+
+
+def metric_lines(name: str, documentation: str, kind: str, value: float) -> List[str]:
+    """Prometheus text lines for a single unlabelled counter or gauge."""
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+
+def labelled_metric_lines(
+    name: str,
+    documentation: str,
+    kind: str,
+    samples: Iterable[Tuple[Dict[str, str], float]],
+) -> List[str]:
+    """Prometheus text lines for a counter or gauge with one sample per label set."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """All metrics in Prometheus text exposition format."""
+    lines = STAGE_SECONDS.render()
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+# Stage durations of the current request, for its Server-Timing header
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+_request_started: ContextVar[float] = ContextVar("request_started", default=0.0)
+_profile_prefix: ContextVar[Optional[str]] = ContextVar("profile_prefix", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration in the histogram and the current request."""
+    STAGE_SECONDS.observe(stage, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """Decorator timing every call as `stage`; a no-op unless enabled."""
+
+    def decorator(func: Callable) -> Callable:
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_handler(func: Callable) -> Callable:
+    """
+    Decorator for async route handlers; a no-op unless enabled.
+
+    Records "validation" (request start to handler entry, i.e. body read
+    and pydantic validation) and "handler" (the handler itself).
+    """
+    if not ENABLED:
+        return func
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        entered = time.perf_counter()
+        request_started = _request_started.get()
+        if request_started:
+            record_stage("validation", entered - request_started)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            record_stage("handler", time.perf_counter() - entered)
+
+    return wrapper
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Format stage durations (seconds) as a Server-Timing header value."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings.items())
+
+
+def profile_prefix() -> Optional[str]:
+    """Path prefix for profiles of the current request, if it is sampled."""
+    return _profile_prefix.get() if PROFILE_EVERY else None
+
+
+_profile_ids = itertools.count(1)
+
+
+def run_profiled(prefix: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run func under cProfile, writing stats to `<prefix>-<n>.prof`."""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(f"{prefix}-{next(_profile_ids)}.prof")
+
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware that sets up per-request timing and profiling state.
+
+    Adds a Server-Timing header (including "serialization": handler exit to
+    response start) and times the whole request as "request".
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._requests = itertools.count(1)
+        if PROFILE_EVERY:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        timings_token = _request_timings.set(timings)
+        started_token = _request_started.set(started)
+        profile_token = None
+        number = next(self._requests)
+        if PROFILE_EVERY and number % PROFILE_EVERY == 0:
+            name = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+            prefix = os.path.join(PROFILE_DIR, f"{int(time.time())}-{number}-{name}")
+            profile_token = _profile_prefix.set(prefix)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and ENABLED:
+                handled = sum(timings.get(stage, 0.0) for stage in ("validation", "handler"))
+                if handled:
+                    serialization = time.perf_counter() - started - handled
+                    record_stage("serialization", serialization)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(timings).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if ENABLED:
+                STAGE_SECONDS.observe("request", time.perf_counter() - started)
+            _request_timings.reset(timings_token)
+            _request_started.reset(started_token)
+            if profile_token is not None:
+                _profile_prefix.reset(profile_token)
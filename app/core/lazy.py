@@ -0,0 +1,36 @@
+"""
+Deferred imports for heavy optional-path modules.
+
+numpy is only needed by the batch code paths, but importing it costs more
+than the rest of the app combined, so modules bind it with
+``np = lazy_import("numpy")`` and the real import happens on first
+attribute access. Modules doing this use ``from __future__ import
+annotations`` so ``np.ndarray`` in signatures does not trigger the import.
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return module `name`, loading it on first attribute access."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def preload(name: str) -> ModuleType:
+    """Finish importing a module bound with lazy_import, e.g. before forking."""
+    module = lazy_import(name)
+    module.__name__  # any attribute access runs the deferred import
+    return module
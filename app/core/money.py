@@ -0,0 +1,42 @@
+"""
+Fixed-point money in integer cents.
+
+Pricing carries amounts as whole cents and only converts back to float
+dollars at the API boundary. Every operation rounds exactly like the float
+helpers in app.core.utils (ROUND_HALF_UP on the shortest decimal repr), so
+the two paths agree to the cent.
+
+That holds while float dollars resolve every cent exactly. From
+EXACT_CENTS_LIMIT cents on they do not, and the float path's own rounding
+decides the result, so pricing composes such amounts on floats instead.
+"""
+
+from app.core.instrumentation import timed
+from app.core.utils import _FAST_ROUNDING_LIMIT, round_half_up
+
+# Integer number of cents
+Cents = int
+
+# Amounts of at least this many cents are priced on floats (see above)
+EXACT_CENTS_LIMIT: Cents = int(_FAST_ROUNDING_LIMIT)
+
+
+@timed("rounding")
+def to_cents(value: float) -> Cents:
+    """Convert a dollar amount to cents, rounding like round_money."""
+    return round_half_up(value, 2)
+
+
+def from_cents(cents: Cents) -> float:
+    """Convert cents to a dollar float for API responses."""
+    return cents / 100
+
+
+def percentage_cents(cents: Cents, percentage: float) -> Cents:
+    """Cents equivalent of calculate_percentage."""
+    return round_half_up(cents / 100 * (percentage / 100.0), 2)
+
+
+def scale_cents(cents: Cents, factor: float) -> Cents:
+    """Multiply an amount by a factor, rounding like round_money(amount * factor)."""
+    return round_half_up(cents / 100 * factor, 2)
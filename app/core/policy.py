@@ -13,31 +13,56 @@ NOT covered (for Conto testing):
   - enterprise tier
 """
 
-from typing import Optional
+from __future__ import annotations
 
-from app.core.utils import calculate_percentage, normalize_coupon, round_money
+import threading
+from typing import Optional, Sequence, Tuple
+
+from app.core.coupons import CouponIndex, load_coupon_index
+from app.core.instrumentation import timed
+from app.core.lazy import lazy_import
+from app.core.money import EXACT_CENTS_LIMIT, Cents, from_cents, percentage_cents, scale_cents, to_cents
+from app.core.utils import (
+    VersionedDict,
+    calculate_percentage,
+    normalize_coupon,
+    round_money,
+    round_money_array,
+)
+from app.settings import get_settings
+
+np = lazy_import("numpy")
 
 # Valid coupon codes and their discount percentages
-VALID_COUPONS = {
+VALID_COUPONS = VersionedDict({
     "SAVE10": 10.0,
     "SAVE20": 20.0,
     "WELCOME": 15.0,
     "VIP50": 50.0,
-}
+})
+
+# Large coupon catalog (CONTO_COUPON_SOURCE) used instead of VALID_COUPONS;
+# loaded on first use, None when not configured
+_UNLOADED = object()
+_coupon_store = _UNLOADED
+_coupon_store_lock = threading.Lock()
 
 # Tier-based discount percentages
-TIER_DISCOUNTS = {
+TIER_DISCOUNTS = VersionedDict({
     "free": 0.0,
     "pro": 5.0,
     "enterprise": 15.0,
-}
+})
+
+# Largest discount an order can get, as a fraction of its subtotal
+MAX_DISCOUNT_RATE = 0.6
 
 # Regional adjustments (multipliers)
-REGION_MULTIPLIERS = {
+REGION_MULTIPLIERS = VersionedDict({
     "EU": 1.0,
     "US": 1.0,
     "APAC": 1.2,  # APAC gets boosted discounts
-}
+})
 
 
 def compute_discount(
@@ -46,6 +71,7 @@ def compute_discount(
     subtotal: float,
     coupon: Optional[str],
     weekday: int,
+    promotion_pct: float = 0.0,
 ) -> float:
     """
     Compute the total discount for an order.
@@ -56,6 +82,8 @@ def compute_discount(
         subtotal: Order subtotal before discounts
         coupon: Optional coupon code
         weekday: Day of week (0=Monday, 6=Sunday)
+        promotion_pct: Scheduled promotion percentage for the order's day
+            (see app.core.promotions)
 
     Returns:
         Total discount amount
@@ -72,8 +100,8 @@ def compute_discount(
     # Coupon discount (UNCOVERED: invalid coupon branch)
     normalized_coupon = normalize_coupon(coupon)
     if normalized_coupon is not None:
-        if normalized_coupon in VALID_COUPONS:
-            coupon_pct = VALID_COUPONS[normalized_coupon]
+        coupon_pct = _lookup_coupon(normalized_coupon)
+        if coupon_pct is not None:
             discount += calculate_percentage(subtotal, coupon_pct)
         else:
             # Invalid coupon - no additional discount
@@ -86,6 +114,10 @@ def compute_discount(
         weekend_bonus = calculate_percentage(subtotal, 5.0)
         discount += weekend_bonus
 
+    # Scheduled promotions
+    if promotion_pct:
+        discount += calculate_percentage(subtotal, promotion_pct)
+
     # Regional adjustment (UNCOVERED: APAC branch)
     if region == "APAC":
         # APAC customers get boosted discounts
@@ -98,14 +130,228 @@ def compute_discount(
         # US standard
         pass
 
-    # Cap discount at 60% of subtotal
-    max_discount = round_money(subtotal * 0.6)
+    # Cap discount at MAX_DISCOUNT_RATE (60%) of subtotal
+    max_discount = round_money(subtotal * MAX_DISCOUNT_RATE)
     if discount > max_discount:
         discount = max_discount
 
     return round_money(discount)
 
 
+def get_coupon_store() -> Optional[CouponIndex]:
+    """The installed coupon catalog, loading CONTO_COUPON_SOURCE on first use."""
+    global _coupon_store
+    if _coupon_store is _UNLOADED:
+        with _coupon_store_lock:
+            if _coupon_store is _UNLOADED:
+                source = get_settings().coupon_source
+                _coupon_store = load_coupon_index(source) if source else None
+    return _coupon_store
+
+
+def set_coupon_store(store: Optional[CouponIndex]) -> None:
+    """Install a coupon catalog (None falls back to VALID_COUPONS)."""
+    global _coupon_store
+    _coupon_store = store
+
+
+def _lookup_coupon(code: str) -> Optional[float]:
+    store = _coupon_store
+    if store is _UNLOADED:
+        store = get_coupon_store()
+    if store is None:
+        return VALID_COUPONS.get(code)
+    return store.get(code)
+
+
+def coupon_percentage(coupon: Optional[str]) -> Optional[float]:
+    """Discount percentage of a valid coupon; None for no coupon or an invalid one."""
+    code = normalize_coupon(coupon)
+    if code is None:
+        return None
+    return _lookup_coupon(code)
+
+
+def coupon_percentage_values() -> Tuple[float, ...]:
+    """Distinct percentages valid coupons can have."""
+    store = get_coupon_store()
+    if store is None:
+        return tuple(dict.fromkeys(VALID_COUPONS.values()))
+    return store.percentages
+
+
+def coupon_store_version() -> int:
+    """Changes whenever a different coupon catalog is installed (0 = none)."""
+    store = get_coupon_store()
+    return 0 if store is None else store.generation
+
+
+def discount_percentages(
+    tier: str,
+    coupon: Optional[str],
+    weekday: int,
+    promotion_pct: float = 0.0,
+) -> Tuple[float, ...]:
+    """
+    Percentages compute_discount applies, in the order it applies them.
+
+    The tier percentage always comes first (even when 0.0), followed by the
+    coupon percentage for a valid coupon, the weekend bonus and any
+    scheduled promotion.
+    """
+    percentages = discount_percentages_for(tier, coupon_percentage(coupon), weekday)
+    if promotion_pct:
+        percentages += (promotion_pct,)
+    return percentages
+
+
+def discount_percentages_for(
+    tier: str,
+    coupon_pct: Optional[float],
+    weekday: int,
+) -> Tuple[float, ...]:
+    """discount_percentages for an already looked-up coupon percentage."""
+    percentages = [TIER_DISCOUNTS.get(tier.lower(), 0.0)]
+
+    if coupon_pct is not None:
+        percentages.append(coupon_pct)
+
+    if weekday >= 5:
+        percentages.append(5.0)
+
+    return tuple(percentages)
+
+
+def region_multiplier(region: str) -> Optional[float]:
+    """Discount multiplier compute_discount applies for a region, if any."""
+    if region == "APAC":
+        return REGION_MULTIPLIERS["APAC"]
+    return None
+
+
+@timed("discount")
+def apply_discount_percentages(
+    subtotal: Cents,
+    percentages: Sequence[float],
+    multiplier: Optional[float],
+) -> Cents:
+    """
+    Discount arithmetic of compute_discount, in integer cents.
+
+    Args:
+        subtotal: Order subtotal before discounts, in cents
+        percentages: Output of discount_percentages
+        multiplier: Output of region_multiplier
+
+    Returns:
+        Total discount in cents
+    """
+    if subtotal <= 0:
+        return 0
+    if subtotal >= EXACT_CENTS_LIMIT:
+        # Too large for whole cents to round like floats: compose on floats
+        amount = from_cents(subtotal)
+        running = 0.0
+        for pct in percentages:
+            running += calculate_percentage(amount, pct)
+        if multiplier is not None:
+            running = round_money(running * multiplier)
+        return to_cents(round_money(min(running, round_money(amount * MAX_DISCOUNT_RATE))))
+
+    parts = [percentage_cents(subtotal, pct) for pct in percentages]
+    discount = sum(parts)
+
+    if multiplier is not None:
+        # compute_discount scales the running float sum, whose last bit can
+        # differ from discount / 100; rebuild it so ties round the same way.
+        running = 0.0
+        for part in parts:
+            running += from_cents(part)
+        discount = to_cents(running * multiplier)
+
+    return min(discount, scale_cents(subtotal, MAX_DISCOUNT_RATE))
+
+
+def compute_discount_cents(
+    tier: str,
+    region: str,
+    subtotal: Cents,
+    coupon: Optional[str],
+    weekday: int,
+    promotion_pct: float = 0.0,
+) -> Cents:
+    """
+    Integer-cents version of compute_discount.
+
+    Args:
+        tier: Customer tier (free, pro, enterprise)
+        region: Customer region (EU, US, APAC)
+        subtotal: Order subtotal before discounts, in cents
+        coupon: Optional coupon code
+        weekday: Day of week (0=Monday, 6=Sunday)
+        promotion_pct: Scheduled promotion percentage for the order's day
+
+    Returns:
+        Total discount in cents, equal to to_cents(compute_discount(...))
+    """
+    return apply_discount_percentages(
+        subtotal,
+        discount_percentages(tier, coupon, weekday, promotion_pct),
+        region_multiplier(region),
+    )
+
+
+def compute_discount_batch(
+    tiers: Sequence[str],
+    regions: Sequence[str],
+    subtotals: np.ndarray,
+    coupons: Sequence[Optional[str]],
+    weekdays: np.ndarray,
+    promotion_pcts: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Vectorized compute_discount over N orders.
+
+    Applies the same steps in the same order as compute_discount, with
+    inapplicable components contributing a 0.0 percentage, so every element
+    matches the scalar result exactly.
+
+    Args:
+        tiers: Customer tier per order
+        regions: Customer region per order
+        subtotals: Order subtotals before discounts
+        coupons: Optional coupon code per order
+        weekdays: Day of week per order (0=Monday, 6=Sunday)
+        promotion_pcts: Scheduled promotion percentage per order (None = no
+            promotions)
+
+    Returns:
+        Array of discount amounts
+    """
+    subtotals = np.asarray(subtotals, dtype=np.float64)
+    tier_pct = np.array([TIER_DISCOUNTS.get(tier.lower(), 0.0) for tier in tiers])
+    coupon_pct = np.array(
+        [coupon_percentage(coupon) or 0.0 for coupon in coupons]
+    )
+    weekend_pct = np.where(np.asarray(weekdays) >= 5, 5.0, 0.0)
+    is_apac = np.array([region == "APAC" for region in regions], dtype=bool)
+
+    discount = round_money_array(subtotals * (tier_pct / 100.0))
+    discount = discount + round_money_array(subtotals * (coupon_pct / 100.0))
+    discount = discount + round_money_array(subtotals * (weekend_pct / 100.0))
+    if promotion_pcts is not None and np.any(promotion_pcts):
+        discount = discount + round_money_array(subtotals * (np.asarray(promotion_pcts) / 100.0))
+
+    if is_apac.any():
+        boosted = round_money_array(discount * REGION_MULTIPLIERS["APAC"])
+        discount = np.where(is_apac, boosted, discount)
+
+    max_discount = round_money_array(subtotals * MAX_DISCOUNT_RATE)
+    discount = np.where(discount > max_discount, max_discount, discount)
+
+    return np.where(subtotals <= 0, 0.0, round_money_array(discount))
+
+
 def is_eligible_for_promotion(tier: str, region: str, order_count: int) -> bool:
     """
     Check if customer is eligible for special promotions.
@@ -6,17 +6,36 @@ After 6-10 small PRs modifying this file, it will trigger Conto's
 Hotspot Risk signal.
 """
 
-from typing import List, Optional
+from __future__ import annotations
 
-from app.core.policy import compute_discount
-from app.core.utils import round_money, safe_float
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from app.core import policy
+from app.core.cart import Cart
+from app.core.instrumentation import timed
+from app.core.lazy import lazy_import
+from app.core.money import EXACT_CENTS_LIMIT, Cents, from_cents, to_cents
+from app.core.policy import (
+    apply_discount_percentages,
+    compute_discount_batch,
+    discount_percentages_for,
+    region_multiplier,
+)
+from app.core.utils import (
+    VersionedDict,
+    round_money,
+    round_money_array,
+    safe_float,
+)
+
+np = lazy_import("numpy")
 
 # Tax rates by region (updated 1766570730)
-TAX_RATES = {
+TAX_RATES = VersionedDict({
     "EU": 0.20,   # 20% VAT
     "US": 0.08,   # 8% average sales tax
     "APAC": 0.10, # 10% GST
-}
+})
 
 # Minimum order amounts by region
 MIN_ORDER_AMOUNTS = {
@@ -26,22 +45,32 @@ MIN_ORDER_AMOUNTS = {
 }
 
 
-def calculate_subtotal(items: List[dict]) -> float:
+# Order items: a list of dicts, or a Cart of already-validated lines
+Items = Union[List[dict], Cart]
+
+
+def _line_total(items: Items) -> float:
+    if isinstance(items, Cart):
+        return items.line_total()
+    total = 0.0
+    for item in items:
+        qty = safe_float(item.get("qty"), default=0.0)
+        unit_price = safe_float(item.get("unit_price"), default=0.0)
+        total += qty * unit_price
+    return total
+
+
+def calculate_subtotal(items: Items) -> float:
     """
     Calculate the order subtotal from a list of items.
 
     Args:
-        items: List of dicts with 'qty' and 'unit_price' keys
+        items: List of dicts with 'qty' and 'unit_price' keys, or a Cart
 
     Returns:
         Subtotal amount
     """
-    total = 0.0
-    for item in items:
-        qty = safe_float(item.get("qty"), default=0.0)
-        unit_price = safe_float(item.get("unit_price"), default=0.0)
-        total += qty * unit_price
-    return round_money(total)
+    return round_money(_line_total(items))
 
 
 def calculate_tax(subtotal: float, region: str) -> float:
@@ -59,41 +88,355 @@ def calculate_tax(subtotal: float, region: str) -> float:
     return round_money(subtotal * rate)
 
 
+@timed("subtotal")
+def calculate_subtotal_cents(items: Items) -> Cents:
+    """Integer-cents version of calculate_subtotal."""
+    return to_cents(_line_total(items))
+
+
+def calculate_tax_cents(subtotal: Cents, region: str) -> Cents:
+    """Integer-cents version of calculate_tax."""
+    rate = TAX_RATES.get(region, 0.08)  # Default to US rate
+    return to_cents(from_cents(subtotal) * rate)
+
+
+class PricingRule(NamedTuple):
+    """Everything a quote needs from the rule tables, for one quote shape."""
+
+    discount_percentages: Tuple[float, ...]
+    region_multiplier: Optional[float]
+    tax_rate: float
+
+
+# (pricing_rules_version() at compile time, compiled rules)
+_compiled_rules: Tuple[tuple, Dict[tuple, PricingRule]] = ((), {})
+
+
+def pricing_rules_version() -> tuple:
+    """
+    Identify the current contents of the tables pricing rules come from.
+
+    The value changes whenever TIER_DISCOUNTS, VALID_COUPONS,
+    REGION_MULTIPLIERS or TAX_RATES is mutated or rebound, MAX_DISCOUNT_RATE
+    is rebound, or a new coupon catalog is installed.
+    """
+    tables = (
+        policy.TIER_DISCOUNTS,
+        policy.VALID_COUPONS,
+        policy.REGION_MULTIPLIERS,
+        TAX_RATES,
+    )
+    return (
+        *((id(table), getattr(table, "version", 0)) for table in tables),
+        policy.coupon_store_version(),
+        policy.MAX_DISCOUNT_RATE,
+    )
+
+
+def _compile_rule(tier: str, region: str, weekday: int, coupon_pct: Optional[float]) -> PricingRule:
+    return PricingRule(
+        discount_percentages=discount_percentages_for(tier, coupon_pct, weekday),
+        region_multiplier=region_multiplier(region),
+        tax_rate=TAX_RATES.get(region, 0.08),  # Default to US rate
+    )
+
+
+def compile_pricing_rules() -> Dict[tuple, PricingRule]:
+    """
+    Precompute a PricingRule for every (tier, region, is_weekend, coupon_pct).
+
+    coupon_pct is the percentage of a valid coupon, or None. Keying on the
+    percentage rather than the code keeps the rule count independent of
+    how many coupon codes exist.
+
+    Returns:
+        Dict keyed by (tier, region, is_weekend, coupon_pct)
+    """
+    regions = set(TAX_RATES) | set(policy.REGION_MULTIPLIERS)
+    coupon_pcts = [None, *policy.coupon_percentage_values()]
+    return {
+        (tier, region, is_weekend, coupon_pct): _compile_rule(
+            tier, region, 5 if is_weekend else 0, coupon_pct
+        )
+        for tier in policy.TIER_DISCOUNTS
+        for region in regions
+        for is_weekend in (False, True)
+        for coupon_pct in coupon_pcts
+    }
+
+
+def current_pricing_rules() -> Dict[tuple, PricingRule]:
+    """The compiled rules, recompiled first if any source table changed."""
+    global _compiled_rules
+
+    version = pricing_rules_version()
+    compiled_version, rules = _compiled_rules
+    if version != compiled_version:
+        rules = compile_pricing_rules()
+        _compiled_rules = (version, rules)
+    return rules
+
+
+@timed("pricing_rule")
+def get_pricing_rule(
+    tier: str,
+    region: str,
+    weekday: int,
+    coupon: Optional[str],
+) -> PricingRule:
+    """
+    Look up the compiled PricingRule for a quote.
+
+    Recompiles first if any source table changed since the last compile.
+    Shapes outside the compiled space (e.g. an unknown region) are
+    compiled on the fly.
+    """
+    rules = current_pricing_rules()
+
+    coupon_pct = policy.coupon_percentage(coupon)
+
+    rule = rules.get((tier, region, weekday >= 5, coupon_pct))
+    if rule is None:
+        rule = _compile_rule(tier, region, weekday, coupon_pct)
+    return rule
+
+
+def calculate_total_cents(
+    items: Items,
+    tier: str,
+    region: str,
+    coupon: Optional[str],
+    weekday: int,
+    promotion_pct: float = 0.0,
+) -> dict:
+    """
+    Calculate complete pricing for an order in integer cents.
+
+    Takes the same arguments as calculate_total.
+
+    Returns:
+        Dict with subtotal, discount, tax, and total in cents
+    """
+    return price_subtotal_cents(
+        calculate_subtotal_cents(items), tier, region, coupon, weekday, promotion_pct
+    )
+
+
+def price_subtotal_cents(
+    subtotal: Cents,
+    tier: str,
+    region: str,
+    coupon: Optional[str],
+    weekday: int,
+    promotion_pct: float = 0.0,
+) -> dict:
+    """
+    Price everything after the subtotal: discount, tax and total.
+
+    Lets callers that maintain a subtotal themselves (e.g. cart sessions)
+    skip re-summing the items.
+
+    Returns:
+        Dict with subtotal, discount, tax, and total in cents
+    """
+    rule = get_pricing_rule(tier, region, weekday, coupon)
+
+    percentages = rule.discount_percentages
+    if promotion_pct:
+        # Promotions come and go by date, so they are not compiled into rules
+        percentages += (promotion_pct,)
+    discount = apply_discount_percentages(subtotal, percentages, rule.region_multiplier)
+    if subtotal >= EXACT_CENTS_LIMIT:
+        return _price_large_subtotal(subtotal, discount, rule.tax_rate)
+    taxable_amount = subtotal - discount
+    tax = to_cents(from_cents(taxable_amount) * rule.tax_rate)
+
+    return {
+        "subtotal": subtotal,
+        "discount": discount,
+        "tax": tax,
+        "total": taxable_amount + tax,
+        "currency": "USD",
+    }
+
+
+def _price_large_subtotal(subtotal: Cents, discount: Cents, tax_rate: float) -> dict:
+    """Tail of price_subtotal_cents on floats, for amounts past EXACT_CENTS_LIMIT."""
+    taxable_amount = round_money(from_cents(subtotal) - from_cents(discount))
+    tax = round_money(taxable_amount * tax_rate)
+    return {
+        "subtotal": subtotal,
+        "discount": discount,
+        "tax": to_cents(tax),
+        "total": to_cents(round_money(taxable_amount + tax)),
+        "currency": "USD",
+    }
+
+
 def calculate_total(
-    items: List[dict],
+    items: Items,
     tier: str,
     region: str,
     coupon: Optional[str],
     weekday: int,
+    promotion_pct: float = 0.0,
 ) -> dict:
     """
     Calculate complete pricing for an order.
 
     Args:
-        items: List of order items
+        items: List of order items, or a Cart
         tier: Customer tier
         region: Customer region
         coupon: Optional coupon code
         weekday: Day of week (0=Monday)
+        promotion_pct: Scheduled promotion percentage for the order's day
+            (see app.core.promotions)
 
     Returns:
         Dict with subtotal, discount, tax, and total
     """
-    subtotal = calculate_subtotal(items)
-    discount = compute_discount(tier, region, subtotal, coupon, weekday)
-    taxable_amount = round_money(subtotal - discount)
-    tax = calculate_tax(taxable_amount, region)
-    total = round_money(taxable_amount + tax)
+    return quote_in_dollars(
+        calculate_total_cents(items, tier, region, coupon, weekday, promotion_pct)
+    )
+
 
+def quote_in_dollars(cents: dict) -> dict:
+    """Convert a quote in cents (calculate_total_cents) to dollar floats."""
     return {
-        "subtotal": subtotal,
-        "discount": discount,
-        "tax": tax,
-        "total": total,
+        "subtotal": from_cents(cents["subtotal"]),
+        "discount": from_cents(cents["discount"]),
+        "tax": from_cents(cents["tax"]),
+        "total": from_cents(cents["total"]),
         "currency": "USD",
     }
 
 
+def calculate_subtotal_batch(carts: Sequence[List[dict]]) -> np.ndarray:
+    """
+    Calculate subtotals for many carts at once.
+
+    Line totals are accumulated left to right within each cart, like
+    calculate_subtotal, so float rounding (and hence every cent) matches.
+    Carts are walked column by column in order of decreasing length, which
+    keeps the work proportional to the total number of lines.
+
+    Args:
+        carts: One list of item dicts per order
+
+    Returns:
+        Array of subtotal amounts
+    """
+    lengths = np.fromiter((len(items) for items in carts), dtype=np.intp, count=len(carts))
+    line_count = int(lengths.sum())
+    qty = np.fromiter(
+        (safe_float(item.get("qty"), default=0.0) for items in carts for item in items),
+        dtype=np.float64,
+        count=line_count,
+    )
+    unit_price = np.fromiter(
+        (safe_float(item.get("unit_price"), default=0.0) for items in carts for item in items),
+        dtype=np.float64,
+        count=line_count,
+    )
+    line_totals = qty * unit_price
+
+    by_length = np.argsort(-lengths, kind="stable")
+    sorted_lengths = lengths[by_length]
+    sorted_starts = (np.cumsum(lengths) - lengths)[by_length]
+
+    sums = np.zeros(len(carts))
+    ascending = sorted_lengths[::-1]
+    for position in range(int(sorted_lengths[0]) if len(carts) else 0):
+        active = len(carts) - int(np.searchsorted(ascending, position, side="right"))
+        sums[:active] += line_totals[sorted_starts[:active] + position]
+
+    subtotals = np.empty(len(carts))
+    subtotals[by_length] = sums
+    return round_money_array(subtotals)
+
+
+def calculate_total_batch(
+    orders: Sequence[dict],
+    weekday: Union[int, Sequence[int]],
+    promotion_pct: Union[float, Sequence[float]] = 0.0,
+) -> List[dict]:
+    """
+    Calculate complete pricing for N orders in one vectorized pass.
+
+    Args:
+        orders: Dicts with 'items', 'tier', 'region' and optional 'coupon'
+        weekday: Day of week (0=Monday), shared or one per order
+        promotion_pct: Scheduled promotion percentage, shared or one per order
+
+    Returns:
+        List of dicts with subtotal, discount, tax, and total, identical to
+        calling calculate_total on each order
+    """
+    subtotal = calculate_subtotal_batch([order["items"] for order in orders])
+    priced = price_subtotal_batch(
+        subtotal,
+        tiers=[order["tier"] for order in orders],
+        regions=[order["region"] for order in orders],
+        coupons=[order.get("coupon") for order in orders],
+        weekday=weekday,
+        promotion_pct=promotion_pct,
+    )
+
+    return [
+        {
+            "subtotal": row_subtotal,
+            "discount": row_discount,
+            "tax": row_tax,
+            "total": row_total,
+            "currency": "USD",
+        }
+        for row_subtotal, row_discount, row_tax, row_total in zip(
+            priced["subtotal"].tolist(),
+            priced["discount"].tolist(),
+            priced["tax"].tolist(),
+            priced["total"].tolist(),
+        )
+    ]
+
+
+def price_subtotal_batch(
+    subtotal: np.ndarray,
+    tiers: Sequence[str],
+    regions: Sequence[str],
+    coupons: Sequence[Optional[str]],
+    weekday: Union[int, Sequence[int]],
+    promotion_pct: Union[float, Sequence[float]] = 0.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized discount, tax and total for orders whose subtotals are known.
+
+    Lets callers that price the same orders several times (e.g. the what-if
+    simulator) compute the subtotals once.
+
+    Args:
+        subtotal: Output of calculate_subtotal_batch
+        tiers: Customer tier per order
+        regions: Customer region per order
+        coupons: Optional coupon code per order
+        weekday: Day of week (0=Monday), shared or one per order
+        promotion_pct: Scheduled promotion percentage, shared or one per order
+
+    Returns:
+        Dict of arrays subtotal, discount, tax and total
+    """
+    weekdays = np.broadcast_to(np.asarray(weekday, dtype=np.intp), (len(subtotal),))
+    promotion_pcts = np.broadcast_to(np.asarray(promotion_pct, dtype=np.float64), (len(subtotal),))
+    tax_rates = np.array([TAX_RATES.get(region, 0.08) for region in regions])
+
+    discount = compute_discount_batch(tiers, regions, subtotal, coupons, weekdays, promotion_pcts)
+    taxable_amount = round_money_array(subtotal - discount)
+    tax = round_money_array(taxable_amount * tax_rates)
+    total = round_money_array(taxable_amount + tax)
+
+    return {"subtotal": subtotal, "discount": discount, "tax": tax, "total": total}
+
+
 def get_minimum_order(region: str) -> float:
     """Get minimum order amount for a region."""
     return MIN_ORDER_AMOUNTS.get(region, 5.0)
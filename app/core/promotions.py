@@ -0,0 +1,298 @@
+"""
+Scheduled promotions: extra discount percentages for date ranges,
+optionally limited to some regions and days of the week.
+
+A PromotionCalendar compiles the rules into a table of the summed
+promotion percentage for every (region, day) of a window starting at its
+start date, so a quote finds its day's adjustment with one index and a
+batch finds every order's with one numpy lookup. Days outside the window
+(e.g. historical orders) are evaluated from the rules directly, with the
+same result.
+
+Rules load from a JSON file holding a list of promotions:
+
+    [{"name": "xmas", "start": "2026-12-24", "end": "2026-12-26", "percent": 10,
+      "regions": ["EU", "US"], "weekdays": [5, 6]}]
+
+"end" is inclusive; "regions" and "weekdays" (0=Monday) are optional and
+default to all. Overlapping promotions add up. PromotionReloader rebuilds
+the calendar in a background thread when the file changes or a new day
+starts, and swaps it in with a single assignment, so lookups never wait.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import date
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.lazy import lazy_import
+from app.settings import get_settings
+
+np = lazy_import("numpy")
+
+_KEYS = {"name", "start", "end", "percent", "regions", "weekdays"}
+
+
+class Promotion(NamedTuple):
+    name: str
+    start: date
+    end: date
+    percent: float
+    regions: Tuple[str, ...] = ()
+    weekdays: Tuple[int, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: dict, default_name: str = "promotion") -> "Promotion":
+        """Build a promotion from its JSON form, rejecting unknown keys."""
+        if not isinstance(data, dict):
+            raise ValueError("Promotion must be a JSON object")
+        unknown = set(data) - _KEYS
+        if unknown:
+            raise ValueError(f"Unknown promotion keys: {', '.join(sorted(unknown))}")
+        try:
+            start = date.fromisoformat(data["start"])
+            end = date.fromisoformat(data["end"])
+            percent = float(data["percent"])
+        except KeyError as exc:
+            raise ValueError(f"Promotion needs {exc.args[0]!r}") from None
+        except TypeError as exc:
+            raise ValueError(f"Invalid promotion: {exc}") from None
+        if end < start:
+            raise ValueError("Promotion end must not be before its start")
+        if not 0.0 < percent <= 100.0:
+            raise ValueError("Promotion percent must be in (0, 100]")
+        weekdays = tuple(int(weekday) for weekday in data.get("weekdays", ()))
+        if not all(0 <= weekday <= 6 for weekday in weekdays):
+            raise ValueError("Promotion weekdays must be 0-6")
+        return cls(
+            name=str(data.get("name", default_name)),
+            start=start,
+            end=end,
+            percent=percent,
+            regions=tuple(str(region) for region in data.get("regions", ())),
+            weekdays=weekdays,
+        )
+
+
+class PromotionCalendar:
+    """Immutable (region, day) -> promotion percentage index over `days` days from `start`."""
+
+    def __init__(self, promotions: Sequence[Promotion], start: date, days: int):
+        self.promotions = tuple(promotions)
+        self.start = start
+        self.days = days
+        self._first = start.toordinal()
+
+        # One row per region a promotion names, plus a last row for all others
+        regions = sorted({region for promotion in self.promotions for region in promotion.regions})
+        self._rows = {region: row for row, region in enumerate(regions)}
+        self._other_row = len(regions)
+        self._applies = np.array(
+            [
+                [not promotion.regions or region in promotion.regions for region in regions]
+                + [not promotion.regions]
+                for promotion in self.promotions
+            ],
+            dtype=bool,
+        ).reshape(len(self.promotions), len(regions) + 1)
+        self._bounds = [(promotion.start.toordinal(), promotion.end.toordinal()) for promotion in self.promotions]
+
+        self._table = self._tabulate(self._first, days)
+        # Python floats for scalar lookups (indexing a list beats numpy here)
+        self._lists = [row.tolist() for row in self._table]
+
+    def _row(self, region: str) -> int:
+        return self._rows.get(region, self._other_row)
+
+    def _tabulate(self, first: int, days: int) -> np.ndarray:
+        # Filled by the same code that evaluates single days, so both add the
+        # same percentages in the same order
+        ordinals = np.arange(first, first + days, dtype=np.int64)
+        return np.stack([
+            self._evaluate_many(np.full(days, row, dtype=np.intp), ordinals)
+            for row in range(self._other_row + 1)
+        ])
+
+    def _evaluate_many(self, rows: np.ndarray, ordinals: np.ndarray) -> np.ndarray:
+        result = np.zeros(len(rows))
+        weekdays = (ordinals - 1) % 7  # Ordinal 1 (0001-01-01) was a Monday
+        for promotion, applies, (first, last) in zip(self.promotions, self._applies, self._bounds):
+            mask = applies[rows] & (ordinals >= first) & (ordinals <= last)
+            if promotion.weekdays:
+                mask &= np.isin(weekdays, promotion.weekdays)
+            result += np.where(mask, promotion.percent, 0.0)
+        return result
+
+    def adjustment(self, region: str, day: date) -> float:
+        """Promotion percentage for an order in `region` on `day` (0.0 for none)."""
+        offset = day.toordinal() - self._first
+        if 0 <= offset < self.days:
+            return self._lists[self._row(region)][offset]
+        return float(self._evaluate_many(
+            np.array([self._row(region)]), np.array([day.toordinal()], dtype=np.int64)
+        )[0])
+
+    def adjustments(self, regions: Sequence[str], ordinals) -> np.ndarray:
+        """
+        adjustment for many orders at once.
+
+        Args:
+            regions: Region per order
+            ordinals: date.toordinal() of each order's day, or one shared day
+
+        Returns:
+            Array of promotion percentages
+        """
+        ordinals = np.broadcast_to(np.asarray(ordinals, dtype=np.int64), (len(regions),))
+        if self._rows:
+            rows = np.fromiter((self._row(region) for region in regions), dtype=np.intp, count=len(regions))
+        else:
+            rows = np.full(len(regions), self._other_row, dtype=np.intp)
+        offsets = ordinals - self._first
+        inside = (offsets >= 0) & (offsets < self.days)
+        result = self._table[rows, np.where(inside, offsets, 0)]
+        if not inside.all():
+            outside = ~inside
+            rows, ordinals = rows[outside], ordinals[outside]
+            first = int(ordinals.min())
+            span = int(ordinals.max()) - first + 1
+            if span * (self._other_row + 1) < len(ordinals):
+                # Many orders on few days (e.g. a historical dataset): tabulate those days first
+                result[outside] = self._tabulate(first, span)[rows, ordinals - first]
+            else:
+                result[outside] = self._evaluate_many(rows, ordinals)
+        return result
+
+    @property
+    def end(self) -> date:
+        """Last day covered by the precomputed table."""
+        return date.fromordinal(self._first + self.days - 1)
+
+
+def read_promotion_file(path: str) -> List[Promotion]:
+    """Read a JSON list of promotions."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of promotions")
+    return [Promotion.from_dict(item, default_name=f"promotion-{number}") for number, item in enumerate(data, 1)]
+
+
+def load_promotion_calendar(path: str, days: int, start: Optional[date] = None) -> PromotionCalendar:
+    """Compile the promotions in `path` for `days` days from `start` (default today)."""
+    return PromotionCalendar(read_promotion_file(path), start or date.today(), days)
+
+
+class PromotionReloader:
+    """
+    Background thread that rebuilds the promotion calendar.
+
+    Every `interval` seconds it checks the file's mtime and size and the
+    date; when either changed, a calendar starting today is compiled on
+    this thread and handed to `install`. A file that fails to load leaves
+    the current calendar in place.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        days: int,
+        interval: float,
+        install: Callable[[PromotionCalendar], None],
+        today: Callable[[], date] = date.today,
+    ):
+        self.path = path
+        self.days = days
+        self.interval = interval
+        self._install = install
+        self._today = today
+        self._stop = threading.Event()
+        self._signature = self._stat()
+        self._day = today()
+        self._thread = threading.Thread(target=self._run, name="conto-promotion-reload", daemon=True)
+        self.last_error: Optional[Exception] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self) -> bool:
+        """Rebuild now if the file or the date changed; returns True if a new calendar was installed."""
+        signature = self._stat()
+        today = self._today()
+        if signature is None or (signature == self._signature and today == self._day):
+            return False
+        try:
+            calendar = load_promotion_calendar(self.path, self.days, today)
+        except (OSError, ValueError) as exc:
+            self.last_error = exc
+            return False
+        self._signature = signature
+        self._day = today
+        self.last_error = None
+        self._install(calendar)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+# Process-wide calendar (CONTO_PROMOTION_SOURCE), loaded on first use;
+# None when not configured
+
+_UNLOADED = object()
+_calendar = _UNLOADED
+_calendar_lock = threading.Lock()
+
+
+def get_promotion_calendar() -> Optional[PromotionCalendar]:
+    """The installed promotion calendar, compiling CONTO_PROMOTION_SOURCE on first use."""
+    global _calendar
+    if _calendar is _UNLOADED:
+        with _calendar_lock:
+            if _calendar is _UNLOADED:
+                settings = get_settings()
+                source = settings.promotion_source
+                _calendar = load_promotion_calendar(source, settings.promotion_days) if source else None
+    return _calendar
+
+
+def set_promotion_calendar(calendar: Optional[PromotionCalendar]) -> None:
+    """Install a promotion calendar (None = no promotions)."""
+    global _calendar
+    _calendar = calendar
+
+
+def promotion_adjustment(region: str, day: date) -> float:
+    """Promotion percentage for an order in `region` on `day` under the installed calendar."""
+    calendar = _calendar
+    if calendar is _UNLOADED:
+        calendar = get_promotion_calendar()
+    if calendar is None:
+        return 0.0
+    return calendar.adjustment(region, day)
+
+
+def promotion_adjustments(regions: Sequence[str], ordinals) -> np.ndarray:
+    """promotion_adjustment for many orders; ordinals as for PromotionCalendar.adjustments."""
+    calendar = _calendar
+    if calendar is _UNLOADED:
+        calendar = get_promotion_calendar()
+    if calendar is None:
+        return np.zeros(len(regions))
+    return calendar.adjustments(regions, ordinals)
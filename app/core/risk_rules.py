@@ -0,0 +1,370 @@
+"""
+Declarative fraud risk rules compiled into a decision table.
+
+A rule adds `score` to a transaction's risk (and sets `flag`) when all of
+its conditions hold:
+
+    region / region_not                  region in / not in a list
+    payment_method / payment_method_not  payment method in / not in a list
+    <feature>_above / <feature>_at_most  feature > / <= a value, for each
+                                         numeric feature in FEATURES
+
+Rules load from a JSON file holding a list of them:
+
+    [{"name": "apac-invoice", "region": ["APAC"], "payment_method": ["invoice"],
+      "score": 0.25, "flag": "apac_invoice_review"},
+     {"name": "big-card", "payment_method": ["card"], "amount_above": 5000, "score": 0.2}]
+
+DecisionTable compiles a rule list so evaluating a transaction does not
+walk every rule. Regions and payment methods are mapped to small codes
+(every value no rule names shares one "other" code), and each numeric
+feature is bisected into the intervals between the thresholds rules use.
+Within one (region, method, intervals) cell the same rules match, so
+the cell's result is computed once and then looked up. Matching rules'
+scores are kept in rule order and added one by one, so a score matches
+adding them in an if/elif ladder.
+
+RiskRuleReloader re-reads a rule file in a background thread when it
+changes and hands the rules to a callback, which compiles and swaps in a
+new table with a single assignment.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Numeric features rules can test, in the order evaluate takes them:
+# recent_charges and recent_amount are the user's charge count and charged
+# amount over the velocity windows (app.core.velocity)
+FEATURES = ("amount", "risk_factor", "recent_charges", "recent_amount")
+
+# Flag bitmasks are stored in one byte (see app.core.audit)
+MAX_FLAGS = 8
+
+# Cells kept by a table; cells beyond this are recomputed on every use
+MAX_CELLS = 1 << 16
+
+_CATEGORY_KEYS = ("region", "region_not", "payment_method", "payment_method_not")
+_FEATURE_KEYS = {f"{feature}{suffix}" for feature in FEATURES for suffix in ("_above", "_at_most")}
+_KEYS = {"name", "score", "flag", *_CATEGORY_KEYS, *_FEATURE_KEYS}
+
+
+class RiskRule(NamedTuple):
+    name: str
+    score: float
+    flag: Optional[str] = None
+    region: Tuple[str, ...] = ()
+    region_not: Tuple[str, ...] = ()
+    payment_method: Tuple[str, ...] = ()
+    payment_method_not: Tuple[str, ...] = ()
+    # (feature, threshold) pairs: feature > threshold
+    above: Tuple[Tuple[str, float], ...] = ()
+    # (feature, threshold) pairs: feature <= threshold
+    at_most: Tuple[Tuple[str, float], ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: dict, default_name: str = "rule") -> "RiskRule":
+        """Build a rule from its JSON form, rejecting unknown keys."""
+        if not isinstance(data, dict):
+            raise ValueError("Risk rule must be a JSON object")
+        unknown = set(data) - _KEYS
+        if unknown:
+            raise ValueError(f"Unknown risk rule keys: {', '.join(sorted(unknown))}")
+        if "score" not in data:
+            raise ValueError("Risk rule needs a 'score'")
+        for key in _CATEGORY_KEYS:
+            # A bare string would be taken as a list of its characters
+            if not isinstance(data.get(key, ()), (list, tuple)):
+                raise ValueError(f"Risk rule {key!r} must be a list")
+        try:
+            categories = {key: tuple(str(value) for value in data.get(key, ())) for key in _CATEGORY_KEYS}
+            above = tuple(
+                (feature, float(data[f"{feature}_above"])) for feature in FEATURES if f"{feature}_above" in data
+            )
+            at_most = tuple(
+                (feature, float(data[f"{feature}_at_most"])) for feature in FEATURES if f"{feature}_at_most" in data
+            )
+            score = float(data["score"])
+        except TypeError as exc:
+            raise ValueError(f"Invalid risk rule: {exc}") from None
+        flag = data.get("flag")
+        return cls(
+            name=str(data.get("name", default_name)),
+            score=score,
+            flag=str(flag) if flag is not None else None,
+            above=above,
+            at_most=at_most,
+            **categories,
+        )
+
+
+def _allows(values: Tuple[str, ...], excluded: Tuple[str, ...], value: Optional[str]) -> bool:
+    # value None stands for every value no rule names
+    if values and value not in values:
+        return False
+    return value is None or value not in excluded
+
+
+class DecisionTable:
+    """
+    Immutable compiled rule list.
+
+    Args:
+        rules: Rules in evaluation order
+        flags: Flag names given bits 1, 2, 4, ... in this order; flags of
+            the rules not listed get the next free bits
+    """
+
+    def __init__(self, rules: Sequence[RiskRule], flags: Sequence[str] = ()):
+        self.rules = tuple(rules)
+
+        names = list(dict.fromkeys([*flags, *(rule.flag for rule in self.rules if rule.flag is not None)]))
+        if len(names) > MAX_FLAGS:
+            raise ValueError(f"Risk rules may use at most {MAX_FLAGS} flags, got {len(names)}")
+        self.flag_bits: Dict[str, int] = {name: 1 << bit for bit, name in enumerate(names)}
+        # Bit -> name, in bit order
+        self.flag_names: Dict[int, str] = {bit: name for name, bit in self.flag_bits.items()}
+
+        regions = sorted({value for rule in self.rules for value in (*rule.region, *rule.region_not)})
+        methods = sorted({
+            value for rule in self.rules for value in (*rule.payment_method, *rule.payment_method_not)
+        })
+        self._region_codes = {region: code for code, region in enumerate(regions)}
+        self._method_codes = {method: code for code, method in enumerate(methods)}
+        self._other_region = len(regions)
+        self._other_method = len(methods)
+
+        self._breakpoints: List[List[float]] = [
+            sorted({
+                threshold
+                for rule in self.rules
+                for feature_name, threshold in (*rule.above, *rule.at_most)
+                if feature_name == feature
+            })
+            for feature in FEATURES
+        ]
+        self._breakpoint_arrays = [np.array(points, dtype=np.float64) for points in self._breakpoints]
+
+        # Per rule, the interval range [low, high] each feature must fall in
+        self._ranges: List[List[Tuple[int, int, int]]] = []
+        for rule in self.rules:
+            ranges = []
+            for feature_name, threshold in rule.above:
+                index = FEATURES.index(feature_name)
+                # value > points[k] <=> bisect_left(points, value) > k
+                points = self._breakpoints[index]
+                ranges.append((index, bisect_left(points, threshold) + 1, len(points)))
+            for feature_name, threshold in rule.at_most:
+                index = FEATURES.index(feature_name)
+                # value <= points[k] <=> bisect_left(points, value) <= k
+                ranges.append((index, 0, bisect_left(self._breakpoints[index], threshold)))
+            self._ranges.append(ranges)
+
+        # Rules whose region and payment method conditions hold, per code pair
+        region_values = [*regions, None]
+        method_values = [*methods, None]
+        self._candidates = [
+            [
+                [
+                    number for number, rule in enumerate(self.rules)
+                    if _allows(rule.region, rule.region_not, region)
+                    and _allows(rule.payment_method, rule.payment_method_not, method)
+                ]
+                for method in method_values
+            ]
+            for region in region_values
+        ]
+
+        # Features no rule tests are always in interval 0 and left out of keys
+        self._active = [index for index, points in enumerate(self._breakpoints) if points]
+        self._key = self._key_function()
+
+        # evaluate() results keyed by (region, payment_method, *intervals) and
+        # evaluate_many() results keyed by (region code, method code, *intervals)
+        self._cells: Dict[tuple, Tuple[Tuple[float, ...], int]] = {}
+        self._coded_cells: Dict[tuple, Tuple[Tuple[float, ...], int]] = {}
+
+    def _key_function(self) -> Callable[[str, str, Sequence[float]], tuple]:
+        # Unrolled for the common cases: this runs on every evaluate()
+        active = [(index, self._breakpoints[index]) for index in self._active]
+        if not active:
+            return lambda region, method, features: (region, method)
+        if len(active) == 1:
+            ((first, first_points),) = active
+            return lambda region, method, features: (region, method, bisect_left(first_points, features[first]))
+        if len(active) == 2:
+            ((first, first_points), (second, second_points)) = active
+            return lambda region, method, features: (
+                region, method, bisect_left(first_points, features[first]), bisect_left(second_points, features[second])
+            )
+        return lambda region, method, features: (
+            region, method, *[bisect_left(points, features[index]) for index, points in active]
+        )
+
+    def _compute(
+        self, region_code: int, method_code: int, active_intervals: Sequence[int]
+    ) -> Tuple[Tuple[float, ...], int]:
+        intervals = [0] * len(FEATURES)
+        for index, interval in zip(self._active, active_intervals):
+            intervals[index] = interval
+        scores = []
+        flag_mask = 0
+        for number in self._candidates[region_code][method_code]:
+            if all(low <= intervals[index] <= high for index, low, high in self._ranges[number]):
+                rule = self.rules[number]
+                scores.append(rule.score)
+                if rule.flag is not None:
+                    flag_mask |= self.flag_bits[rule.flag]
+        return (tuple(scores), flag_mask)
+
+    def _cell(self, key: tuple) -> Tuple[Tuple[float, ...], int]:
+        cell = self._compute(
+            self._region_codes.get(key[0], self._other_region),
+            self._method_codes.get(key[1], self._other_method),
+            key[2:],
+        )
+        if len(self._cells) < MAX_CELLS:
+            self._cells[key] = cell
+        return cell
+
+    def _coded_cell(self, key: tuple) -> Tuple[Tuple[float, ...], int]:
+        cell = self._coded_cells.get(key)
+        if cell is None:
+            cell = self._compute(key[0], key[1], key[2:])
+            if len(self._coded_cells) < MAX_CELLS:
+                self._coded_cells[key] = cell
+        return cell
+
+    def evaluate(self, region: str, payment_method: str, features: Sequence[float]) -> Tuple[Tuple[float, ...], int]:
+        """
+        Scores and flags of the rules a transaction matches.
+
+        Args:
+            region: Customer region
+            payment_method: Payment method
+            features: Value of each of FEATURES, in order
+
+        Returns:
+            (scores of the matching rules in rule order, flag bitmask)
+        """
+        key = self._key(region, payment_method, features)
+        cell = self._cells.get(key)
+        if cell is None:
+            cell = self._cell(key)
+        return cell
+
+    def evaluate_many(
+        self,
+        regions: Sequence[str],
+        payment_methods: Sequence[str],
+        features: Sequence[np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        evaluate for many transactions at once.
+
+        Args:
+            regions: Region per transaction
+            payment_methods: Payment method per transaction
+            features: One array per entry of FEATURES
+
+        Returns:
+            (N x K array whose columns are the matching rules' scores in rule
+            order, padded with 0.0; uint8 flag bitmask per transaction)
+        """
+        count = len(regions)
+        region_codes = self._region_codes
+        method_codes = self._method_codes
+        columns = [
+            np.fromiter((region_codes.get(region, self._other_region) for region in regions), np.int64, count),
+            np.fromiter(
+                (method_codes.get(method, self._other_method) for method in payment_methods), np.int64, count
+            ),
+            *[
+                np.searchsorted(self._breakpoint_arrays[index], np.asarray(features[index], dtype=np.float64))
+                for index in self._active
+            ],
+        ]
+        keys, inverse = np.unique(np.stack(columns, axis=1), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        cells = [self._coded_cell(key) for key in map(tuple, keys.tolist())]
+        width = max((len(scores) for scores, _ in cells), default=0)
+        scores = np.zeros((len(cells), width))
+        for row, (cell_scores, _) in enumerate(cells):
+            scores[row, :len(cell_scores)] = cell_scores
+        flag_masks = np.array([flag_mask for _, flag_mask in cells], dtype=np.uint8)
+        return scores[inverse], flag_masks[inverse]
+
+    def flags_from_mask(self, flag_mask: int) -> List[str]:
+        """Decode a flag bitmask into flag names, in bit order."""
+        return [name for bit, name in self.flag_names.items() if flag_mask & bit]
+
+
+def read_risk_rule_file(path: str) -> List[RiskRule]:
+    """Read a JSON list of risk rules."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of risk rules")
+    return [RiskRule.from_dict(item, default_name=f"rule-{number}") for number, item in enumerate(data, 1)]
+
+
+class RiskRuleReloader:
+    """
+    Background thread that reloads a risk rule file when it changes.
+
+    Polls the file's mtime and size every `interval` seconds. The rules are
+    read on this thread and handed to `install`; a file that fails to load
+    (or that `install` rejects with ValueError) leaves the current rules in
+    place.
+    """
+
+    def __init__(self, path: str, interval: float, install: Callable[[List[RiskRule]], object]):
+        self.path = path
+        self.interval = interval
+        self._install = install
+        self._stop = threading.Event()
+        self._signature = self._stat()
+        self._thread = threading.Thread(target=self._run, name="conto-risk-rule-reload", daemon=True)
+        self.last_error: Optional[Exception] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self) -> bool:
+        """Reload now if the file changed; returns True if new rules were installed."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        try:
+            self._install(read_risk_rule_file(self.path))
+        except (OSError, ValueError) as exc:
+            self.last_error = exc
+            return False
+        self._signature = signature
+        self.last_error = None
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
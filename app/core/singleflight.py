@@ -0,0 +1,143 @@
+"""
+Single-flight request coalescing.
+
+When several callers ask for the same key while a computation for it is
+already running, they wait for that computation and share its result (or
+its exception) instead of each computing it again. Nothing is cached: once
+the computation finishes, the next call for the key starts a new one.
+
+SingleFlight coalesces calls from threads (the thread pool executor).
+AsyncSingleFlight coalesces coroutines on an event loop, before work is
+handed to an executor, which also covers the process pool and keeps
+duplicate requests from taking executor slots at all.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+from app.core.instrumentation import labelled_metric_lines, register_collector
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        # Held by the leader until the result is in; followers block on it
+        self.done = threading.Lock()
+        self.done.acquire()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key across threads.
+
+    `share`, if given, is applied to the result handed to each caller that
+    joined another's call (e.g. to give it a copy of a mutable result).
+    """
+
+    def __init__(self, name: str, share: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self._share = share
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        _flights.append(self)
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args: Any) -> T:
+        """Return fn(*args), or the result of the in-flight call for key if there is one."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            with call.done:
+                pass
+            if call.error is not None:
+                raise call.error
+            return call.result if self._share is None else self._share(call.result)
+
+        try:
+            call.result = fn(*args)
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.release()
+        return call.result
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """Coalesce concurrent awaits with the same key on an event loop."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+        _flights.append(self)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await factory(), or the in-flight call for key if there is one.
+
+        The shared computation runs as its own task, so a caller that is
+        cancelled (e.g. its client disconnected) does not cancel it for
+        the others.
+        """
+        # Futures belong to one loop; keep calls from different loops apart
+        key = (asyncio.get_running_loop(), key)
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = self._calls[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved even if every caller went away
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+_flights: List[Any] = []
+
+
+def _coalescing_metrics() -> List[str]:
+    flights = list(_flights)
+    return [
+        *labelled_metric_lines(
+            "conto_singleflight_calls_total", "Computations started per coalescing point.", "counter",
+            (({"flight": flight.name}, flight.calls) for flight in flights),
+        ),
+        *labelled_metric_lines(
+            "conto_singleflight_coalesced_total",
+            "Calls that shared an in-flight computation instead of starting one.", "counter",
+            (({"flight": flight.name}, flight.coalesced) for flight in flights),
+        ),
+    ]
+
+
+register_collector(_coalescing_metrics)
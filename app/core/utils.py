@@ -1,16 +1,70 @@
 """Utility functions - well-tested module."""
 
+from __future__ import annotations
+
+import math
 from decimal import ROUND_HALF_UP, Decimal
 from typing import Optional
 
+from app.core.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+# round_half_up is exact below this many units; beyond it floats are too
+# coarse for the shortcut and Decimal takes over.
+_FAST_ROUNDING_LIMIT = 1e13
+
+
+def round_half_up(value: float, decimals: int = 2) -> int:
+    """
+    Round a value half-up to a whole number of 10**-decimals units (e.g. cents).
+
+    Rounds the shortest decimal repr of the float, like Decimal(str(value)),
+    but with integer arithmetic: that repr is at or past the half-unit
+    boundary exactly when the float is at or past the float nearest it.
+    """
+    scale = 10 ** decimals
+    magnitude = abs(value)
+    if decimals >= 0 and magnitude * scale < _FAST_ROUNDING_LIMIT:
+        units = int(magnitude * scale)
+        if magnitude >= (2 * units + 1) / (2 * scale):
+            units += 1
+        return -units if value < 0 else units
+    d = Decimal(str(value)).quantize(Decimal(10) ** -decimals, rounding=ROUND_HALF_UP)
+    return int(d.scaleb(decimals))
+
 
 def round_money(value: float, decimals: int = 2) -> float:
     """Round a monetary value to specified decimal places using banker's rounding."""
+    scale = 10 ** decimals
+    if decimals >= 0 and abs(value) * scale < _FAST_ROUNDING_LIMIT:
+        return math.copysign(round_half_up(value, decimals) / scale, value)
     d = Decimal(str(value))
     rounded = d.quantize(Decimal(10) ** -decimals, rounding=ROUND_HALF_UP)
     return float(rounded)
 
 
+def round_money_array(values: np.ndarray, decimals: int = 2) -> np.ndarray:
+    """
+    Vectorized round_money: element-wise identical results for a float array.
+
+    Uses the same boundary comparison as round_half_up; values outside its
+    exact range fall back to round_money.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** decimals
+    magnitude = np.abs(values)
+    with np.errstate(invalid="ignore", over="ignore"):
+        units = np.floor(magnitude * scale)
+        units += magnitude >= (2.0 * units + 1.0) / (2.0 * scale)
+        result = np.copysign(units / scale, values)
+        slow = ~(magnitude * scale < _FAST_ROUNDING_LIMIT)
+    if slow.any():
+        result[slow] = [round_money(v, decimals) for v in values[slow].tolist()]
+    return result
+
+
 def normalize_coupon(coupon: Optional[str]) -> Optional[str]:
     """Normalize coupon code: uppercase and strip whitespace."""
     if coupon is None:
@@ -34,6 +88,56 @@ def safe_float(value: any, default: float = 0.0) -> float:
         return default
 
 
+class VersionedDict(dict):
+    """
+    Dict that bumps ``version`` on every mutation.
+
+    Used for the pricing/policy tables so that anything compiled from them
+    can cheaply tell when it is stale.
+    """
+
+    version = 0
+
+    def _touch(self) -> None:
+        self.version += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._touch()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._touch()
+
+    def __ior__(self, other):
+        result = super().__ior__(other)
+        self._touch()
+        return result
+
+    def clear(self):
+        super().clear()
+        self._touch()
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        self._touch()
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        self._touch()
+        return result
+
+    def setdefault(self, key, default=None):
+        result = super().setdefault(key, default)
+        self._touch()
+        return result
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._touch()
+
+
 def clamp(value: float, min_val: float, max_val: float) -> float:
     """Clamp a value between min and max bounds."""
     return max(min_val, min(max_val, value))
@@ -42,3 +146,4 @@ def clamp(value: float, min_val: float, max_val: float) -> float:
 def calculate_percentage(amount: float, percentage: float) -> float:
     """Calculate a percentage of an amount."""
     return round_money(amount * (percentage / 100.0))
+
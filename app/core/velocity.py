@@ -0,0 +1,147 @@
+"""
+Per-user charge velocity: how many charges a user made in the last few
+minutes and how much they charged in the last hour.
+
+Time is cut into buckets of bucket_seconds. Each tracked user holds one
+array of (bucket, count, cents) triples for the buckets they charged in,
+oldest first, after the cents total of the amount window:
+
+    [amount_window_cents, bucket, count, cents, bucket, count, cents, ...]
+
+Recording a charge adds to the last triple or appends one, drops the
+triples that fell out of the amount window from the front (adjusting the
+total) and sums the few triples of the count window from the back. Each
+triple is appended and dropped once and the count window spans a fixed
+number of buckets, so a charge costs O(1). Memory follows the buckets a
+user charged in, not the number of charges. Windows are exact to one
+bucket: a window of N buckets covers the current, partly elapsed bucket
+and the N - 1 before it.
+
+Amounts are kept in integer cents so the running totals never drift.
+Users are kept in least-recently-charged order. Every recorded charge
+first drops the users with nothing left in the amount window, and the
+least recently charged are evicted beyond maxsize.
+"""
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Tuple
+
+
+class VelocityTracker:
+    """
+    Bounded in-memory sliding-window charge counters keyed by user ID.
+
+    Args:
+        count_seconds: Window of the charge count
+        amount_seconds: Window of the charged amount (at least count_seconds)
+        bucket_seconds: Bucket width, the windows' resolution
+        maxsize: Max users tracked at once
+        clock: Seconds from a monotonic clock
+    """
+
+    def __init__(
+        self,
+        count_seconds: float,
+        amount_seconds: float,
+        bucket_seconds: float,
+        maxsize: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if bucket_seconds <= 0:
+            raise ValueError("bucket_seconds must be > 0")
+        if not bucket_seconds <= count_seconds <= amount_seconds:
+            raise ValueError("Velocity windows need bucket_seconds <= count_seconds <= amount_seconds")
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.count_seconds = count_seconds
+        self.amount_seconds = amount_seconds
+        self.bucket_seconds = bucket_seconds
+        self.maxsize = maxsize
+        self._count_buckets = round(count_seconds / bucket_seconds)
+        self._amount_buckets = round(amount_seconds / bucket_seconds)
+        self._clock = clock
+        self._users: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._idle_cutoff = None
+        self.evicted_idle = 0
+        self.evicted_full = 0
+
+    def _evict_idle(self, cutoff: int) -> None:
+        self._idle_cutoff = cutoff
+        # The front user charged least recently; its last triple is its newest
+        while self._users:
+            oldest = next(iter(self._users.values()))
+            if oldest[-3] > cutoff:
+                break
+            self._users.popitem(last=False)
+            self.evicted_idle += 1
+
+    def record(self, user_id: str, cents: int) -> Tuple[int, int]:
+        """
+        Record a charge and read the user's velocity, this charge included.
+
+        Returns:
+            (charges in the count window, cents charged in the amount window)
+        """
+        with self._lock:
+            bucket = int(self._clock() // self.bucket_seconds)
+            cutoff = bucket - self._amount_buckets
+            users = self._users
+            if cutoff != self._idle_cutoff:
+                # Users only become idle when the cutoff moves to a new bucket
+                self._evict_idle(cutoff)
+            entry = users.get(user_id)
+            if entry is None:
+                entry = users[user_id] = array("q", (0,))
+                if len(users) > self.maxsize:
+                    users.popitem(last=False)
+                    self.evicted_full += 1
+            else:
+                # Still has a triple in the window (idle users were evicted above)
+                users.move_to_end(user_id)
+                if entry[1] <= cutoff:
+                    end = 1
+                    while entry[end] <= cutoff:
+                        entry[0] -= entry[end + 2]
+                        end += 3
+                    del entry[1:end]
+
+            if len(entry) > 1 and entry[-3] == bucket:
+                entry[-2] += 1
+                entry[-1] += cents
+            else:
+                entry.extend((bucket, 1, cents))
+            entry[0] += cents
+
+            count = 0
+            count_cutoff = bucket - self._count_buckets
+            index = len(entry) - 3
+            while index >= 1 and entry[index] > count_cutoff:
+                count += entry[index + 1]
+                index -= 3
+            return (count, entry[0])
+
+    def record_many(self, charges: Iterable[Tuple[str, int]]) -> Tuple[List[int], List[int]]:
+        """record for (user_id, cents) pairs in order; returns (counts, cents) lists."""
+        counts = []
+        amounts = []
+        for user_id, cents in charges:
+            count, amount = self.record(user_id, cents)
+            counts.append(count)
+            amounts.append(amount)
+        return counts, amounts
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._users),
+                "maxsize": self.maxsize,
+                "evicted_idle": self.evicted_idle,
+                "evicted_full": self.evicted_full,
+            }
@@ -1,19 +1,115 @@
 """FastAPI application entry point."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
+from app.api import carts
+from app.api.admission import AdmissionMiddleware, admission_middleware_options
+from app.api.executor import shutdown_executor
 from app.api.routes import router
+from app.core import instrumentation, policy
+from app.core.audit import close_audit_log
+from app.core.coupons import CouponReloader
+from app.core.pricing import current_pricing_rules
+from app.core.promotions import PromotionReloader, get_promotion_calendar, set_promotion_calendar
+from app.core.risk_rules import RiskRuleReloader
+from app.services.fraud import get_risk_table, preload_risk_factors, set_risk_rules
+from app.settings import get_settings
+
+
+_warmed = False
+
+
+def warm_caches() -> None:
+    """
+    Load the coupon catalog, compile pricing rules, the promotion calendar
+    and the risk rules and preload configured risk factors, once.
+
+    app.serve calls this in the parent before forking workers, so the warm
+    state is inherited copy-on-write and the workers' lifespans skip it.
+    """
+    global _warmed
+    if _warmed:
+        return
+    policy.get_coupon_store()
+    current_pricing_rules()
+    get_promotion_calendar()
+    get_risk_table()
+    settings = get_settings()
+    if settings.risk_preload_path:
+        preload_risk_factors(settings.risk_preload_path)
+    _warmed = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm in-process caches and start the coupon, promotion and risk rule
+    reloaders before serving; stop them and the executor and flush the
+    audit log on shutdown.
+    """
+    warm_caches()
+    settings = get_settings()
+    reloader = None
+    if settings.coupon_source and settings.coupon_reload_seconds:
+        reloader = CouponReloader(
+            settings.coupon_source, settings.coupon_reload_seconds, policy.set_coupon_store
+        )
+        reloader.start()
+    promotion_reloader = None
+    if settings.promotion_source and settings.promotion_reload_seconds:
+        promotion_reloader = PromotionReloader(
+            settings.promotion_source,
+            settings.promotion_days,
+            settings.promotion_reload_seconds,
+            set_promotion_calendar,
+        )
+        promotion_reloader.start()
+    risk_rule_reloader = None
+    if settings.risk_rules and settings.risk_rules_reload_seconds:
+        risk_rule_reloader = RiskRuleReloader(
+            settings.risk_rules, settings.risk_rules_reload_seconds, set_risk_rules
+        )
+        risk_rule_reloader.start()
+    yield
+    if reloader is not None:
+        reloader.stop()
+    if promotion_reloader is not None:
+        promotion_reloader.stop()
+    if risk_rule_reloader is not None:
+        risk_rule_reloader.stop()
+    shutdown_executor()
+    close_audit_log()
+
 
 app = FastAPI(
     title="Conto Test App",
     description="A sandbox application for testing Conto PR review signals",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.include_router(router)
+app.include_router(carts.router)
+
+if instrumentation.ENABLED or instrumentation.PROFILE_EVERY:
+    app.add_middleware(instrumentation.InstrumentationMiddleware)
+
+# Added last so it runs first: shed load before any other work is done
+_admission = admission_middleware_options()
+if _admission is not None:
+    app.add_middleware(AdmissionMiddleware, **_admission)
 
 
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
     return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics (stage histograms are empty unless instrumentation is on)."""
+    return PlainTextResponse(instrumentation.render_prometheus(), media_type="text/plain; version=0.0.4")
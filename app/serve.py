@@ -0,0 +1,175 @@
+"""
+Pre-forking multi-worker server.
+
+    conto-serve --workers 4 --port 8000
+    python -m app.serve
+
+The parent imports the app, warms the pricing rules and risk-factor cache,
+freezes the heap out of the garbage collector and binds the listening
+socket. It then forks the workers, each running its own uvicorn Server on
+the shared socket. Warm state is therefore built once and shared
+copy-on-write instead of being rebuilt per worker. The parent restarts
+workers that die and stops them all on SIGINT/SIGTERM.
+
+Per-worker state that is filled at runtime (the quote cache, executors)
+is still private to each worker.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from app.core.lazy import preload
+from app.main import app, warm_caches
+from app.settings import get_settings
+
+# Workers that die this soon after starting are not restarted
+_CRASH_LOOP_SECONDS = 1.0
+
+
+def default_workers() -> int:
+    """Number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Bind a listening TCP socket that forked workers can share."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, config: uvicorn.Config) -> None:
+    # Forget the parent's handlers; uvicorn installs its own
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(sock: socket.socket, config: uvicorn.Config) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(sock, config)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        os._exit(code)
+    return pid
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    workers: int = 0,
+    backlog: int = 2048,
+    log_level: str = "info",
+) -> int:
+    """
+    Warm caches, then serve the app from `workers` forked processes.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+        workers: Worker processes; 0 means default_workers()
+        backlog: Listen backlog of the shared socket
+        log_level: uvicorn log level
+
+    Returns:
+        Exit status: 0 after a clean shutdown, 1 if workers kept crashing
+    """
+    workers = workers or default_workers()
+
+    warm_caches()
+    # Deferred at import for cold start; load it once here so workers share it
+    preload("numpy")
+    # Objects that exist now are never collected; keeping the collector off
+    # them stops it dirtying (and so un-sharing) their pages in every worker
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(host, port, backlog)
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+
+    if workers == 1:
+        uvicorn.Server(config).run(sockets=[sock])
+        return 0
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    children: Dict[int, float] = {}
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        children[_spawn(sock, config)] = time.monotonic()
+
+    status = 0
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        if time.monotonic() - started < _CRASH_LOOP_SECONDS:
+            print(f"worker {pid} exited during startup; shutting down", file=sys.stderr)
+            status = 1
+            stop(signal.SIGTERM, None)
+            continue
+        children[_spawn(sock, config)] = time.monotonic()
+
+    sock.close()
+    return status
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(
+        prog="conto-serve",
+        description="Serve the app from pre-forked workers sharing warm caches.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.workers,
+        help="Worker processes (default: CONTO_WORKERS, or one per CPU)",
+    )
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    if args.workers < 0:
+        parser.error("--workers must be >= 0")
+
+    return serve(args.host, args.port, args.workers, args.backlog, args.log_level)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,326 @@
 """Billing service - orchestrates pricing and fraud checks."""
 
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, Hashable, List, Optional
 
-from app.core.pricing import calculate_total
-from app.core.utils import round_money
-from app.services.fraud import assess_risk, get_risk_reason
+from app.core.audit import get_audit_log
+from app.core.cart import Cart
+from app.core.instrumentation import metric_lines, register_collector, timed
+from app.core.money import to_cents
+from app.core.policy import is_eligible_for_promotion
+from app.core.singleflight import SingleFlight
+from app.core.pricing import (
+    Items,
+    calculate_total,
+    calculate_total_batch,
+    pricing_rules_version,
+)
+from app.core.promotions import promotion_adjustment, promotion_adjustments
+from app.core.utils import normalize_coupon, round_money, safe_float
+from app.services.customers import CustomerProfile, get_customer_store
+from app.services.fraud import (
+    assess_risk,
+    assess_risk_many,
+    get_risk_reason,
+    get_risk_reasons,
+)
+from app.settings import get_settings
 
 
+class QuoteCache:
+    """
+    Size-bounded LRU cache of quote results with a TTL.
+
+    Every lookup carries the pricing_rules_version() it was made under; when
+    that changes, the whole cache is dropped, so a cached quote never
+    outlives the pricing and policy tables it was computed from.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._version: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, version: tuple) -> Optional[dict]:
+        """Cached result for key, or None on a miss."""
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                    self._entries.clear()
+                self._version = version
+
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, result = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: Hashable, result: dict, version: tuple) -> None:
+        """Store a result computed under `version`, evicting the least recently used."""
+        with self._lock:
+            if version != self._version:
+                return  # Tables changed while this result was being computed
+            self._entries[key] = (self._clock() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters and occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+def _new_quote_cache(maxsize: int, ttl: float) -> Optional[QuoteCache]:
+    return QuoteCache(maxsize, ttl) if maxsize > 0 else None
+
+
+_quote_cache = _new_quote_cache(get_settings().quote_cache_size, get_settings().quote_cache_ttl)
+
+
+def configure_quote_cache(maxsize: int, ttl: Optional[float] = None) -> None:
+    """Replace the quote cache with an empty one; maxsize 0 disables caching."""
+    global _quote_cache
+    if ttl is None:
+        ttl = get_settings().quote_cache_ttl
+    _quote_cache = _new_quote_cache(maxsize, ttl)
+
+
+def quote_cache_stats() -> dict:
+    """Counters of the quote cache (all zero when caching is disabled)."""
+    if _quote_cache is None:
+        return QuoteCache(0, 1.0).stats()
+    return _quote_cache.stats()
+
+
+def _quote_cache_metrics() -> List[str]:
+    stats = quote_cache_stats()
+    return [
+        *metric_lines("conto_quote_cache_hits_total", "Quote cache hits.", "counter", stats["hits"]),
+        *metric_lines("conto_quote_cache_misses_total", "Quote cache misses.", "counter", stats["misses"]),
+        *metric_lines("conto_quote_cache_evictions_total", "Quotes evicted by LRU.", "counter", stats["evictions"]),
+        *metric_lines("conto_quote_cache_size", "Quotes in the cache.", "gauge", stats["size"]),
+        *metric_lines("conto_quote_cache_hit_ratio", "Quote cache hits / lookups.", "gauge", stats["hit_rate"]),
+    ]
+
+
+register_collector(_quote_cache_metrics)
+
+
+def quote_cache_key(
+    tier: str,
+    region: str,
+    items: Items,
+    coupon: Optional[str],
+    weekday: int,
+    promotion_pct: float = 0.0,
+) -> tuple:
+    """
+    Canonical cache key for a quote.
+
+    Items are reduced to the (qty, unit_price) pairs pricing reads, so SKUs
+    and coupon formatting don't cause misses. Line order is kept: the float
+    subtotal is summed in item order, and a reordered cart can round to a
+    different cent.
+    """
+    if isinstance(items, Cart):
+        return (tier, region, tuple(items.lines()), normalize_coupon(coupon), weekday, promotion_pct)
+    try:
+        lines = tuple([(item["qty"], item["unit_price"]) for item in items])
+        hash(lines)
+    except (KeyError, TypeError):
+        # Missing or odd values: key on what pricing would read instead
+        lines = tuple(
+            (safe_float(item.get("qty"), default=0.0), safe_float(item.get("unit_price"), default=0.0))
+            for item in items
+        )
+    return (tier, region, lines, normalize_coupon(coupon), weekday, promotion_pct)
+
+
+# Concurrent identical quotes share one computation (CONTO_COALESCE)
+COALESCE = get_settings().coalesce_requests
+_quote_flight = SingleFlight("quote")
+
+
+def quote_request_key(
+    tier: str,
+    region: str,
+    cart: Cart,
+    coupon: Optional[str],
+) -> tuple:
+    """
+    Cheap key identifying a /quote request priced now, for coalescing.
+
+    Unlike quote_cache_key it compares the cart's columns as bytes, so it
+    costs almost nothing to build on the event loop.
+    """
+    now = datetime.now()
+    return (
+        tier,
+        region,
+        normalize_coupon(coupon),
+        now.weekday(),
+        promotion_adjustment(region, now.date()),
+        cart.fingerprint(),
+    )
+
+
+def _price_keyed(key: tuple, items: Items, tier: str, region: str, coupon: Optional[str]) -> dict:
+    # Carts with the same key have the same lines in the same order, so
+    # pricing the items as received gives every one of them the same answer
+    return calculate_total(
+        items=items,
+        tier=tier,
+        region=region,
+        coupon=coupon,
+        weekday=key[4],
+        promotion_pct=key[5],
+    )
+
+
+def _add_promotion_eligibility(quote: dict, profile: Optional[CustomerProfile]) -> None:
+    # Only customers with a stored profile get the flag
+    if profile is not None:
+        quote["promotion_eligible"] = is_eligible_for_promotion(
+            profile.tier, profile.region, profile.order_count
+        )
+
+
+@timed("quote")
 def create_quote(
     user_id: str,
     tier: str,
     region: str,
-    items: List[dict],
+    items: Items,
     coupon: Optional[str] = None,
 ) -> dict:
     """
     Create a price quote for an order.
 
+    Repeated quotes for the same cart are served from the quote cache
+    (see quote_cache_key) until they expire or the pricing tables change,
+    and concurrent misses for the same cart share one computation. The
+    result is recorded in the audit log when one is configured.
+
+    Today's scheduled promotions (CONTO_PROMOTION_SOURCE) for the region
+    come from the precomputed promotion calendar.
+
+    When customer profiles are configured (CONTO_CUSTOMER_DB) and the user
+    has one, the quote also says whether they are eligible for promotions,
+    from their stored tier and order history.
+
     Args:
         user_id: Customer identifier
         tier: Customer tier (free, pro, enterprise)
         region: Customer region (EU, US, APAC)
-        items: List of order items
+        items: List of order items, or a Cart
         coupon: Optional coupon code
 
     Returns:
-        Quote with subtotal, discount, tax, and total
+        Quote with subtotal, discount, tax, and total (plus
+        promotion_eligible for customers with a profile)
     """
-    # Use current weekday for discount calculation
-    weekday = datetime.now().weekday()
+    # Today's weekday and scheduled promotions drive the date-based discounts
+    now = datetime.now()
+    weekday = now.weekday()
+    promotion_pct = promotion_adjustment(region, now.date())
 
-    pricing = calculate_total(
-        items=items,
-        tier=tier,
-        region=region,
-        coupon=coupon,
-        weekday=weekday,
-    )
+    cache = _quote_cache
+    if cache is None and not COALESCE:
+        result = calculate_total(
+            items=items,
+            tier=tier,
+            region=region,
+            coupon=coupon,
+            weekday=weekday,
+            promotion_pct=promotion_pct,
+        )
+    else:
+        key = quote_cache_key(tier, region, items, coupon, weekday, promotion_pct)
+        version = pricing_rules_version()
+        pricing = cache.get(key, version) if cache is not None else None
+        if pricing is None:
+            if COALESCE:
+                pricing = _quote_flight.do(
+                    (key, version), _price_keyed, key, items, tier, region, coupon
+                )
+            else:
+                pricing = _price_keyed(key, items, tier, region, coupon)
+            if cache is not None:
+                cache.put(key, pricing, version)
+        result = dict(pricing)
+
+    customers = get_customer_store()
+    if customers is not None:
+        _add_promotion_eligibility(result, customers.get(user_id))
+
+    audit = get_audit_log()
+    if audit is not None:
+        audit.record_quote(user_id, tier, region, result)
+    return result
 
-    return pricing
 
+def create_quote_batch(orders: List[dict]) -> List[dict]:
+    """
+    Create price quotes for many orders in one call.
+
+    Args:
+        orders: Dicts with user_id, tier, region, items and optional coupon
 
+    Returns:
+        One quote per order, in input order
+    """
+    # Today's weekday and scheduled promotions drive the date-based discounts
+    now = datetime.now()
+    promotion_pcts = promotion_adjustments([order["region"] for order in orders], now.toordinal())
+
+    quotes = calculate_total_batch(orders, weekday=now.weekday(), promotion_pct=promotion_pcts)
+
+    customers = get_customer_store()
+    if customers is not None:
+        profiles = customers.get_many(order["user_id"] for order in orders)
+        for order, quote in zip(orders, quotes):
+            _add_promotion_eligibility(quote, profiles.get(order["user_id"]))
+
+    audit = get_audit_log()
+    if audit is not None:
+        for order, quote in zip(orders, quotes):
+            audit.record_quote(order["user_id"], order["tier"], order["region"], quote)
+    return quotes
+
+
+@timed("charge")
 def charge(
     user_id: str,
     amount: float,
@@ -52,6 +331,9 @@ def charge(
     """
     Process a charge request.
 
+    When customer profiles are configured, an approved charge is added to
+    the customer's order history.
+
     Args:
         user_id: Customer identifier
         amount: Charge amount
@@ -74,8 +356,64 @@ def charge(
     approved = not risk_result["is_high_risk"]
     reason = get_risk_reason(risk_result)
 
-    return {
+    result = {
         "approved": approved,
         "reason": reason,
         "risk_score": round_money(risk_result["risk_score"]),
     }
+
+    customers = get_customer_store()
+    if customers is not None and approved:
+        customers.record_orders([(user_id, to_cents(amount))])
+
+    audit = get_audit_log()
+    if audit is not None:
+        audit.record_charge(user_id, region, payment_method, amount, result, risk_result["flag_mask"])
+    return result
+
+
+def charge_batch(charges: List[dict], include_flags: bool = False) -> List[dict]:
+    """
+    Process many charge requests at once.
+
+    Args:
+        charges: Dicts with user_id, amount, currency, payment_method and region
+        include_flags: Include the list of risk flag names for each charge
+
+    Returns:
+        One charge result per request, in input order
+    """
+    risk = assess_risk_many(
+        user_ids=[c["user_id"] for c in charges],
+        amounts=[c["amount"] for c in charges],
+        regions=[c["region"] for c in charges],
+        payment_methods=[c["payment_method"] for c in charges],
+        include_flags=include_flags,
+    )
+
+    reasons = get_risk_reasons(risk["is_high_risk"], risk["is_medium_risk"])
+    results = [
+        {"approved": not high_risk, "reason": reason, "risk_score": risk_score}
+        for high_risk, reason, risk_score in zip(
+            risk["is_high_risk"].tolist(), reasons, risk["risk_score"].tolist()
+        )
+    ]
+    if include_flags:
+        for result, flags in zip(results, risk["flags"]):
+            result["flags"] = flags
+
+    customers = get_customer_store()
+    if customers is not None:
+        customers.record_orders(
+            (request["user_id"], to_cents(request["amount"]))
+            for request, result in zip(charges, results) if result["approved"]
+        )
+
+    audit = get_audit_log()
+    if audit is not None:
+        for request, result, flag_mask in zip(charges, results, risk["flag_mask"].tolist()):
+            audit.record_charge(
+                request["user_id"], request["region"], request["payment_method"],
+                request["amount"], result, flag_mask,
+            )
+    return results
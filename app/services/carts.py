@@ -0,0 +1,296 @@
+"""
+Cart sessions - incremental re-pricing.
+
+A session keeps its lines keyed by SKU, in insertion order, and a running
+subtotal that matches create_quote to the cent: the float sum of
+qty * unit_price added left to right, rounded to cents.
+
+Changing a line in the middle of that float sum changes every rounding
+after it, so the session also keeps the exact sum of the line totals (an
+integer count of 2**-1074 units), which adding, replacing or removing a
+line updates in O(1). The left-to-right float sum of n lines is within
+n * 2**-53 * (sum of the line totals) of the exact one. Unless that bound
+reaches the nearest half cent, both round to the same cent and the exact
+sum gives the subtotal. Otherwise the lines are re-summed left to right;
+with cent prices the exact sum sits next to a whole cent, so this does
+not happen. Only the discount/tax tail is priced on top
+(pricing.price_subtotal_cents).
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.instrumentation import metric_lines, register_collector
+from app.core.money import to_cents
+from app.core.pricing import price_subtotal_cents, quote_in_dollars
+from app.core.promotions import promotion_adjustment
+from app.settings import get_settings
+
+# Every finite float is an integer multiple of 2**-1074
+_UNIT_SHIFT = 1074
+_ONE = 1 << _UNIT_SHIFT
+# The exact sum is only rounded directly well inside the amounts to_cents
+# rounds as floats (round_half_up's fast path)
+_EXACT_CENTS_LIMIT = 1e10
+
+
+def _to_units(value: float) -> int:
+    numerator, denominator = value.as_integer_ratio()
+    return numerator << (_UNIT_SHIFT - denominator.bit_length() + 1)
+
+
+class DuplicateLineError(ValueError):
+    """A line with this SKU is already in the cart."""
+
+
+class _LineSum:
+    """
+    A cart's subtotal in cents, as create_quote sums its lines.
+
+    Holds the exact sum of the line totals, the exact sum of their
+    magnitudes for the error bound, and the left-to-right float sum while
+    it is known (it is extended by appended lines and lost when a line
+    changes).
+    """
+
+    __slots__ = ("_units", "_abs_units", "_nonfinite", "_float_sum")
+
+    def __init__(self):
+        self._units = 0
+        self._abs_units = 0
+        self._nonfinite = 0
+        self._float_sum: Optional[float] = 0.0
+
+    def _update(self, term: float, sign: int) -> None:
+        if math.isfinite(term):
+            units = _to_units(term)
+            self._units += sign * units
+            self._abs_units += sign * abs(units)
+        else:
+            self._nonfinite += sign
+
+    def append(self, term: float) -> None:
+        self._update(term, 1)
+        if self._float_sum is not None:
+            self._float_sum += term
+
+    def replace(self, old: float, new: float) -> None:
+        self._update(old, -1)
+        self._update(new, 1)
+        self._float_sum = None
+
+    def remove(self, term: float) -> None:
+        self._update(term, -1)
+        self._float_sum = None
+
+    def _exact_cents(self, count: int) -> Optional[int]:
+        """The subtotal from the exact sum, or None if rounding could differ."""
+        magnitude = self._abs_units / _ONE
+        if self._nonfinite or magnitude >= _EXACT_CENTS_LIMIT:
+            return None
+        # |sum| * 200 in units: half cents are where its integer part is odd
+        scaled = abs(self._units) * 200
+        half_cents = scaled >> _UNIT_SHIFT
+        rest = scaled & (_ONE - 1)
+        distance = min(rest, 2 * _ONE - rest) if half_cents & 1 else _ONE - rest
+        # The float sum's error, plus to_cents comparing against the float
+        # nearest the half cent rather than the half cent itself
+        bound = (count + 2) * magnitude * 2.0 ** -52
+        if distance / (200 * _ONE) <= bound:
+            return None
+        cents = (half_cents + 1) >> 1
+        return -cents if self._units < 0 else cents
+
+    def _resum(self, lines: Iterable[Tuple[int, float]]) -> float:
+        # The same left-to-right float sum as pricing.calculate_subtotal
+        total = 0.0
+        for qty, unit_price in lines:
+            total += qty * unit_price
+        return total
+
+    def cents(self, lines: Dict[str, Tuple[int, float]]) -> int:
+        if self._float_sum is None:
+            cents = self._exact_cents(len(lines))
+            if cents is not None:
+                return cents
+            self._float_sum = self._resum(lines.values())
+        return to_cents(self._float_sum)
+
+
+class CartSession:
+    """One shopping cart and its running subtotal."""
+
+    __slots__ = ("cart_id", "user_id", "tier", "region", "coupon", "lines", "_line_sum", "last_used")
+
+    def __init__(self, cart_id: str, user_id: str, tier: str, region: str, coupon: Optional[str]):
+        self.cart_id = cart_id
+        self.user_id = user_id
+        self.tier = tier
+        self.region = region
+        self.coupon = coupon
+        # sku -> (qty, unit_price), in insertion order
+        self.lines: Dict[str, Tuple[int, float]] = {}
+        self._line_sum = _LineSum()
+        self.last_used = 0.0
+
+    def add_line(self, sku: str, qty: int, unit_price: float) -> None:
+        """Add a new line; raises DuplicateLineError if the SKU is present."""
+        if sku in self.lines:
+            raise DuplicateLineError(sku)
+        self.set_line(sku, qty, unit_price)
+
+    def set_line(self, sku: str, qty: int, unit_price: float) -> None:
+        """Add a line or replace the one with the same SKU."""
+        previous = self.lines.get(sku)
+        if previous is None:
+            self._line_sum.append(qty * unit_price)
+        else:
+            # Keeps its place in the order
+            self._line_sum.replace(previous[0] * previous[1], qty * unit_price)
+        self.lines[sku] = (qty, unit_price)
+
+    def remove_line(self, sku: str) -> None:
+        """Remove a line; raises KeyError if the SKU is not in the cart."""
+        qty, unit_price = self.lines.pop(sku)
+        self._line_sum.remove(qty * unit_price)
+
+    def subtotal_cents(self) -> int:
+        return self._line_sum.cents(self.lines)
+
+    def quote(self, weekday: Optional[int] = None) -> dict:
+        """
+        Price the cart.
+
+        Args:
+            weekday: Day of week (0=Monday); defaults to today, and then
+                today's scheduled promotions apply too
+
+        Returns:
+            Quote with subtotal, discount, tax, and total, like create_quote
+        """
+        promotion_pct = 0.0
+        if weekday is None:
+            now = datetime.now()
+            weekday = now.weekday()
+            promotion_pct = promotion_adjustment(self.region, now.date())
+        cents = price_subtotal_cents(
+            self.subtotal_cents(), self.tier, self.region, self.coupon, weekday, promotion_pct
+        )
+        return quote_in_dollars(cents)
+
+
+class CartStore:
+    """
+    Bounded in-memory store of cart sessions.
+
+    Sessions are kept in least-recently-used order. Any access first drops
+    sessions idle for longer than idle_seconds (they are at the front, so
+    this is O(evicted)); creating one beyond maxsize evicts the least
+    recently used.
+    """
+
+    def __init__(self, maxsize: int, idle_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._sessions: "OrderedDict[str, CartSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_idle = 0
+        self.evicted_full = 0
+
+    def _evict_idle(self, now: float) -> None:
+        cutoff = now - self.idle_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used > cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted_idle += 1
+
+    def create(
+        self,
+        user_id: str,
+        tier: str,
+        region: str,
+        coupon: Optional[str] = None,
+        items: Iterable[Tuple[str, int, float]] = (),
+    ) -> CartSession:
+        """
+        Start a session, optionally with initial (sku, qty, unit_price) lines.
+
+        Raises:
+            DuplicateLineError: if items repeat a SKU
+        """
+        session = CartSession(os.urandom(12).hex(), user_id, tier, region, coupon)
+        for sku, qty, unit_price in items:
+            session.add_line(sku, qty, unit_price)
+        with self._lock:
+            now = self._clock()
+            self._evict_idle(now)
+            session.last_used = now
+            self._sessions[session.cart_id] = session
+            while len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+                self.evicted_full += 1
+        return session
+
+    def get(self, cart_id: str) -> Optional[CartSession]:
+        """The session, marked as used, or None if unknown or evicted."""
+        with self._lock:
+            now = self._clock()
+            self._evict_idle(now)
+            session = self._sessions.get(cart_id)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(cart_id)
+            return session
+
+    def delete(self, cart_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(cart_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._sessions),
+                "maxsize": self.maxsize,
+                "evicted_idle": self.evicted_idle,
+                "evicted_full": self.evicted_full,
+            }
+
+
+_store = CartStore(get_settings().cart_store_size, get_settings().cart_idle_seconds)
+
+
+def get_cart_store() -> CartStore:
+    return _store
+
+
+def configure_cart_store(maxsize: int, idle_seconds: Optional[float] = None) -> None:
+    """Replace the cart store with an empty one."""
+    global _store
+    if idle_seconds is None:
+        idle_seconds = get_settings().cart_idle_seconds
+    _store = CartStore(maxsize, idle_seconds)
+
+
+def _cart_store_metrics() -> List[str]:
+    stats = _store.stats()
+    return [
+        *metric_lines("conto_cart_sessions", "Cart sessions held in memory.", "gauge", stats["size"]),
+        *metric_lines(
+            "conto_cart_sessions_evicted_total", "Cart sessions evicted (idle or store full).",
+            "counter", stats["evicted_idle"] + stats["evicted_full"],
+        ),
+    ]
+
+
+register_collector(_cart_store_metrics)
@@ -0,0 +1,281 @@
+"""
+Customer profiles in a local SQLite database.
+
+Quotes and charges carry only a user_id, so a customer's stored tier,
+region and order history come from here instead of a remote service.
+
+The database runs in WAL mode, so readers never block each other or the
+writer, and every thread gets its own connection (sqlite3 connections must
+not be used concurrently). The SQL is a fixed set of statements, which
+sqlite3 keeps prepared in each connection's statement cache; get_many pads
+its IN list to a fixed width so it, too, always reuses one statement.
+
+Lookups are read-through cached in process for cache_ttl seconds, including
+"no such customer", so unknown users don't hit the database every time.
+Writes made through a store drop the affected cache entries; writes from
+other processes become visible when entries expire.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.core.instrumentation import metric_lines, register_collector
+from app.settings import get_settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    user_id TEXT PRIMARY KEY,
+    tier TEXT NOT NULL,
+    region TEXT NOT NULL,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    total_spent_cents INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID
+"""
+
+_COLUMNS = "user_id, tier, region, order_count, total_spent_cents"
+_SELECT_ONE = f"SELECT {_COLUMNS} FROM customers WHERE user_id = ?"
+# get_many looks up this many ids per statement, padding the last chunk
+_MANY_WIDTH = 64
+_SELECT_MANY = f"SELECT {_COLUMNS} FROM customers WHERE user_id IN ({', '.join('?' * _MANY_WIDTH)})"
+_UPSERT = f"""
+INSERT INTO customers ({_COLUMNS}) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET
+    tier = excluded.tier,
+    region = excluded.region,
+    order_count = excluded.order_count,
+    total_spent_cents = excluded.total_spent_cents
+"""
+_RECORD_ORDER = """
+UPDATE customers
+SET order_count = order_count + 1, total_spent_cents = total_spent_cents + ?
+WHERE user_id = ?
+"""
+
+_MISSING = object()
+
+
+class CustomerProfile(NamedTuple):
+    user_id: str
+    tier: str
+    region: str
+    order_count: int = 0
+    total_spent_cents: int = 0
+
+
+class CustomerStore:
+    """
+    Customer profiles in SQLite with per-thread connections and a
+    read-through LRU cache of up to cache_size users (0 disables it).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cache_size: int = 100_000,
+        cache_ttl: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.path = path
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._clock = clock
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._pid = os.getpid()
+        self.hits = 0
+        self.misses = 0
+        # Create the schema up front, on a connection of this thread
+        with self._connection() as connection:
+            connection.execute(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # Forked: the parent's connections must not be used (or closed) here
+            self._local = threading.local()
+            self._connections = []
+            self._connections_lock = threading.Lock()
+            self._pid = os.getpid()
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Only ever used by this thread; check_same_thread=False lets close() close it
+            connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    # Cache
+
+    def _cached(self, user_id: str):
+        with self._cache_lock:
+            entry = self._cache.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires_at, profile = entry
+            if expires_at <= self._clock():
+                del self._cache[user_id]
+                self.misses += 1
+                return _MISSING
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            return profile
+
+    def _remember(self, found: Dict[str, Optional[CustomerProfile]]) -> None:
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            expires_at = self._clock() + self.cache_ttl
+            for user_id, profile in found.items():
+                self._cache[user_id] = (expires_at, profile)
+                self._cache.move_to_end(user_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, user_ids: Iterable[str]) -> None:
+        with self._cache_lock:
+            for user_id in user_ids:
+                self._cache.pop(user_id, None)
+
+    # Reads
+
+    def get(self, user_id: str) -> Optional[CustomerProfile]:
+        """The customer's profile, or None if there is none."""
+        profile = self._cached(user_id)
+        if profile is _MISSING:
+            row = self._connection().execute(_SELECT_ONE, (user_id,)).fetchone()
+            profile = CustomerProfile._make(row) if row is not None else None
+            self._remember({user_id: profile})
+        return profile
+
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, CustomerProfile]:
+        """
+        Profiles of many customers at once, e.g. for batch endpoints.
+
+        Returns:
+            Mapping of user_id to profile for the customers that exist
+        """
+        found: Dict[str, Optional[CustomerProfile]] = {}
+        wanted = []
+        for user_id in dict.fromkeys(user_ids):
+            profile = self._cached(user_id)
+            if profile is _MISSING:
+                wanted.append(user_id)
+            else:
+                found[user_id] = profile
+
+        if wanted:
+            fetched: Dict[str, Optional[CustomerProfile]] = dict.fromkeys(wanted)
+            connection = self._connection()
+            for start in range(0, len(wanted), _MANY_WIDTH):
+                chunk = wanted[start:start + _MANY_WIDTH]
+                chunk += chunk[-1:] * (_MANY_WIDTH - len(chunk))
+                for row in connection.execute(_SELECT_MANY, chunk):
+                    fetched[row[0]] = CustomerProfile._make(row)
+            self._remember(fetched)
+            found.update(fetched)
+        return {user_id: profile for user_id, profile in found.items() if profile is not None}
+
+    # Writes
+
+    def upsert_many(self, profiles: Iterable[CustomerProfile]) -> int:
+        """Insert or replace profiles in one transaction; returns how many were written."""
+        profiles = list(profiles)
+        with self._connection() as connection:
+            connection.executemany(_UPSERT, profiles)
+        self._forget(profile.user_id for profile in profiles)
+        return len(profiles)
+
+    def record_orders(self, orders: Iterable[Tuple[str, int]]) -> None:
+        """
+        Add (user_id, amount_cents) orders to the customers' history in one
+        transaction. Orders of users without a profile are ignored.
+        """
+        orders = list(orders)
+        if not orders:
+            return
+        with self._connection() as connection:
+            connection.executemany(_RECORD_ORDER, [(cents, user_id) for user_id, cents in orders])
+        self._forget(user_id for user_id, _ in orders)
+
+    def stats(self) -> dict:
+        with self._cache_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._cache),
+                "maxsize": self.cache_size,
+                "connections": len(self._connections),
+            }
+
+    def close(self) -> None:
+        """Close every thread's connection; threads reconnect on next use."""
+        if self._pid != os.getpid():
+            return
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+# Process-wide store (CONTO_CUSTOMER_DB), opened on first use
+
+_UNOPENED = object()
+_store = _UNOPENED
+_store_lock = threading.Lock()
+
+
+def get_customer_store() -> Optional[CustomerStore]:
+    """The configured customer store, or None when no database is configured."""
+    global _store
+    store = _store
+    if store is _UNOPENED:
+        with _store_lock:
+            if _store is _UNOPENED:
+                settings = get_settings()
+                _store = (
+                    CustomerStore(settings.customer_db, settings.customer_cache_size, settings.customer_cache_ttl)
+                    if settings.customer_db else None
+                )
+            store = _store
+    return store
+
+
+def configure_customer_store(path: Optional[str], **options) -> Optional[CustomerStore]:
+    """Close the current store and use the database at `path` instead (None disables profiles)."""
+    global _store
+    with _store_lock:
+        if isinstance(_store, CustomerStore):
+            _store.close()
+        _store = CustomerStore(path, **options) if path else None
+        return _store
+
+
+def _customer_metrics() -> List[str]:
+    store = _store
+    if not isinstance(store, CustomerStore):
+        return []
+    stats = store.stats()
+    return [
+        *metric_lines("conto_customer_cache_hits_total", "Customer profile cache hits.", "counter", stats["hits"]),
+        *metric_lines(
+            "conto_customer_cache_misses_total", "Customer profile lookups that read SQLite.", "counter",
+            stats["misses"],
+        ),
+        *metric_lines("conto_customer_cache_size", "Customer profiles cached.", "gauge", stats["size"]),
+    ]
+
+
+register_collector(_customer_metrics)
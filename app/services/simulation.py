@@ -0,0 +1,345 @@
+"""
+What-if pricing simulation over historical orders.
+
+Re-prices an NDJSON order dataset under the current rule tables (the
+baseline) and under alternative scenarios that override TAX_RATES,
+TIER_DISCOUNTS or MAX_DISCOUNT_RATE, and reports aggregate subtotal,
+discount, tax and total per scenario with deltas against the baseline.
+
+The file is split into byte ranges on line boundaries and each range is
+priced in its own process, so workers read and parse their share of the
+input directly and only send back a few integers. Each chunk of orders is
+parsed and subtotalled once, then priced per scenario through the
+vectorized batch path. Sums are kept in integer cents, so they do not
+depend on how the input was sharded.
+
+Each line is a /quote request plus the order's day of week, given as
+"weekday" (0=Monday) or as an ISO "date":
+
+    {"tier": "pro", "region": "EU", "items": [...], "coupon": null, "date": "2025-03-14"}
+
+Orders with a date also get the scheduled promotions of that day
+(app.core.promotions), looked up for a whole chunk at once.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core import policy, pricing, promotions
+from app.core.lazy import lazy_import
+from app.core.utils import VersionedDict
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see the "fast" extra
+    orjson = None
+
+np = lazy_import("numpy")
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Byte ranges per worker process; more than one evens out uneven ranges
+SHARDS_PER_WORKER = 4
+
+AMOUNTS = ("subtotal", "discount", "tax", "total")
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """
+    Alternative rule tables. Tables are merged over the current ones, so a
+    scenario only lists the entries it changes; None keeps the table as is.
+    """
+
+    name: str
+    tax_rates: Optional[Dict[str, float]] = None
+    tier_discounts: Optional[Dict[str, float]] = None
+    max_discount_rate: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: dict, default_name: str = "scenario") -> "Scenario":
+        """Build a scenario from its JSON form, rejecting unknown keys."""
+        unknown = set(data) - {"name", "tax_rates", "tier_discounts", "max_discount_rate"}
+        if unknown:
+            raise ValueError(f"Unknown scenario keys: {', '.join(sorted(unknown))}")
+        max_discount_rate = data.get("max_discount_rate")
+        if max_discount_rate is not None and not 0.0 <= max_discount_rate <= 1.0:
+            raise ValueError("max_discount_rate must be between 0 and 1")
+        return cls(
+            name=str(data.get("name", default_name)),
+            tax_rates=_float_table(data.get("tax_rates")),
+            tier_discounts=_float_table(data.get("tier_discounts")),
+            max_discount_rate=max_discount_rate,
+        )
+
+
+BASELINE = Scenario("baseline")
+
+
+def _float_table(table: Optional[dict]) -> Optional[Dict[str, float]]:
+    if table is None:
+        return None
+    return {str(key): float(value) for key, value in table.items()}
+
+
+def load_scenarios(path: str) -> List[Scenario]:
+    """Read one scenario object, or a list of them, from a JSON file."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if isinstance(data, dict):
+        return [Scenario.from_dict(data, default_name=stem)]
+    return [
+        Scenario.from_dict(item, default_name=f"{stem}-{number}")
+        for number, item in enumerate(data, 1)
+    ]
+
+
+@contextmanager
+def scenario_tables(scenario: Scenario) -> Iterator[None]:
+    """Price with a scenario's tables in this process until the block exits."""
+    saved = (pricing.TAX_RATES, policy.TIER_DISCOUNTS, policy.MAX_DISCOUNT_RATE)
+    try:
+        if scenario.tax_rates is not None:
+            pricing.TAX_RATES = VersionedDict({**pricing.TAX_RATES, **scenario.tax_rates})
+        if scenario.tier_discounts is not None:
+            policy.TIER_DISCOUNTS = VersionedDict(
+                {**policy.TIER_DISCOUNTS, **scenario.tier_discounts}
+            )
+        if scenario.max_discount_rate is not None:
+            policy.MAX_DISCOUNT_RATE = scenario.max_discount_rate
+        yield
+    finally:
+        pricing.TAX_RATES, policy.TIER_DISCOUNTS, policy.MAX_DISCOUNT_RATE = saved
+
+
+def shard_ranges(path: str, shards: int) -> List[Tuple[int, int]]:
+    """Split a file into up to `shards` byte ranges that start and end on line boundaries."""
+    size = os.path.getsize(path)
+    starts = [0]
+    with open(path, "rb") as f:
+        for shard in range(1, shards):
+            f.seek(max(size * shard // shards, starts[-1]))
+            if f.tell() > 0:
+                f.seek(f.tell() - 1)
+                f.readline()  # Move to the start of the next line
+            if f.tell() >= size:
+                break
+            if f.tell() > starts[-1]:
+                starts.append(f.tell())
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def _read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line
+
+
+def parse_order(line: bytes) -> dict:
+    """Parse one dataset line into an order with a weekday; raises ValueError if invalid."""
+    order = orjson.loads(line) if orjson is not None else json.loads(line)
+    if not isinstance(order, dict):
+        raise ValueError("Order must be a JSON object")
+    day = 0  # date.toordinal(), 0 when only the weekday is known
+    if "weekday" in order:
+        weekday = int(order["weekday"])
+    elif "date" in order:
+        parsed = datetime.fromisoformat(order["date"])
+        weekday, day = parsed.weekday(), parsed.toordinal()
+    else:
+        raise ValueError("Order needs a weekday or a date")
+    if not 0 <= weekday <= 6:
+        raise ValueError("weekday must be 0-6")
+    if not isinstance(order.get("tier"), str) or not isinstance(order.get("region"), str):
+        raise ValueError("Order needs a tier and a region")
+    items = order.get("items")
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError("Order items must be a list of objects")
+    order["weekday"] = weekday
+    order["day"] = day
+    return order
+
+
+def _empty_totals() -> Dict[str, int]:
+    return dict.fromkeys(AMOUNTS, 0)
+
+
+def _price_chunk(
+    orders: List[dict],
+    scenarios: Sequence[Scenario],
+    totals: Dict[str, Dict[str, int]],
+) -> None:
+    subtotal = pricing.calculate_subtotal_batch([order["items"] for order in orders])
+    tiers = [order["tier"] for order in orders]
+    regions = [order["region"] for order in orders]
+    coupons = [order.get("coupon") for order in orders]
+    weekdays = np.fromiter((order["weekday"] for order in orders), dtype=np.intp, count=len(orders))
+    days = np.fromiter((order["day"] for order in orders), dtype=np.int64, count=len(orders))
+    promotion_pcts = np.zeros(len(orders))
+    dated = days > 0
+    if dated.any():
+        promotion_pcts[dated] = promotions.promotion_adjustments(
+            [region for region, has_day in zip(regions, dated.tolist()) if has_day], days[dated]
+        )
+
+    for scenario in scenarios:
+        with scenario_tables(scenario):
+            priced = pricing.price_subtotal_batch(
+                subtotal, tiers, regions, coupons, weekdays, promotion_pcts
+            )
+        scenario_totals = totals[scenario.name]
+        for amount in AMOUNTS:
+            # Every amount is a whole number of cents; sum them exactly
+            scenario_totals[amount] += int(np.rint(priced[amount] * 100).astype(np.int64).sum())
+
+
+def simulate_range(
+    path: str,
+    start: int,
+    end: int,
+    scenarios: Sequence[Scenario],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """
+    Price the orders in one byte range of the dataset under every scenario.
+
+    Returns:
+        Dict with "orders", "skipped" and "totals": scenario name -> cents
+        per amount (subtotal, discount, tax, total)
+    """
+    totals = {scenario.name: _empty_totals() for scenario in scenarios}
+    orders: List[dict] = []
+    count = skipped = 0
+    for line in _read_range(path, start, end):
+        if not line.strip():
+            continue
+        try:
+            orders.append(parse_order(line))
+        except (ValueError, TypeError):  # orjson.JSONDecodeError is a ValueError
+            skipped += 1
+            continue
+        if len(orders) >= chunk_size:
+            _price_chunk(orders, scenarios, totals)
+            count += len(orders)
+            orders = []
+    if orders:
+        _price_chunk(orders, scenarios, totals)
+        count += len(orders)
+    return {"orders": count, "skipped": skipped, "totals": totals}
+
+
+def simulate(
+    path: str,
+    scenarios: Sequence[Scenario],
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """
+    Price a dataset under the baseline and every scenario.
+
+    Args:
+        path: NDJSON order dataset (see module docstring)
+        scenarios: Alternative rule tables; the baseline is added first
+        workers: Worker processes (1 = price in this process)
+        chunk_size: Orders priced per vectorized batch
+
+    Returns:
+        Report dict (see build_report)
+    """
+    scenarios = [BASELINE, *scenarios]
+    names = [scenario.name for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError("Scenario names must be unique (and not 'baseline')")
+
+    # Load a configured coupon catalog and promotion calendar once, before any fork
+    policy.get_coupon_store()
+    promotions.get_promotion_calendar()
+
+    ranges = shard_ranges(path, workers * SHARDS_PER_WORKER if workers > 1 else 1)
+    if workers <= 1:
+        parts = [simulate_range(path, start, end, scenarios, chunk_size) for start, end in ranges]
+    else:
+        # Imported here: multiprocessing is slow to import and rarely used
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(simulate_range, path, start, end, scenarios, chunk_size)
+                for start, end in ranges
+            ]
+            parts = [future.result() for future in futures]
+
+    return build_report(scenarios, parts)
+
+
+def build_report(scenarios: Sequence[Scenario], parts: Sequence[dict]) -> dict:
+    """
+    Combine per-range results into the simulation report.
+
+    Amounts are in dollars. "revenue" is subtotal minus discount, i.e. what
+    is kept before tax. Every scenario after the first also gets "delta"
+    (scenario - baseline) and "delta_pct" against the first (the baseline).
+    """
+    totals = {scenario.name: _empty_totals() for scenario in scenarios}
+    for part in parts:
+        for name, part_totals in part["totals"].items():
+            for amount in AMOUNTS:
+                totals[name][amount] += part_totals[amount]
+
+    def with_revenue(cents: Dict[str, int]) -> Dict[str, int]:
+        return {**cents, "revenue": cents["subtotal"] - cents["discount"]}
+
+    baseline = with_revenue(totals[scenarios[0].name])
+    results = []
+    for scenario in scenarios:
+        cents = with_revenue(totals[scenario.name])
+        result = {"name": scenario.name, **{key: value / 100 for key, value in cents.items()}}
+        if scenario is not scenarios[0]:
+            result["delta"] = {key: (cents[key] - baseline[key]) / 100 for key in cents}
+            result["delta_pct"] = {
+                key: (cents[key] - baseline[key]) / baseline[key] * 100 if baseline[key] else None
+                for key in cents
+            }
+        results.append(result)
+
+    return {
+        "orders": sum(part["orders"] for part in parts),
+        "skipped": sum(part["skipped"] for part in parts),
+        "scenarios": results,
+    }
+
+
+def format_report(report: dict) -> str:
+    """Render a simulation report as a plain-text table."""
+    columns = ("revenue", "discount", "tax", "total")
+    width = 28
+    lines = [
+        f"{report['orders']} orders priced, {report['skipped']} skipped",
+        "",
+        f"{'scenario':<20}" + "".join(f"{column:>{width}}" for column in columns),
+    ]
+    for result in report["scenarios"]:
+        lines.append(
+            f"{result['name']:<20}" + "".join(f"{result[column]:>{width},.2f}" for column in columns)
+        )
+        if "delta" in result:
+            cells = []
+            for column in columns:
+                pct = result["delta_pct"][column]
+                pct_text = f" ({pct:+.2f}%)" if pct is not None else ""
+                cells.append(f"{result['delta'][column]:+,.2f}{pct_text}")
+            lines.append(f"{'  vs baseline':<20}" + "".join(f"{cell:>{width}}" for cell in cells))
+    return "\n".join(lines)
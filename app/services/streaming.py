@@ -0,0 +1,149 @@
+"""
+Streaming NDJSON quoting.
+
+Orders are read lazily, priced in bounded chunks through the batch pricing
+path and written out chunk by chunk, so memory use depends on the chunk
+size and the longest allowed line rather than on the size of the input.
+"""
+
+import json
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, List
+
+from app.services.billing import create_quote_batch
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_MAX_LINE_BYTES = 1 << 20
+
+# Parses one NDJSON line into an order dict, raising ValueError if invalid
+OrderParser = Callable[[bytes], dict]
+
+
+class LineTooLongError(ValueError):
+    """An NDJSON line exceeded the maximum line length."""
+
+
+def price_order_chunk(lines: List[bytes], parse: OrderParser) -> bytes:
+    """
+    Price a chunk of NDJSON order lines.
+
+    Args:
+        lines: Non-blank NDJSON lines, one order each
+        parse: Order parser/validator
+
+    Returns:
+        NDJSON output with one line per input line, in input order: the
+        quote, or {"error": ...} for lines that failed to parse
+    """
+    outputs: List[dict] = []
+    orders: List[dict] = []
+    slots: List[int] = []
+    for line in lines:
+        try:
+            order = parse(line)
+        except ValueError as exc:
+            outputs.append({"error": str(exc)})
+            continue
+        slots.append(len(outputs))
+        outputs.append({})
+        orders.append(order)
+
+    for slot, quote in zip(slots, create_quote_batch(orders)):
+        outputs[slot] = quote
+
+    return "".join(json.dumps(output) + "\n" for output in outputs).encode()
+
+
+def _chunks(lines: Iterable[bytes], chunk_size: int) -> Iterator[List[bytes]]:
+    chunk: List[bytes] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def quote_ndjson(
+    lines: Iterable[bytes],
+    parse: OrderParser,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Price an NDJSON stream of orders, yielding NDJSON output chunk by chunk.
+
+    Blank lines are skipped; every other line produces exactly one output
+    line, in order.
+    """
+    for chunk in _chunks(lines, chunk_size):
+        yield price_order_chunk(chunk, parse)
+
+
+async def aiter_lines(
+    chunks: AsyncIterable[bytes],
+    max_line_bytes: int = DEFAULT_MAX_LINE_BYTES,
+) -> AsyncIterator[bytes]:
+    """
+    Split an async stream of byte chunks into lines.
+
+    Only newly received bytes are searched for newlines, and the pieces of
+    an unfinished line are joined once it ends, so splitting is linear in
+    the input however long its lines are.
+
+    Raises:
+        LineTooLongError: when a line is longer than max_line_bytes
+    """
+    parts: List[bytes] = []  # Pieces of the unfinished line
+    size = 0
+    async for chunk in chunks:
+        start = 0
+        end = chunk.find(b"\n")
+        while end != -1:
+            size += end - start
+            if size > max_line_bytes:
+                raise LineTooLongError(f"Line longer than {max_line_bytes} bytes")
+            if parts:
+                parts.append(chunk[start:end])
+                yield b"".join(parts)
+                parts = []
+            else:
+                yield chunk[start:end]
+            size = 0
+            start = end + 1
+            end = chunk.find(b"\n", start)
+        if start < len(chunk):
+            size += len(chunk) - start
+            if size > max_line_bytes:
+                raise LineTooLongError(f"Line longer than {max_line_bytes} bytes")
+            parts.append(chunk[start:])
+    if parts:
+        yield b"".join(parts)
+
+
+async def aiter_chunks(
+    lines: AsyncIterable[bytes],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[List[bytes]]:
+    """
+    Group non-blank lines from an async stream into lists of chunk_size.
+
+    If the stream fails with LineTooLongError, the lines read before it are
+    still yielded before the error propagates.
+    """
+    chunk: List[bytes] = []
+    try:
+        async for line in lines:
+            if not line.strip():
+                continue
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    except LineTooLongError:
+        if chunk:
+            yield chunk
+        raise
+    if chunk:
+        yield chunk
@@ -0,0 +1,266 @@
+"""Runtime settings, read from CONTO_* environment variables."""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return int(value)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return float(value)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip()
+
+
+def _env_limits(name: str) -> Tuple[Tuple[str, int], ...]:
+    """Parse "path=limit,path=limit" into ((path, limit), ...)."""
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return ()
+    limits = []
+    for entry in value.split(","):
+        path, sep, limit = entry.strip().rpartition("=")
+        if not sep or not path:
+            raise ValueError(f"{name}: expected path=limit, got {entry.strip()!r}")
+        limits.append((path.strip(), int(limit)))
+    return tuple(limits)
+
+
+def _env_paths(name: str, default: Tuple[str, ...]) -> Tuple[str, ...]:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return tuple(path.strip() for path in value.split(",") if path.strip())
+
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Max user IDs whose fraud risk factor is kept in memory
+    risk_cache_size: int = 500_000
+    # File of user IDs (one per line) whose risk factors are computed at startup
+    risk_preload_path: Optional[str] = None
+    # JSON file of fraud risk rules replacing the built-in ones
+    risk_rules: Optional[str] = None
+    # Seconds between checks of risk_rules for changes (0 = never reload)
+    risk_rules_reload_seconds: float = 30.0
+    # Max users whose recent charges are tracked for the recent_charges and
+    # recent_amount risk rule features (0 = no tracking, and both are 0).
+    # Opt-in: no built-in rule reads them. Counts are per process, so under
+    # conto-serve each worker only sees the charges it handled
+    velocity_users: int = 0
+    # Window of the recent_charges count, in seconds
+    velocity_count_seconds: float = 300.0
+    # Window of the recent_amount total, in seconds
+    velocity_amount_seconds: float = 3600.0
+    # Bucket width of the velocity windows, in seconds
+    velocity_bucket_seconds: float = 60.0
+    # Where async routes run pricing/fraud work: "thread" pool, "process"
+    # pool, or "inline" on the event loop
+    executor_kind: str = "thread"
+    # Executor pool size; 0 uses the concurrent.futures default
+    executor_workers: int = 0
+    # Max quotes kept by the create_quote cache (0 = no caching)
+    quote_cache_size: int = 10_000
+    # Seconds a cached quote stays valid
+    quote_cache_ttl: float = 60.0
+    # Worker processes started by app.serve (0 = one per available CPU)
+    workers: int = 0
+    # Coupon catalog replacing the built-in codes: a "CODE,percentage" text
+    # file or a SQLite database (.db/.sqlite/.sqlite3) with a coupons table
+    coupon_source: Optional[str] = None
+    # Seconds between checks of coupon_source for changes (0 = never reload)
+    coupon_reload_seconds: float = 30.0
+    # JSON file of date-ranged promotions (None = no promotions)
+    promotion_source: Optional[str] = None
+    # Days, starting today, covered by the precomputed promotion index
+    promotion_days: int = 400
+    # Seconds between checks of promotion_source for changes (0 = never
+    # reload, and the index window is never moved forward)
+    promotion_reload_seconds: float = 30.0
+    # Share one computation between concurrent identical quotes, charges and
+    # risk assessments instead of computing each separately
+    coalesce_requests: bool = False
+    # Max cart sessions held in memory (least recently used evicted first)
+    cart_store_size: int = 10_000
+    # Seconds a cart session may sit unused before it is evicted
+    cart_idle_seconds: float = 1800.0
+    # Return service results as FastJSONResponse, skipping response_model
+    # validation on /quote, /charge and the batch routes
+    fast_responses: bool = False
+    # Longest NDJSON line /quote/stream accepts, in bytes; a longer line
+    # ends the stream with an error line
+    stream_max_line_bytes: int = 1 << 20
+    # Max requests handled at once per path, as (path, limit) pairs; requests
+    # beyond the limit wait in a bounded queue. Empty = no admission control
+    admission_limits: Tuple[Tuple[str, int], ...] = ()
+    # Max requests waiting per limited path; further requests get a 503
+    admission_queue_size: int = 100
+    # Seconds a request may wait for a slot before it gets a 503
+    admission_max_wait: float = 0.5
+    # Sustained requests per second allowed per user_id (0 = no rate limit)
+    rate_limit: float = 0.0
+    # Requests a user may make in a burst above rate_limit
+    rate_limit_burst: int = 10
+    # Paths rate limited by the user_id in their JSON body
+    rate_limit_paths: Tuple[str, ...] = ("/charge",)
+    # Max users whose token buckets are kept (least recently seen evicted)
+    rate_limit_users: int = 100_000
+    # SQLite database of customer profiles (tier, region, order history);
+    # None = no profiles
+    customer_db: Optional[str] = None
+    # Max customer profiles cached in memory (0 = no caching)
+    customer_cache_size: int = 100_000
+    # Seconds a cached profile (or "no such customer") is trusted
+    customer_cache_ttl: float = 30.0
+    # Directory for the binary audit log of quote and charge decisions
+    # (None = no audit log)
+    audit_dir: Optional[str] = None
+    # Records per audit segment file before rotating to a new one
+    audit_segment_records: int = 1_000_000
+    # Max seconds an audit record waits in memory before it is written
+    audit_flush_seconds: float = 0.05
+    # Max audit records queued in memory; beyond it records are dropped
+    # (counted in /metrics) until the writer catches up
+    audit_max_pending: int = 100_000
+    # Time request stages into /metrics histograms and Server-Timing headers
+    instrumentation: bool = False
+    # Profile every Nth request with cProfile (0 = never)
+    profile_every: int = 0
+    # Directory profiles are written to
+    profile_dir: str = "profiles"
+
+    def __post_init__(self):
+        if self.executor_kind not in EXECUTOR_KINDS:
+            raise ValueError(
+                f"executor_kind must be one of {EXECUTOR_KINDS}, got {self.executor_kind!r}"
+            )
+        if self.risk_rules_reload_seconds < 0:
+            raise ValueError("risk_rules_reload_seconds must be >= 0")
+        if self.velocity_users < 0:
+            raise ValueError("velocity_users must be >= 0")
+        if self.velocity_bucket_seconds <= 0:
+            raise ValueError("velocity_bucket_seconds must be > 0")
+        if not self.velocity_bucket_seconds <= self.velocity_count_seconds <= self.velocity_amount_seconds:
+            raise ValueError(
+                "velocity windows need velocity_bucket_seconds <= velocity_count_seconds <= velocity_amount_seconds"
+            )
+        if self.executor_workers < 0:
+            raise ValueError("executor_workers must be >= 0")
+        if self.workers < 0:
+            raise ValueError("workers must be >= 0")
+        if self.quote_cache_size < 0:
+            raise ValueError("quote_cache_size must be >= 0")
+        if self.quote_cache_ttl <= 0:
+            raise ValueError("quote_cache_ttl must be > 0")
+        if self.coupon_reload_seconds < 0:
+            raise ValueError("coupon_reload_seconds must be >= 0")
+        if self.promotion_days < 1:
+            raise ValueError("promotion_days must be >= 1")
+        if self.promotion_reload_seconds < 0:
+            raise ValueError("promotion_reload_seconds must be >= 0")
+        if self.stream_max_line_bytes < 1:
+            raise ValueError("stream_max_line_bytes must be >= 1")
+        if self.cart_store_size < 1:
+            raise ValueError("cart_store_size must be >= 1")
+        if self.cart_idle_seconds <= 0:
+            raise ValueError("cart_idle_seconds must be > 0")
+        if any(limit < 1 for _, limit in self.admission_limits):
+            raise ValueError("admission_limits must be >= 1")
+        if self.admission_queue_size < 0:
+            raise ValueError("admission_queue_size must be >= 0")
+        if self.admission_max_wait < 0:
+            raise ValueError("admission_max_wait must be >= 0")
+        if self.rate_limit < 0:
+            raise ValueError("rate_limit must be >= 0")
+        if self.rate_limit_burst < 1:
+            raise ValueError("rate_limit_burst must be >= 1")
+        if self.rate_limit_users < 1:
+            raise ValueError("rate_limit_users must be >= 1")
+        if self.customer_cache_size < 0:
+            raise ValueError("customer_cache_size must be >= 0")
+        if self.customer_cache_ttl <= 0:
+            raise ValueError("customer_cache_ttl must be > 0")
+        if self.audit_segment_records < 1:
+            raise ValueError("audit_segment_records must be >= 1")
+        if self.audit_flush_seconds <= 0:
+            raise ValueError("audit_flush_seconds must be > 0")
+        if self.audit_max_pending < 1:
+            raise ValueError("audit_max_pending must be >= 1")
+        if self.profile_every < 0:
+            raise ValueError("profile_every must be >= 0")
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            risk_cache_size=_env_int("CONTO_RISK_CACHE_SIZE", cls.risk_cache_size),
+            risk_preload_path=_env_str("CONTO_RISK_PRELOAD_PATH"),
+            risk_rules=_env_str("CONTO_RISK_RULES"),
+            risk_rules_reload_seconds=_env_float("CONTO_RISK_RULES_RELOAD_SECONDS", cls.risk_rules_reload_seconds),
+            velocity_users=_env_int("CONTO_VELOCITY_USERS", cls.velocity_users),
+            velocity_count_seconds=_env_float("CONTO_VELOCITY_COUNT_SECONDS", cls.velocity_count_seconds),
+            velocity_amount_seconds=_env_float("CONTO_VELOCITY_AMOUNT_SECONDS", cls.velocity_amount_seconds),
+            velocity_bucket_seconds=_env_float("CONTO_VELOCITY_BUCKET_SECONDS", cls.velocity_bucket_seconds),
+            executor_kind=_env_str("CONTO_EXECUTOR", cls.executor_kind).lower(),
+            executor_workers=_env_int("CONTO_EXECUTOR_WORKERS", cls.executor_workers),
+            workers=_env_int("CONTO_WORKERS", cls.workers),
+            quote_cache_size=_env_int("CONTO_QUOTE_CACHE_SIZE", cls.quote_cache_size),
+            quote_cache_ttl=_env_float("CONTO_QUOTE_CACHE_TTL", cls.quote_cache_ttl),
+            coupon_source=_env_str("CONTO_COUPON_SOURCE"),
+            coupon_reload_seconds=_env_float("CONTO_COUPON_RELOAD_SECONDS", cls.coupon_reload_seconds),
+            promotion_source=_env_str("CONTO_PROMOTION_SOURCE"),
+            promotion_days=_env_int("CONTO_PROMOTION_DAYS", cls.promotion_days),
+            promotion_reload_seconds=_env_float("CONTO_PROMOTION_RELOAD_SECONDS", cls.promotion_reload_seconds),
+            coalesce_requests=_env_bool("CONTO_COALESCE", cls.coalesce_requests),
+            cart_store_size=_env_int("CONTO_CART_STORE_SIZE", cls.cart_store_size),
+            cart_idle_seconds=_env_float("CONTO_CART_IDLE_SECONDS", cls.cart_idle_seconds),
+            fast_responses=_env_bool("CONTO_FAST_RESPONSES", cls.fast_responses),
+            stream_max_line_bytes=_env_int("CONTO_STREAM_MAX_LINE_BYTES", cls.stream_max_line_bytes),
+            admission_limits=_env_limits("CONTO_ADMISSION_LIMITS"),
+            admission_queue_size=_env_int("CONTO_ADMISSION_QUEUE_SIZE", cls.admission_queue_size),
+            admission_max_wait=_env_float("CONTO_ADMISSION_MAX_WAIT", cls.admission_max_wait),
+            rate_limit=_env_float("CONTO_RATE_LIMIT", cls.rate_limit),
+            rate_limit_burst=_env_int("CONTO_RATE_LIMIT_BURST", cls.rate_limit_burst),
+            rate_limit_paths=_env_paths("CONTO_RATE_LIMIT_PATHS", cls.rate_limit_paths),
+            rate_limit_users=_env_int("CONTO_RATE_LIMIT_USERS", cls.rate_limit_users),
+            customer_db=_env_str("CONTO_CUSTOMER_DB"),
+            customer_cache_size=_env_int("CONTO_CUSTOMER_CACHE_SIZE", cls.customer_cache_size),
+            customer_cache_ttl=_env_float("CONTO_CUSTOMER_CACHE_TTL", cls.customer_cache_ttl),
+            audit_dir=_env_str("CONTO_AUDIT_DIR"),
+            audit_segment_records=_env_int("CONTO_AUDIT_SEGMENT_RECORDS", cls.audit_segment_records),
+            audit_flush_seconds=_env_float("CONTO_AUDIT_FLUSH_SECONDS", cls.audit_flush_seconds),
+            audit_max_pending=_env_int("CONTO_AUDIT_MAX_PENDING", cls.audit_max_pending),
+            instrumentation=_env_bool("CONTO_INSTRUMENTATION", cls.instrumentation),
+            profile_every=_env_int("CONTO_PROFILE_EVERY", cls.profile_every),
+            profile_dir=_env_str("CONTO_PROFILE_DIR", cls.profile_dir),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Settings for this process, read from the environment once."""
+    return Settings.from_env()
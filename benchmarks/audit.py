@@ -0,0 +1,151 @@
+"""
+Cost of the audit log (CONTO_AUDIT_DIR) on the request path, writer
+throughput and reader scan rate:
+
+    caller   ns per record_charge call (including the writer's share of
+             the CPU), and charge() with auditing off/on, against a
+             synchronous SQLite insert + commit per decision
+    writer   records packed into mmap segments per second
+    reader   records per second through summarize() and iter_records()
+             over a multi-million-record log
+
+    python -m benchmarks.audit --records 5000000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from app.core import audit
+from app.services import billing
+from benchmarks.harness import measure
+
+RESULT = {"approved": True, "reason": "Transaction approved", "risk_score": 0.23}
+
+
+def _sqlite_insert(path: str):
+    connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(
+        "CREATE TABLE audit (ts INTEGER, user TEXT, region TEXT, method TEXT,"
+        " amount INTEGER, risk INTEGER, flags INTEGER, approved INTEGER)"
+    )
+
+    def insert():
+        connection.execute(
+            "INSERT INTO audit VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (time.time_ns(), "bench-user", "US", "card", 12000, 2300, 0, 1),
+        )
+    return insert
+
+
+def caller_costs(directory: str) -> dict:
+    log = audit.AuditLog(os.path.join(directory, "caller"), flush_interval=0.05)
+
+    def record():
+        log.record_charge("bench-user", "US", "card", 120.0, RESULT, 0)
+
+    def charge():
+        billing.charge("bench-user", 120.0, "USD", "card", "US")
+
+    results = {"record_charge_ns": measure(record)["median_ns"]}
+    audit.configure_audit_log(None)
+    results["charge_off_ns"] = measure(charge)["median_ns"]
+    audit.configure_audit_log(os.path.join(directory, "charges"))
+    results["charge_on_ns"] = measure(charge)["median_ns"]
+    audit.configure_audit_log(None)
+    results["sqlite_insert_ns"] = measure(_sqlite_insert(os.path.join(directory, "audit.db")))["median_ns"]
+    log.close()
+    return results
+
+
+def writer_throughput(directory: str, records: int) -> dict:
+    # Queue everything first, then time the writer alone
+    log = audit.AuditLog(
+        os.path.join(directory, "writer"),
+        segment_records=records // 4 + 1, flush_interval=3600, batch_size=records + 1, max_pending=records,
+    )
+    for n in range(records):
+        log.record_charge(f"user-{n % 1000}", "EU", "card", 50.0, RESULT, 0)
+    started = time.perf_counter()
+    log.close()
+    elapsed = time.perf_counter() - started
+    return {"records": records, "records_per_second": round(records / elapsed)}
+
+
+def _synthesize(directory: str, records: int, segment_records: int) -> None:
+    """Write segments directly with numpy (the writer is measured separately)."""
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(0)
+    seq = 0
+    while seq < records:
+        count = min(segment_records, records - seq)
+        rows = np.zeros(count, dtype=audit.record_dtype())
+        rows["seq"] = np.arange(seq + 1, seq + count + 1)
+        rows["timestamp_ns"] = time.time_ns() + rows["seq"]
+        rows["user"] = rng.integers(0, 2**63, count, dtype=np.uint64)
+        rows["kind"] = rng.integers(audit.KIND_QUOTE, audit.KIND_CHARGE + 1, count)
+        rows["total"] = rng.integers(100, 1_000_000, count)
+        rows["approved"] = rng.integers(0, 2, count)
+        path = os.path.join(directory, f"{seq:020d}-0{audit.SEGMENT_SUFFIX}")
+        with open(path, "wb") as f:
+            header = audit.HEADER.pack(audit.MAGIC, audit.VERSION, audit.RECORD.size, 0, 0, count)
+            f.write(header.ljust(audit.HEADER_SIZE, b"\0"))
+            f.write(rows.tobytes())
+        seq += count
+
+
+def reader_rates(directory: str, records: int) -> dict:
+    log_dir = os.path.join(directory, "reader")
+    _synthesize(log_dir, records, segment_records=1_000_000)
+
+    started = time.perf_counter()
+    audit.summarize(log_dir)
+    summarize_seconds = time.perf_counter() - started
+
+    sample = min(records, 500_000)
+    started = time.perf_counter()
+    for count, _ in enumerate(audit.iter_records(log_dir), 1):
+        if count == sample:
+            break
+    iterate_seconds = time.perf_counter() - started
+    return {
+        "records": records,
+        "summarize_records_per_second": round(records / summarize_seconds),
+        "iter_records_per_second": round(sample / iterate_seconds),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=5_000_000, help="Records in the scanned log")
+    parser.add_argument("--writer-records", type=int, default=200_000)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, run in (
+            ("caller", lambda: caller_costs(directory)),
+            ("writer", lambda: writer_throughput(directory, args.writer_records)),
+            ("reader", lambda: reader_rates(directory, args.records)),
+        ):
+            results[name] = run()
+            print(f"{name:8} {json.dumps(results[name])}", flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
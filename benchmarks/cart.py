@@ -0,0 +1,109 @@
+"""
+Large-cart benchmark: Cart columns vs the per-item dict path.
+
+For carts of 1k/10k/100k lines, compares the old /quote route path
+(model_dump() every OrderItem, then price the dicts) with building a Cart
+from the validated models and pricing that, and with adding or changing
+one line of a cart session and re-quoting it. Reports latency through the usual
+harness plus the memory each representation holds:
+
+    python -m benchmarks.cart
+"""
+
+import random
+import sys
+import tracemalloc
+from functools import partial
+from typing import List, Optional
+
+from app.api.routes import OrderItem
+from app.core.cart import Cart
+from app.core.pricing import calculate_total
+from app.services.carts import CartStore
+from benchmarks.harness import Benchmark, main as run_main
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def _order_items(size: int) -> List[OrderItem]:
+    rng = random.Random(size)
+    return [
+        OrderItem(sku=f"SKU-{i}", qty=rng.randint(1, 20), unit_price=round(rng.uniform(0.5, 200), 2))
+        for i in range(size)
+    ]
+
+
+ORDER_ITEMS = {size: _order_items(size) for size in SIZES}
+
+
+def price_dicts(items: List[OrderItem]) -> dict:
+    return calculate_total([item.model_dump() for item in items], "pro", "EU", "SAVE10", 2)
+
+
+def price_cart(items: List[OrderItem]) -> dict:
+    return calculate_total(Cart.from_order_items(items), "pro", "EU", "SAVE10", 2)
+
+
+def _session(items: List[OrderItem]):
+    return CartStore(maxsize=1, idle_seconds=3600).create(
+        "bench-user", "pro", "EU", "SAVE10",
+        items=((item.sku, item.qty, item.unit_price) for item in items),
+    )
+
+
+def session_add(items: List[OrderItem]):
+    session = _session(items)
+    skus = (f"NEW-{n}" for n in range(1 << 62))
+
+    def add() -> dict:
+        session.add_line(next(skus), 1, 9.99)
+        return session.quote(weekday=2)
+
+    return add
+
+
+def session_update(items: List[OrderItem]):
+    session = _session(items)
+    sku = items[len(items) // 2].sku
+    qty = iter(range(1, 1 << 62))
+
+    def update() -> dict:
+        session.set_line(sku, next(qty) % 20 + 1, 9.99)
+        return session.quote(weekday=2)
+
+    return update
+
+
+def retained_bytes(build) -> int:
+    """Bytes still allocated by the object build() returns."""
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return size
+
+
+BENCHMARKS = [
+    benchmark
+    for size, items in ORDER_ITEMS.items()
+    for benchmark in (
+        Benchmark(f"quote[dicts, {size} lines]", partial(price_dicts, items)),
+        Benchmark(f"quote[cart, {size} lines]", partial(price_cart, items)),
+        Benchmark(f"add line + quote[session, {size} lines]", session_add(items)),
+        Benchmark(f"update line + quote[session, {size} lines]", session_update(items)),
+    )
+]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    for size, items in ORDER_ITEMS.items():
+        dict_bytes = retained_bytes(lambda: [item.model_dump() for item in items])
+        cart_bytes = retained_bytes(lambda: Cart.from_order_items(items))
+        print(f"memory[{size} lines]  dicts {dict_bytes / 1024:10.1f} KiB  cart {cart_bytes / 1024:10.1f} KiB")
+    print()
+    return run_main(BENCHMARKS, argv, description=__doc__.split("\n\n")[0])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Load benchmark: async handlers + executor vs the original sync handlers.
+
+Starts uvicorn in a subprocess for each mode and drives it with many
+concurrent keep-alive connections, reporting p50/p99 latency, throughput
+and errors:
+
+    python -m benchmarks.concurrency --connections 1000 --requests 20000
+
+Modes:
+    legacy   original ``def`` handlers on Starlette's threadpool
+    thread   async handlers, thread pool executor (the default)
+    inline   async handlers, work run on the event loop
+    process  async handlers, process pool executor
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, FastAPI
+
+from app.api.routes import ChargeRequest, ChargeResponse, QuoteRequest, QuoteResponse
+from app.services.billing import charge, create_quote
+from benchmarks.http import Connection
+
+MODES = ["legacy", "thread", "inline", "process"]
+
+QUOTE = {
+    "user_id": "bench-user",
+    "tier": "pro",
+    "region": "EU",
+    "items": [{"sku": f"SKU-{i}", "qty": 2, "unit_price": 19.99} for i in range(5)],
+    "coupon": "SAVE10",
+}
+CHARGE = {
+    "user_id": "bench-user",
+    "amount": 120.0,
+    "currency": "USD",
+    "payment_method": "card",
+    "region": "US",
+}
+
+# The /quote and /charge handlers as they were before the async rewrite
+legacy_router = APIRouter()
+
+
+@legacy_router.post("/quote", response_model=QuoteResponse)
+def legacy_post_quote(request: QuoteRequest) -> QuoteResponse:
+    items = [item.model_dump() for item in request.items]
+    result = create_quote(
+        user_id=request.user_id,
+        tier=request.tier,
+        region=request.region,
+        items=items,
+        coupon=request.coupon,
+    )
+    return QuoteResponse(**result)
+
+
+@legacy_router.post("/charge", response_model=ChargeResponse)
+def legacy_post_charge(request: ChargeRequest) -> ChargeResponse:
+    result = charge(
+        user_id=request.user_id,
+        amount=request.amount,
+        currency=request.currency,
+        payment_method=request.payment_method,
+        region=request.region,
+    )
+    return ChargeResponse(**result)
+
+
+legacy_app = FastAPI()
+legacy_app.include_router(legacy_router)
+
+
+@legacy_app.get("/health")
+def legacy_health():
+    return {"status": "ok"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode: str, port: int) -> subprocess.Popen:
+    app = "benchmarks.concurrency:legacy_app" if mode == "legacy" else "app.main:app"
+    env = dict(os.environ)
+    if mode != "legacy":
+        env["CONTO_EXECUTOR"] = mode
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", app,
+            "--port", str(port),
+            "--log-level", "warning",
+            "--backlog", "4096",
+        ],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"server for mode {mode!r} did not start")
+
+
+async def run_load(port: int, connections: int, total_requests: int) -> dict:
+    """Send total_requests alternating /quote and /charge over `connections` connections."""
+    latencies: List[float] = []
+    ok_latencies: List[float] = []
+    errors = 0
+    shed = 0
+    counter = iter(range(total_requests))
+    quote = json.dumps(QUOTE).encode()
+    charge_body = json.dumps(CHARGE).encode()
+
+    async def worker():
+        nonlocal errors, shed
+        connection = Connection("127.0.0.1", port)
+        try:
+            for n in counter:
+                path, body = ("/quote", quote) if n % 2 == 0 else ("/charge", charge_body)
+                started = time.perf_counter()
+                try:
+                    status, _ = await connection.request("POST", path, body)
+                    ok = status == 200
+                except ConnectionError:
+                    status, ok = None, False
+                latency = time.perf_counter() - started
+                latencies.append(latency)
+                if ok:
+                    ok_latencies.append(latency)
+                elif status in (429, 503):
+                    shed += 1  # Rejected by admission control (CONTO_ADMISSION_*)
+                else:
+                    errors += 1
+        finally:
+            await connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    result = {
+        "requests": total_requests,
+        "connections": connections,
+        "errors": errors,
+        "shed": shed,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 1),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+    }
+    if shed and len(ok_latencies) > 1:
+        # Latency of the requests that were actually served
+        ok_quantiles = statistics.quantiles(ok_latencies, n=100)
+        result["served_p50_ms"] = round(ok_quantiles[49] * 1000, 2)
+        result["served_p99_ms"] = round(ok_quantiles[98] * 1000, 2)
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for mode in args.modes:
+        port = _free_port()
+        server = start_server(mode, port)
+        try:
+            asyncio.run(run_load(port, min(args.connections, 50), 500))  # warm up
+            results[mode] = asyncio.run(run_load(port, args.connections, args.requests))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{mode:8} {json.dumps(results[mode])}", flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
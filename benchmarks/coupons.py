@@ -0,0 +1,68 @@
+"""
+Coupon catalog memory and lookup latency per million codes.
+
+Builds a CouponIndex and, for comparison, a plain dict over N synthetic
+codes, reports build time and memory, then times lookups of valid and
+invalid codes (invalid ones are what the Bloom filter front is for):
+
+    python -m benchmarks.coupons --codes 1000000
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from functools import partial
+from typing import List, Optional
+
+from app.core.coupons import CouponIndex
+from app.core.policy import coupon_percentage, set_coupon_store
+from benchmarks.harness import Benchmark, main as run_main
+
+
+def _codes(count: int):
+    return ((f"PROMO{n:09d}", 5.0 * (n % 10 + 1)) for n in range(count))
+
+
+def _measure_build(build):
+    # Timed and traced separately: tracemalloc slows allocation-heavy builds
+    started = time.perf_counter()
+    value = build()
+    seconds = time.perf_counter() - started
+    del value
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, seconds, size
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--codes", type=int, default=1_000_000)
+    args, rest = parser.parse_known_args(argv)
+    millions = args.codes / 1e6
+
+    index, index_seconds, index_bytes = _measure_build(lambda: CouponIndex.build(_codes(args.codes)))
+    table, dict_seconds, dict_bytes = _measure_build(lambda: dict(_codes(args.codes)))
+    print(f"{args.codes} codes")
+    print(f"  CouponIndex: built in {index_seconds:.2f}s, {index_bytes / 2**20 / millions:7.1f} MiB per million codes")
+    print(f"  dict:        built in {dict_seconds:.2f}s, {dict_bytes / 2**20 / millions:7.1f} MiB per million codes")
+    print()
+
+    valid = f"PROMO{args.codes // 2:09d}"
+    invalid = "PROMO-NOT-A-CODE"
+    set_coupon_store(index)
+    benchmarks = [
+        Benchmark("CouponIndex.get[valid]", partial(index.get, valid)),
+        Benchmark("CouponIndex.get[invalid]", partial(index.get, invalid)),
+        Benchmark("dict.get[valid]", partial(table.get, valid)),
+        Benchmark("dict.get[invalid]", partial(table.get, invalid)),
+        Benchmark("coupon_percentage[valid]", partial(coupon_percentage, valid.lower())),
+        Benchmark("coupon_percentage[invalid]", partial(coupon_percentage, invalid)),
+    ]
+    return run_main(benchmarks, rest, description=__doc__.split("\n\n")[0])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
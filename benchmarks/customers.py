@@ -0,0 +1,112 @@
+"""
+Customer profile store (CONTO_CUSTOMER_DB) lookup and write costs.
+
+Fills a SQLite database with --customers profiles, then times per-call:
+
+    get (cached)     read-through cache hit
+    get (sqlite)     cache disabled: one prepared SELECT
+    get_many x100    100 ids through the padded IN statement, cache disabled
+    100 x get        the same 100 ids one by one, cache disabled
+    record_orders    one order appended to a customer's history (one commit)
+
+and the read throughput with --threads threads sharing the store, each
+on its own connection:
+
+    python -m benchmarks.customers --customers 1000000 --threads 1 4
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+from app.services.customers import CustomerProfile, CustomerStore
+from benchmarks.harness import Benchmark, run_suite
+
+TIERS = ("free", "pro", "enterprise")
+REGIONS = ("EU", "US", "APAC")
+
+
+def fill(path: str, customers: int) -> None:
+    store = CustomerStore(path, cache_size=0)
+    batch = 50_000
+    for start in range(0, customers, batch):
+        store.upsert_many(
+            CustomerProfile(f"user-{n}", TIERS[n % 3], REGIONS[n % 3], n % 20, n * 7)
+            for n in range(start, min(start + batch, customers))
+        )
+    store.close()
+
+
+def threaded_reads(path: str, customers: int, threads: int, seconds: float = 2.0) -> dict:
+    store = CustomerStore(path, cache_size=0)
+    counts = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def reader(index: int) -> None:
+        ids = (f"user-{(n * 7919) % customers}" for n in itertools.count(index))
+        while time.perf_counter() < stop:
+            for _ in range(100):
+                store.get(next(ids))
+            counts[index] += 100
+
+    workers = [threading.Thread(target=reader, args=(n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    store.close()
+    return {"threads": threads, "gets_per_second": round(sum(counts) / seconds)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "customers.db")
+        started = time.perf_counter()
+        fill(path, args.customers)
+        print(f"filled {args.customers} profiles in {time.perf_counter() - started:.1f}s", flush=True)
+
+        cached = CustomerStore(path)
+        uncached = CustomerStore(path, cache_size=0)
+        cached.get("user-1")
+        ids = itertools.cycle([f"user-{(n * 7919) % args.customers}" for n in range(10_000)])
+        hundred = [f"user-{(n * 7919) % args.customers}" for n in range(100)]
+        writes = itertools.count()
+
+        results = {"per_call": run_suite([
+            Benchmark("get (cached)", lambda: cached.get("user-1")),
+            Benchmark("get (sqlite)", lambda: uncached.get(next(ids))),
+            Benchmark("get_many x100 (sqlite)", lambda: uncached.get_many(hundred)),
+            Benchmark("100 x get (sqlite)", lambda: [uncached.get(user_id) for user_id in hundred]),
+            Benchmark(
+                "record_orders (1 order)",
+                lambda: uncached.record_orders([(f"user-{next(writes) % args.customers}", 1999)]),
+            ),
+        ])}
+        cached.close()
+        uncached.close()
+
+        results["threaded"] = []
+        for threads in args.threads:
+            results["threaded"].append(threaded_reads(path, args.customers, threads))
+            print(json.dumps(results["threaded"][-1]), flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
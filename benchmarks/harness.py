@@ -0,0 +1,152 @@
+"""
+Micro-benchmark runner with machine-readable output and baseline gating.
+
+A suite is a list of Benchmark(name, func) where func takes no arguments.
+Each one is timed like timeit: the loop count is calibrated so one sample
+takes at least ~0.2s, then `repeat` samples are taken and the per-call
+median and minimum are reported in nanoseconds.
+
+Results can be saved as JSON and later compared against: any benchmark
+whose median is more than `threshold` slower than the baseline counts as a
+regression, and main() then exits non-zero so CI can gate on it.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import timeit
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+
+class Benchmark(NamedTuple):
+    name: str
+    func: Callable[[], object]
+
+
+def measure(func: Callable[[], object], repeat: int = 5) -> dict:
+    """Per-call timings of func in nanoseconds."""
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    samples = [t / loops * 1e9 for t in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        "median_ns": round(statistics.median(samples), 1),
+        "min_ns": round(min(samples), 1),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def run_suite(
+    benchmarks: List[Benchmark],
+    repeat: int = 5,
+    select: Optional[str] = None,
+    echo: bool = True,
+) -> Dict[str, dict]:
+    """
+    Time every benchmark whose name contains `select` (all if None).
+
+    Returns:
+        Mapping of benchmark name to its measure() result, in suite order
+    """
+    results = {}
+    for benchmark in benchmarks:
+        if select and select not in benchmark.name:
+            continue
+        results[benchmark.name] = measure(benchmark.func, repeat=repeat)
+        if echo:
+            print(f"{benchmark.name:48} {_format_ns(results[benchmark.name]['median_ns']):>12}", flush=True)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[dict]:
+    """
+    Compare medians against a baseline.
+
+    Args:
+        results: Output of run_suite
+        baseline: Results of a previous run (the "results" key of a saved file)
+        threshold: Allowed slowdown as a fraction, e.g. 0.10 for 10%
+
+    Returns:
+        One entry per benchmark present in both, with the relative change
+        and whether it exceeds the threshold
+    """
+    rows = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["median_ns"]
+        change = result["median_ns"] / before - 1.0 if before else 0.0
+        rows.append({
+            "name": name,
+            "baseline_ns": before,
+            "median_ns": result["median_ns"],
+            "change": round(change, 4),
+            "regression": change > threshold,
+        })
+    return rows
+
+
+def _format_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+
+def main(benchmarks: List[Benchmark], argv: Optional[List[str]] = None, description: str = "") -> int:
+    """
+    Command-line entry point for a benchmark suite.
+
+    Returns:
+        0, or 1 if any benchmark regressed past the threshold
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against results saved with --json")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10,
+        help="Allowed median slowdown vs the baseline (default 0.10 = 10%%)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per benchmark")
+    parser.add_argument("-k", "--select", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for benchmark in benchmarks:
+            print(benchmark.name)
+        return 0
+
+    results = run_suite(benchmarks, repeat=args.repeat, select=args.select)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        rows = compare(results, baseline, args.threshold)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": rows}
+        print()
+        for row in rows:
+            marker = "REGRESSION" if row["regression"] else ""
+            print(f"{row['name']:48} {row['change']:+8.1%} {marker}")
+        regressions = [row["name"] for row in rows if row["regression"]]
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+            status = 1
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return status
+
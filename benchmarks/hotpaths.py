@@ -0,0 +1,132 @@
+"""
+Micro-benchmarks for the pricing, policy and fraud hot paths.
+
+    python -m benchmarks.hotpaths --json baseline.json
+    # ... change pricing.py ...
+    python -m benchmarks.hotpaths --baseline baseline.json --threshold 0.10
+
+Exits 1 if any benchmark's median is slower than the baseline by more than
+the threshold. Compare runs from the same machine only.
+"""
+
+import asyncio
+import json
+import sys
+from functools import partial
+from typing import Callable, List, Optional
+
+from app.core.policy import compute_discount
+from app.core.pricing import calculate_subtotal, calculate_total
+from app.core.utils import round_money
+from app.main import app
+from app.services import billing
+from app.services.billing import create_quote
+from app.services.fraud import assess_risk
+from benchmarks.harness import Benchmark, main as run_main
+from benchmarks.http import asgi_request
+
+
+def _cart(size: int) -> List[dict]:
+    return [{"sku": f"SKU-{i}", "qty": i % 5 + 1, "unit_price": 9.99 + i % 7} for i in range(size)]
+
+
+CARTS = {size: _cart(size) for size in (1, 10, 1000)}
+
+# compute_discount branches: (label, tier, region, subtotal, coupon, weekday)
+DISCOUNT_CASES = [
+    ("free-EU-weekday", "free", "EU", 120.0, None, 2),
+    ("pro-US-weekday", "pro", "US", 120.0, None, 2),
+    ("enterprise-US-weekday", "enterprise", "US", 120.0, None, 2),
+    ("pro-APAC-multiplier", "pro", "APAC", 120.0, None, 2),
+    ("pro-US-weekend", "pro", "US", 120.0, None, 6),
+    ("pro-US-valid-coupon", "pro", "US", 120.0, "SAVE10", 2),
+    ("pro-US-invalid-coupon", "pro", "US", 120.0, "NOPE", 2),
+    ("enterprise-APAC-weekend-cap", "enterprise", "APAC", 120.0, "VIP50", 6),
+    ("zero-subtotal", "pro", "US", 0.0, "SAVE10", 2),
+]
+
+# assess_risk cases: (label, amount, region, payment_method)
+RISK_CASES = [
+    ("low", 50.0, "US", "card"),
+    ("medium-invoice", 500.0, "EU", "invoice"),
+    ("high-apac-invoice", 12000.0, "APAC", "invoice"),
+]
+
+QUOTE_BODY = json.dumps({
+    "user_id": "bench-user",
+    "tier": "pro",
+    "region": "EU",
+    "items": CARTS[10],
+    "coupon": "SAVE10",
+}).encode()
+CHARGE_BODY = json.dumps({
+    "user_id": "bench-user",
+    "amount": 120.0,
+    "currency": "USD",
+    "payment_method": "card",
+    "region": "US",
+}).encode()
+
+_loop = asyncio.new_event_loop()
+
+
+def _uncached(func: Callable[[], object]) -> Callable[[], None]:
+    """func with the quote cache off, so every call prices the cart."""
+
+    def call() -> None:
+        # Set the configured cache aside rather than rebuilding one per call
+        cache = billing._quote_cache
+        billing._quote_cache = None
+        try:
+            func()
+        finally:
+            billing._quote_cache = cache
+
+    return call
+
+
+def _post(path: str, body: bytes) -> None:
+    status, payload = _loop.run_until_complete(asgi_request(app, "POST", path, body))
+    if status != 200:
+        raise RuntimeError(f"{path} returned {status}: {payload[:200]!r}")
+
+
+BENCHMARKS = [
+    Benchmark("round_money", partial(round_money, 1234.565)),
+    Benchmark("round_money[negative]", partial(round_money, -0.125)),
+    *(
+        Benchmark(f"calculate_subtotal[{size} items]", partial(calculate_subtotal, cart))
+        for size, cart in CARTS.items()
+    ),
+    *(
+        Benchmark(f"compute_discount[{label}]", partial(compute_discount, *args))
+        for label, *args in DISCOUNT_CASES
+    ),
+    Benchmark(
+        "calculate_total[10 items]",
+        partial(calculate_total, CARTS[10], "pro", "EU", "SAVE10", 2),
+    ),
+    Benchmark(
+        "create_quote[10 items, uncached]",
+        _uncached(partial(create_quote, "bench-user", "pro", "EU", CARTS[10], "SAVE10")),
+    ),
+    Benchmark(
+        "create_quote[10 items, cached]",
+        partial(create_quote, "bench-user", "pro", "EU", CARTS[10], "SAVE10"),
+    ),
+    *(
+        Benchmark(f"assess_risk[{label}]", partial(assess_risk, "bench-user", *args))
+        for label, *args in RISK_CASES
+    ),
+    Benchmark("POST /quote[asgi, uncached]", _uncached(partial(_post, "/quote", QUOTE_BODY))),
+    Benchmark("POST /quote[asgi, cached]", partial(_post, "/quote", QUOTE_BODY)),
+    Benchmark("POST /charge[asgi]", partial(_post, "/charge", CHARGE_BODY)),
+]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    return run_main(BENCHMARKS, argv, description=__doc__.split("\n\n")[0])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
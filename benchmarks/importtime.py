@@ -0,0 +1,99 @@
+"""
+Import-time profile of the app.
+
+Runs ``python -X importtime -c "import app.main"`` a few times, keeps the
+fastest run per module, and summarises it: the total, every module under
+app/ (self and cumulative time), and the third-party packages that cost
+the most.
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --module app.services.billing --top 20 --json imports.json
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile(module: str) -> Dict[str, Tuple[int, int, int]]:
+    """Map each module imported by `import module` to (self_us, cumulative_us, depth)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return timings
+
+
+def fastest(module: str, runs: int) -> Dict[str, Tuple[int, int, int]]:
+    """Per-module minimum over several runs, to drop scheduling noise."""
+    best: Dict[str, Tuple[int, int, int]] = {}
+    for _ in range(runs):
+        for name, timing in profile(module).items():
+            if name not in best or timing[1] < best[name][1]:
+                best[name] = timing
+    return best
+
+
+def summarise(timings: Dict[str, Tuple[int, int, int]], module: str, top: int) -> dict:
+    app_modules = sorted(
+        (
+            {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for name, (self_us, cumulative_us, _) in timings.items()
+            if name == "app" or name.startswith("app.")
+        ),
+        key=lambda row: -row["cumulative_ms"],
+    )
+    packages: Dict[str, int] = defaultdict(int)
+    for name, (self_us, _, _) in timings.items():
+        package = name.split(".")[0]
+        if package != "app":
+            packages[package] += self_us
+    heaviest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {
+        "module": module,
+        "total_ms": timings[module][1] / 1000 if module in timings else None,
+        "app_modules": app_modules,
+        "packages": [{"package": name, "self_ms": us / 1000} for name, us in heaviest],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--runs", type=int, default=5, help="Runs to take the minimum of")
+    parser.add_argument("--top", type=int, default=15, help="Third-party packages to list")
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    summary = summarise(fastest(args.module, args.runs), args.module, args.top)
+
+    print(f"import {summary['module']}: {summary['total_ms']:.1f} ms\n")
+    print(f"{'app module':40} {'self ms':>9} {'cumul ms':>9}")
+    for row in summary["app_modules"]:
+        print(f"{row['module']:40} {row['self_ms']:9.2f} {row['cumulative_ms']:9.2f}")
+    print(f"\n{'package (self time, all submodules)':40} {'ms':>9}")
+    for row in summary["packages"]:
+        print(f"{row['package']:40} {row['self_ms']:9.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
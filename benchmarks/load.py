@@ -0,0 +1,396 @@
+"""
+Load generator: replay a realistic mix of /quote and /charge traffic.
+
+Builds a pool of requests from a traffic profile (share of quotes vs
+charges, and weighted distributions of cart size, tier, region, coupon,
+payment method, prices and charge amounts), sends them with a fixed number
+of concurrent clients, and prints a JSON report with throughput, latency
+percentiles and error rates, overall, per endpoint and per cart size:
+
+    python -m benchmarks.load --duration 30 --concurrency 64
+    python -m benchmarks.load --profile large-carts --requests 20000 --target serve --workers 4
+    python -m benchmarks.load --profile mix.json --rate 500 --duration 60 --url http://127.0.0.1:8000
+
+Targets:
+    asgi   the app in-process, without sockets (default)
+    serve  ``python -m app.serve`` in a subprocess, with the current CONTO_* settings
+    --url  a server that is already running
+
+By default each client sends its next request as soon as the previous one
+is answered (closed loop). With --rate, requests are due at Poisson
+arrival times instead, and latency counts from when a request was due, so
+time spent waiting for a free client is included (no coordinated omission).
+
+A profile is a built-in name or a JSON file overriding any keys of the
+default profile; see PROFILES.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.concurrency import _free_port
+from benchmarks.http import Connection, asgi_request
+
+ENDPOINTS = ("/quote", "/charge")
+
+# Weights need not sum to 1. Cart sizes are line counts; coupon "" is no coupon.
+DEFAULT_PROFILE = {
+    "quote_share": 0.7,
+    "users": 10000,
+    "cart_sizes": {"1": 25, "3": 35, "10": 25, "50": 12, "200": 3},
+    "tiers": {"free": 60, "pro": 30, "enterprise": 10},
+    "regions": {"US": 45, "EU": 40, "APAC": 15},
+    "coupons": {"": 75, "SAVE10": 12, "WELCOME": 8, "SAVE20": 4, "EXPIRED5": 1},
+    "payment_methods": {"card": 85, "invoice": 15},
+    # Log-normal: median and sigma of the underlying normal
+    "unit_price": {"median": 25.0, "sigma": 1.0},
+    "max_qty": 5,
+    "charge_amount": {"median": 120.0, "sigma": 1.2},
+}
+
+PROFILES = {
+    "default": {},
+    "checkout-heavy": {"quote_share": 0.3},
+    "large-carts": {"cart_sizes": {"50": 40, "200": 40, "1000": 20}},
+    "enterprise": {
+        "tiers": {"enterprise": 1},
+        "cart_sizes": {"10": 30, "50": 40, "200": 30},
+        "payment_methods": {"card": 40, "invoice": 60},
+        "charge_amount": {"median": 4000.0, "sigma": 0.8},
+    },
+}
+
+
+class LoadRequest(NamedTuple):
+    endpoint: str
+    body: bytes
+    lines: int  # Cart lines for /quote, 0 for /charge
+
+
+def load_profile(name_or_path: str) -> dict:
+    """The default profile with a built-in profile or a JSON file merged over it."""
+    if name_or_path in PROFILES:
+        overrides = PROFILES[name_or_path]
+    else:
+        with open(name_or_path) as f:
+            overrides = json.load(f)
+    unknown = set(overrides) - set(DEFAULT_PROFILE)
+    if unknown:
+        raise ValueError(f"Unknown profile keys: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_PROFILE, **overrides}
+
+
+def _weighted(table: Dict[str, float]) -> Tuple[List[str], List[float]]:
+    if not table or min(table.values()) < 0 or sum(table.values()) <= 0:
+        raise ValueError(f"Invalid weights: {table}")
+    return list(table), list(table.values())
+
+
+def _lognormal(rng: random.Random, spec: dict) -> float:
+    return rng.lognormvariate(math.log(spec["median"]), spec["sigma"])
+
+
+def build_requests(profile: dict, count: int, seed: int = 0) -> List[LoadRequest]:
+    """
+    Generate `count` request bodies drawn from a profile.
+
+    Args:
+        profile: Output of load_profile
+        count: Number of requests
+        seed: Random seed; the same seed and profile give the same requests
+
+    Returns:
+        Requests with their JSON bodies already encoded
+    """
+    rng = random.Random(seed)
+    sizes, size_weights = _weighted(profile["cart_sizes"])
+    tiers, tier_weights = _weighted(profile["tiers"])
+    regions, region_weights = _weighted(profile["regions"])
+    coupons, coupon_weights = _weighted(profile["coupons"])
+    methods, method_weights = _weighted(profile["payment_methods"])
+
+    requests = []
+    for _ in range(count):
+        user_id = f"load-user-{rng.randrange(profile['users'])}"
+        region = rng.choices(regions, region_weights)[0]
+        if rng.random() < profile["quote_share"]:
+            lines = int(rng.choices(sizes, size_weights)[0])
+            body = {
+                "user_id": user_id,
+                "tier": rng.choices(tiers, tier_weights)[0],
+                "region": region,
+                "items": [
+                    {
+                        "sku": f"SKU-{rng.randrange(100000)}",
+                        "qty": rng.randint(1, profile["max_qty"]),
+                        "unit_price": round(max(_lognormal(rng, profile["unit_price"]), 0.01), 2),
+                    }
+                    for _ in range(lines)
+                ],
+                "coupon": rng.choices(coupons, coupon_weights)[0] or None,
+            }
+            requests.append(LoadRequest("/quote", json.dumps(body).encode(), lines))
+        else:
+            body = {
+                "user_id": user_id,
+                "amount": round(max(_lognormal(rng, profile["charge_amount"]), 0.01), 2),
+                "currency": "USD",
+                "payment_method": rng.choices(methods, method_weights)[0],
+                "region": region,
+            }
+            requests.append(LoadRequest("/charge", json.dumps(body).encode(), 0))
+    return requests
+
+
+# A client sends one request at a time and returns (status, body);
+# status 0 means the connection failed
+Send = Callable[[str, bytes], Awaitable[Tuple[int, bytes]]]
+
+
+class _Results:
+    def __init__(self):
+        self.endpoint: List[int] = []
+        self.lines: List[int] = []
+        self.status: List[int] = []
+        self.latency: List[float] = []
+
+    def add(self, request: LoadRequest, status: int, latency: float) -> None:
+        self.endpoint.append(ENDPOINTS.index(request.endpoint))
+        self.lines.append(request.lines)
+        self.status.append(status)
+        self.latency.append(latency)
+
+
+async def run_load(
+    requests: List[LoadRequest],
+    clients: List[Send],
+    total: Optional[int] = None,
+    duration: Optional[float] = None,
+    rate: Optional[float] = None,
+    seed: int = 0,
+) -> Tuple[_Results, float]:
+    """
+    Send requests from the pool (cycling through it) until `total` are
+    sent or `duration` seconds have passed, one client per concurrent slot.
+
+    Returns:
+        The results and the elapsed wall time in seconds
+    """
+    if total is None and duration is None:
+        raise ValueError("Give a request count, a duration or both")
+    results = _Results()
+    counter = itertools.count() if total is None else iter(range(total))
+    rng = random.Random(seed)
+    due = 0.0
+
+    def next_due() -> float:
+        nonlocal due
+        due += rng.expovariate(rate)
+        return due
+
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else math.inf
+
+    async def client(send: Send) -> None:
+        for n in counter:
+            sent = time.perf_counter()
+            if rate:
+                sent = started + next_due()
+                if sent > deadline:
+                    return
+                await asyncio.sleep(sent - time.perf_counter())
+            elif sent > deadline:
+                return
+            request = requests[n % len(requests)]
+            try:
+                status, _ = await send(request.endpoint, request.body)
+            except ConnectionError:
+                status = 0
+            results.add(request, status, time.perf_counter() - sent)
+
+    await asyncio.gather(*(client(send) for send in clients))
+    return results, time.perf_counter() - started
+
+
+def _stats(status: np.ndarray, latency: np.ndarray, elapsed: float) -> dict:
+    count = len(status)
+    ok = int(np.count_nonzero((status >= 200) & (status < 300)))
+    shed = int(np.count_nonzero((status == 429) | (status == 503)))
+    errors = count - ok - shed
+    stats = {
+        "requests": count,
+        "ok": ok,
+        "shed": shed,
+        "errors": errors,
+        "error_rate": round(errors / count, 6) if count else 0.0,
+        "shed_rate": round(shed / count, 6) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "statuses": {str(code): n for code, n in sorted(Counter(status.tolist()).items())},
+    }
+    if count:
+        p50, p90, p99, p999 = np.percentile(latency, [50, 90, 99, 99.9]) * 1000
+        stats["latency_ms"] = {
+            "mean": round(float(latency.mean()) * 1000, 3),
+            "p50": round(float(p50), 3),
+            "p90": round(float(p90), 3),
+            "p99": round(float(p99), 3),
+            "p99.9": round(float(p999), 3),
+            "max": round(float(latency.max()) * 1000, 3),
+        }
+    return stats
+
+
+def build_report(results: _Results, elapsed: float, config: dict) -> dict:
+    """Overall, per-endpoint and per-cart-size statistics as a JSON-ready dict."""
+    endpoint = np.array(results.endpoint, dtype=np.int8)
+    lines = np.array(results.lines, dtype=np.int64)
+    status = np.array(results.status, dtype=np.int64)
+    latency = np.array(results.latency, dtype=np.float64)
+
+    report = {
+        "config": config,
+        "seconds": round(elapsed, 3),
+        "overall": _stats(status, latency, elapsed),
+        "endpoints": {},
+        "quote_by_cart_size": {},
+    }
+    for index, name in enumerate(ENDPOINTS):
+        selected = endpoint == index
+        if selected.any():
+            report["endpoints"][name] = _stats(status[selected], latency[selected], elapsed)
+    quotes = endpoint == ENDPOINTS.index("/quote")
+    for size in np.unique(lines[quotes]).tolist():
+        selected = quotes & (lines == size)
+        report["quote_by_cart_size"][str(size)] = _stats(status[selected], latency[selected], elapsed)
+    return report
+
+
+def _http_clients(url: str, count: int) -> Tuple[List[Send], List[Connection]]:
+    parts = urlsplit(url)
+    if parts.scheme != "http" or not parts.hostname:
+        raise ValueError(f"Expected an http://host:port URL, got {url!r}")
+    connections = [Connection(parts.hostname, parts.port or 80) for _ in range(count)]
+
+    def client(connection: Connection) -> Send:
+        return lambda path, body: connection.request("POST", path, body)
+
+    return [client(connection) for connection in connections], connections
+
+
+def _asgi_clients(count: int) -> List[Send]:
+    from app.main import app
+
+    return [lambda path, body: asgi_request(app, "POST", path, body)] * count
+
+
+def start_serve(workers: int, port: int, timeout: float = 60.0) -> subprocess.Popen:
+    """Start ``python -m app.serve`` with the current environment and wait for /health."""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers),
+         "--port", str(port), "--log-level", "warning", "--backlog", "4096"],
+        env=dict(os.environ),
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return server
+        except OSError:
+            if time.monotonic() > deadline or server.poll() is not None:
+                server.kill()
+                raise RuntimeError("server did not start")
+            time.sleep(0.05)
+
+
+async def _run(args: argparse.Namespace, url: Optional[str], requests: List[LoadRequest], config: dict) -> dict:
+    connections: List[Connection] = []
+    if url is None:
+        clients = _asgi_clients(args.concurrency)
+    else:
+        clients, connections = _http_clients(url, args.concurrency)
+    try:
+        if args.warmup:
+            await run_load(requests, clients, total=args.warmup, seed=args.seed)
+        results, elapsed = await run_load(
+            requests, clients,
+            total=args.requests, duration=args.duration, rate=args.rate, seed=args.seed,
+        )
+    finally:
+        await asyncio.gather(*(connection.close() for connection in connections))
+    return build_report(results, elapsed, config)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--profile", default="default",
+        help=f"Built-in profile ({', '.join(PROFILES)}) or JSON file of overrides",
+    )
+    parser.add_argument("--quote-share", type=float, help="Override the profile's share of /quote requests")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients (connections)")
+    parser.add_argument("--rate", type=float, help="Target requests per second (Poisson arrivals)")
+    parser.add_argument("--pool", type=int, default=5000, help="Distinct requests to generate and cycle through")
+    parser.add_argument("--warmup", type=int, default=200, help="Requests sent before measuring")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", choices=["asgi", "serve"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="Workers for --target serve")
+    parser.add_argument("--url", help="Load an already running server instead, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+    if args.requests is None and args.duration is None:
+        args.requests = 10000
+
+    profile = load_profile(args.profile)
+    if args.quote_share is not None:
+        profile["quote_share"] = args.quote_share
+    requests = build_requests(profile, args.pool, seed=args.seed)
+    config = {
+        "target": args.url or args.target,
+        "workers": args.workers if args.target == "serve" and not args.url else None,
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "requests": args.requests,
+        "duration": args.duration,
+        "pool": args.pool,
+        "seed": args.seed,
+        "profile": profile,
+    }
+
+    server = None
+    url = args.url
+    if url is None and args.target == "serve":
+        port = _free_port()
+        server = start_serve(args.workers, port)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        report = asyncio.run(_run(args, url, requests, config))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["overall"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Promotion calendar (CONTO_PROMOTION_SOURCE) lookup and rebuild costs.
+
+Generates --rules random date-ranged promotions over three years, then
+times:
+
+    adjustment        one O(1) lookup in the precomputed table, as /quote does
+    rule walk         evaluating every rule for one order instead
+    create_quote      with no calendar and with the calendar installed
+
+and, for --orders orders at once, the vectorized lookup for days inside
+the table and for historical days evaluated from the rules, plus how long
+a rebuild of the table takes:
+
+    python -m benchmarks.promotions --rules 200 --orders 1000000
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import date, timedelta
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.promotions import Promotion, PromotionCalendar, set_promotion_calendar
+from app.services import billing
+from benchmarks.harness import Benchmark, run_suite
+
+REGIONS = ["EU", "US", "APAC"]
+ITEMS = [{"sku": "A", "qty": 2, "unit_price": 19.99}, {"sku": "B", "qty": 1, "unit_price": 5.0}]
+
+
+def random_promotions(count: int, today: date, seed: int = 0) -> List[Promotion]:
+    rng = np.random.default_rng(seed)
+    promotions = []
+    for n in range(count):
+        start = today + timedelta(days=int(rng.integers(-730, 365)))
+        regions = tuple(rng.choice(REGIONS, int(rng.integers(0, 3)), replace=False).tolist())
+        weekdays = tuple(sorted(rng.choice(7, int(rng.integers(0, 3)), replace=False).tolist()))
+        promotions.append(Promotion(
+            f"promotion-{n}", start, start + timedelta(days=int(rng.integers(0, 30))),
+            float(rng.integers(1, 20)) / 2, regions, weekdays,
+        ))
+    return promotions
+
+
+def rule_walk(promotions: List[Promotion], region: str, day: date) -> float:
+    total = 0.0
+    for promotion in promotions:
+        if (
+            promotion.start <= day <= promotion.end
+            and (not promotion.regions or region in promotion.regions)
+            and (not promotion.weekdays or day.weekday() in promotion.weekdays)
+        ):
+            total += promotion.percent
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rules", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=400, help="Days covered by the table")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    today = date.today()
+    promotions = random_promotions(args.rules, today)
+    started = time.perf_counter()
+    calendar = PromotionCalendar(promotions, today, args.days)
+    results = {"rebuild_ms": round((time.perf_counter() - started) * 1000, 2)}
+    print(f"rebuilt {args.rules} rules x {args.days} days in {results['rebuild_ms']} ms", flush=True)
+
+    def quote():
+        billing.create_quote("bench-user", "pro", "EU", ITEMS, "SAVE10")
+
+    billing.configure_quote_cache(0)
+    set_promotion_calendar(None)
+    per_call = run_suite([
+        Benchmark("adjustment", lambda: calendar.adjustment("EU", today)),
+        Benchmark(f"rule walk ({args.rules} rules)", lambda: rule_walk(promotions, "EU", today)),
+        Benchmark("create_quote (no calendar)", quote),
+    ])
+    set_promotion_calendar(calendar)
+    per_call.update(run_suite([Benchmark("create_quote (calendar)", quote)]))
+    results["per_call"] = per_call
+
+    rng = np.random.default_rng(1)
+    regions = rng.choice(REGIONS, args.orders).tolist()
+    recent = today.toordinal() + rng.integers(0, args.days, args.orders)
+    historical = today.toordinal() - rng.integers(1, 730, args.orders)
+    for name, ordinals in (("in table", recent), ("historical", historical)):
+        started = time.perf_counter()
+        calendar.adjustments(regions, ordinals)
+        elapsed = time.perf_counter() - started
+        results[f"adjustments {name}"] = {"orders_per_second": round(args.orders / elapsed)}
+        print(f"adjustments ({name}): {args.orders / elapsed:,.0f} orders/s", flush=True)
+    set_promotion_calendar(None)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Per-request cost of response-model validation vs FastJSONResponse.
+
+Calls /quote, /charge and the batch routes in-process through the ASGI app
+with CONTO_FAST_RESPONSES off and on, plus the bare encoders:
+
+    python -m benchmarks.responses
+"""
+
+import asyncio
+import json
+import sys
+from functools import partial
+from typing import List, Optional
+
+from app.api import responses, routes
+from app.main import app
+from benchmarks.harness import Benchmark, main as run_main
+from benchmarks.http import asgi_request
+
+ITEMS = [{"sku": f"SKU-{i}", "qty": i % 4 + 1, "unit_price": 4.99 + i} for i in range(5)]
+QUOTE = {"user_id": "bench-user", "tier": "pro", "region": "EU", "items": ITEMS, "coupon": "SAVE10"}
+CHARGE = {"user_id": "bench-user", "amount": 120.0, "payment_method": "card", "region": "US"}
+
+REQUESTS = {
+    "/quote": QUOTE,
+    "/charge": CHARGE,
+    "/quote/batch[100]": {"quotes": [QUOTE] * 100},
+    "/charge/batch[100]": {"charges": [CHARGE] * 100},
+}
+
+_loop = asyncio.new_event_loop()
+
+
+def _post(path: str, body: bytes, fast: bool) -> None:
+    routes.FAST_RESPONSES = fast
+    status, payload = _loop.run_until_complete(asgi_request(app, "POST", path, body))
+    if status != 200:
+        raise RuntimeError(f"{path} returned {status}: {payload[:200]!r}")
+
+
+QUOTE_RESULT = {"subtotal": 123.45, "discount": 18.52, "tax": 20.99, "total": 125.92, "currency": "USD"}
+
+BENCHMARKS = [
+    *(
+        Benchmark(f"POST {name}[{mode}]", partial(_post, name.split("[")[0], json.dumps(body).encode(), fast))
+        for name, body in REQUESTS.items()
+        for mode, fast in (("validated", False), ("fast", True))
+    ),
+    Benchmark("encode quote[stdlib json]", partial(json.dumps, QUOTE_RESULT)),
+    Benchmark("encode quote[dumps]", partial(responses.dumps, QUOTE_RESULT)),
+]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    print(f"orjson: {'installed' if responses.orjson is not None else 'not installed (json fallback)'}\n")
+    return run_main(BENCHMARKS, argv, description=__doc__.split("\n\n")[0])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Fraud risk rules (CONTO_RISK_RULES): decision table against walking the
+rules, for rule sets of increasing size.
+
+For the built-in rules and for --rules random rule sets, times:
+
+    compile          building the DecisionTable
+    table            one evaluate() through the decision table
+    walk             checking every rule in turn instead (the table's cost
+                     follows the number of matching rules, not all rules)
+    assess_risk      the whole per-charge assessment
+    batch            assess_risk_many per transaction, --batch at once
+
+    python -m benchmarks.risk_rules --rules 10 100 1000
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+from typing import List, Optional
+
+from app.core.risk_rules import DecisionTable, RiskRule
+from app.services import fraud
+from benchmarks.harness import measure
+
+REGIONS = ["EU", "US", "APAC"]
+METHODS = ["card", "invoice"]
+
+
+def random_rules(count: int, seed: int = 0) -> List[RiskRule]:
+    """
+    Rules like a risk team writes them: mostly for one region and payment
+    method and an amount band, some also on the user's risk factor.
+    """
+    rng = random.Random(seed)
+    flags = [None, "high_amount", "apac_region", "invoice_payment", "custom"]
+    rules = []
+    for n in range(count):
+        low = float(rng.randrange(0, 20000, 10))
+        above = [("amount", low)]
+        if rng.random() < 0.3:
+            above.append(("risk_factor", rng.randrange(0, 100) / 100))
+        rules.append(RiskRule(
+            f"rule-{n}", rng.choice([0.01, 0.02, -0.01]), rng.choice(flags),
+            region=tuple(rng.sample(REGIONS, 1 if rng.random() < 0.8 else 0)),
+            payment_method=tuple(rng.sample(METHODS, 1 if rng.random() < 0.8 else 0)),
+            above=tuple(above),
+            at_most=(("amount", low + rng.randrange(100, 2000, 10)),),
+        ))
+    return rules
+
+
+def walk(rules: List[RiskRule], region: str, payment_method: str, amount: float, risk_factor: float) -> float:
+    features = {"amount": amount, "risk_factor": risk_factor}
+    score = 0.0
+    for rule in rules:
+        if (
+            (not rule.region or region in rule.region)
+            and region not in rule.region_not
+            and (not rule.payment_method or payment_method in rule.payment_method)
+            and payment_method not in rule.payment_method_not
+            and all(features[name] > threshold for name, threshold in rule.above)
+            and all(features[name] <= threshold for name, threshold in rule.at_most)
+        ):
+            score += rule.score
+    return score
+
+
+def run(name: str, rules: List[RiskRule], batch: int) -> dict:
+    started = time.perf_counter()
+    table = DecisionTable(rules, flags=tuple(fraud.FLAG_NAMES.values()))
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(1)
+    rows = [
+        (f"user-{n}", rng.uniform(1, 25000), rng.choice(REGIONS), rng.choice(METHODS))
+        for n in range(10_000)
+    ]
+    cycle = itertools.cycle(rows)
+
+    def evaluate():
+        user_id, amount, region, method = next(cycle)
+        table.evaluate(region, method, (amount, 0.42))
+
+    def walk_rules():
+        user_id, amount, region, method = next(cycle)
+        walk(rules, region, method, amount, 0.42)
+
+    def assess():
+        fraud.assess_risk(*next(cycle))
+
+    user_ids, amounts, regions, methods = zip(*rows[:batch])
+    fraud.set_risk_rules(rules)
+    matched = 0
+    for user_id, amount, region, method in rows:  # Warm the tables' cells and the risk-factor cache
+        fraud.assess_risk(user_id, amount, region, method)
+        matched += len(table.evaluate(region, method, (amount, 0.42))[0])
+    result = {
+        "rules": len(rules),
+        "matched_per_row": round(matched / len(rows), 2),
+        "compile_ms": round(compile_ms, 2),
+        "table_ns": measure(evaluate)["median_ns"],
+        "walk_ns": measure(walk_rules)["median_ns"],
+        "assess_risk_ns": measure(assess)["median_ns"],
+        "batch_ns_per_row": round(
+            measure(lambda: fraud.assess_risk_many(user_ids, amounts, regions, methods))["median_ns"] / batch, 1
+        ),
+    }
+    fraud.set_risk_rules(None)
+    print(f"{name:10} {json.dumps(result)}", flush=True)
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--batch", type=int, default=1000, help="Transactions per assess_risk_many call")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = {"built-in": run("built-in", fraud.default_risk_rules(), args.batch)}
+    for count in args.rules:
+        results[str(count)] = run(f"{count} rules", random_rules(count), args.batch)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Throughput of the what-if simulator with 1 vs N worker processes.
+
+Writes a synthetic order dataset, runs app.services.simulation.simulate on
+it with each worker count and reports orders per second and the speedup
+over one worker:
+
+    python -m benchmarks.simulation --orders 1000000 --scenarios 3 --workers 1 2 4
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from app.serve import default_workers
+from app.services.simulation import Scenario, simulate
+
+COUPONS = [None, None, None, "SAVE10", "SAVE20", "WELCOME", "VIP50", "EXPIRED"]
+
+
+def write_dataset(path: str, orders: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(orders):
+            order = {
+                "tier": rng.choice(("free", "pro", "enterprise")),
+                "region": rng.choice(("EU", "US", "APAC")),
+                "items": [
+                    {"sku": f"SKU-{rng.randrange(1000):03d}", "qty": rng.randint(1, 5),
+                     "unit_price": round(rng.uniform(1.0, 250.0), 2)}
+                    for _ in range(rng.randint(1, 6))
+                ],
+                "coupon": rng.choice(COUPONS),
+                "weekday": rng.randrange(7),
+            }
+            f.write(json.dumps(order) + "\n")
+
+
+def scenarios(count: int) -> List[Scenario]:
+    return [
+        Scenario(f"scenario-{n}", tax_rates={"EU": 0.20 + n / 100}, max_discount_rate=0.6 - n / 20)
+        for n in range(1, count + 1)
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--scenarios", type=int, default=3, help="Scenarios besides the baseline")
+    parser.add_argument(
+        "--workers", type=int, nargs="+",
+        default=sorted({1, max(default_workers(), 2)}),
+        help="Worker counts to compare (default: 1 and the CPU count)",
+    )
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "orders.ndjson")
+        write_dataset(path, args.orders)
+        for workers in args.workers:
+            started = time.perf_counter()
+            simulate(path, scenarios(args.scenarios), workers=workers)
+            seconds = time.perf_counter() - started
+            result = {
+                "workers": workers,
+                "orders": args.orders,
+                "scenarios": args.scenarios,
+                "seconds": round(seconds, 3),
+                "orders_per_second": round(args.orders / seconds),
+            }
+            if results:
+                result["speedup"] = round(results[0]["seconds"] / seconds, 2)
+            results.append(result)
+            print(json.dumps(result), flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
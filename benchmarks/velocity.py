@@ -0,0 +1,146 @@
+"""
+Charge velocity tracking (CONTO_VELOCITY_*): cost per charge and memory
+per tracked user.
+
+Times:
+
+    record           VelocityTracker.record for one busy user, and cycling
+                     through --users users
+    assess_risk      the per-charge assessment with and without tracking
+
+and measures the memory a tracker holds per user (user ID included):
+
+    1 charge         a user who charged once
+    every bucket     a user who charged in every bucket of the amount window
+    every charge     keeping each of that user's charges (one per 10s over
+                     the window) in a deque instead, for comparison
+
+    python -m benchmarks.velocity --users 100000
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import tracemalloc
+from collections import deque
+from typing import List, Optional
+
+from app.core.velocity import VelocityTracker
+from app.services import fraud
+from benchmarks.harness import measure
+
+COUNT_SECONDS = 300.0
+AMOUNT_SECONDS = 3600.0
+BUCKET_SECONDS = 60.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def tracker(users: int, clock: FakeClock) -> VelocityTracker:
+    return VelocityTracker(COUNT_SECONDS, AMOUNT_SECONDS, BUCKET_SECONDS, users, clock=clock)
+
+
+def bytes_per_user(build, users: int) -> float:
+    """Bytes still allocated by the object build() returns, per user."""
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return round(size / users, 1)
+
+
+def one_charge(users: int):
+    clock = FakeClock()
+    result = tracker(users, clock)
+    for n in range(users):
+        result.record(f"user-{n}", 1999)
+    return result
+
+
+def every_bucket(users: int):
+    clock = FakeClock()
+    result = tracker(users, clock)
+    for bucket in range(int(AMOUNT_SECONDS / BUCKET_SECONDS)):
+        clock.now = bucket * BUCKET_SECONDS
+        for n in range(users):
+            result.record(f"user-{n}", 1999)
+    return result
+
+
+def every_charge(users: int):
+    charges = {}
+    for second in range(0, int(AMOUNT_SECONDS), 10):
+        for n in range(users):
+            charges.setdefault(f"user-{n}", deque()).append((float(second), 1999))
+    return charges
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=100_000, help="Distinct users charging")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    clock = FakeClock()
+    busy = tracker(args.users, clock)
+    spread = tracker(args.users, clock)
+    user_ids = [f"user-{n}" for n in range(args.users)]
+    random.Random(1).shuffle(user_ids)
+    cycle = itertools.cycle(user_ids)
+    ticks = itertools.count()
+
+    def record_busy():
+        # Time moves one second every 1000 charges, through every bucket
+        clock.now = next(ticks) / 1000
+        busy.record("busy-user", 1999)
+
+    def record_spread():
+        clock.now = next(ticks) / 1000
+        spread.record(next(cycle), 1999)
+
+    for user_id in user_ids:
+        spread.record(user_id, 1999)
+
+    previous = fraud.get_velocity_tracker()
+    fraud.set_velocity_tracker(tracker(args.users, clock))
+    for user_id in user_ids:  # Warm the risk-factor cache
+        fraud.assess_risk(user_id, 19.99, "EU", "card")
+    tracked_ns = measure(lambda: fraud.assess_risk(next(cycle), 19.99, "EU", "card"))["median_ns"]
+    fraud.set_velocity_tracker(None)
+    untracked_ns = measure(lambda: fraud.assess_risk(next(cycle), 19.99, "EU", "card"))["median_ns"]
+    fraud.set_velocity_tracker(previous)
+
+    timings = {
+        "record_busy_ns": measure(record_busy)["median_ns"],
+        "record_spread_ns": measure(record_spread)["median_ns"],
+        "assess_risk_ns": tracked_ns,
+        "assess_risk_untracked_ns": untracked_ns,
+    }
+    timings["records_per_s"] = round(1e9 / timings["record_spread_ns"])
+    print(f"time    {json.dumps(timings)}", flush=True)
+
+    sample = min(args.users, 10_000)
+    memory = {
+        "one_charge_bytes": bytes_per_user(lambda: one_charge(args.users), args.users),
+        "every_bucket_bytes": bytes_per_user(lambda: every_bucket(sample), sample),
+        "every_charge_bytes": bytes_per_user(lambda: every_charge(sample), sample),
+    }
+    print(f"memory  {json.dumps(memory)}", flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({**timings, **memory}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
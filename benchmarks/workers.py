@@ -0,0 +1,108 @@
+"""
+Startup time and memory of app.serve with 1 vs N workers.
+
+For each worker count, starts ``python -m app.serve`` and reports the time
+until /health answers and the memory of the parent and all workers: RSS,
+and PSS, which splits shared copy-on-write pages between the processes
+that map them. (USS is what each process holds privately.)
+
+    python -m benchmarks.workers --workers 1 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+from app.serve import default_workers
+from benchmarks.concurrency import _free_port
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_kib(pid: int) -> Dict[str, int]:
+    """rss/pss/uss of one process from /proc/<pid>/smaps_rollup (Linux)."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def measure(workers: int, timeout: float = 60.0) -> dict:
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers),
+         "--port", str(port), "--log-level", "warning"],
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                    break
+            except OSError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError(f"server with {workers} workers did not start")
+                time.sleep(0.02)
+        ready = time.perf_counter() - started
+
+        # Let every worker finish starting before sampling memory
+        while len(_children(server.pid)) < (workers if workers > 1 else 0):
+            time.sleep(0.05)
+        time.sleep(0.5)
+        processes = [server.pid, *_children(server.pid)]
+        memory = [_memory_kib(pid) for pid in processes]
+        return {
+            "workers": workers,
+            "processes": len(processes),
+            "ready_seconds": round(ready, 3),
+            "rss_mib": round(sum(m["rss"] for m in memory) / 1024, 1),
+            "pss_mib": round(sum(m["pss"] for m in memory) / 1024, 1),
+            "uss_mib": round(sum(m["uss"] for m in memory) / 1024, 1),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--workers", type=int, nargs="+",
+        default=sorted({1, max(default_workers(), 2)}),
+        help="Worker counts to compare (default: 1 and the CPU count)",
+    )
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for workers in args.workers:
+        results.append(measure(workers))
+        print(json.dumps(results[-1]), flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Tests for admission control (concurrency limits, shedding, rate limits)."""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.api.admission import AdmissionMiddleware, ConcurrencyLimiter, TokenBuckets
+from app.core.instrumentation import render_prometheus
+from app.main import app
+
+CHARGE = {
+    "user_id": "rate-limited-user",
+    "amount": 50.0,
+    "payment_method": "card",
+    "region": "EU",
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestConcurrencyLimiter:
+    def test_queue_hands_slots_over_in_order(self):
+        async def scenario():
+            limiter = ConcurrencyLimiter(limit=1, queue_size=2, max_wait=5.0)
+            assert await limiter.acquire()
+
+            first = asyncio.create_task(limiter.acquire())
+            second = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            assert limiter.queued == 2
+            assert not await limiter.acquire()  # Queue full: shed at once
+
+            limiter.release()
+            assert await first
+            assert not second.done()
+            limiter.release()
+            assert await second
+            limiter.release()
+            return limiter
+
+        limiter = asyncio.run(scenario())
+
+        assert (limiter.active, limiter.queued) == (0, 0)
+        assert (limiter.admitted, limiter.shed_queue_full) == (3, 1)
+
+    def test_waiters_past_deadline_are_shed(self):
+        async def scenario():
+            limiter = ConcurrencyLimiter(limit=1, queue_size=10, max_wait=0.01)
+            assert await limiter.acquire()
+            assert not await limiter.acquire()
+            # The slot is not handed to the waiter that gave up
+            limiter.release()
+            return limiter
+
+        limiter = asyncio.run(scenario())
+
+        assert (limiter.active, limiter.queued, limiter.shed_deadline) == (0, 0, 1)
+
+    def test_cancelled_waiter_frees_its_place(self):
+        async def scenario():
+            limiter = ConcurrencyLimiter(limit=1, queue_size=1, max_wait=5.0)
+            assert await limiter.acquire()
+            waiter = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            assert limiter.queued == 0
+            limiter.release()
+            return limiter
+
+        assert asyncio.run(scenario()).active == 0
+
+
+class TestTokenBuckets:
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        buckets = TokenBuckets(rate=2.0, burst=3, max_keys=10, clock=clock)
+
+        assert [buckets.take("u") for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert buckets.take("u") == 0.5
+        assert buckets.take("other") == 0.0
+
+        clock.now = 0.5
+        assert buckets.take("u") == 0.0
+        assert buckets.take("u") > 0
+        assert buckets.limited == 2
+
+    def test_least_recently_seen_users_are_evicted(self):
+        buckets = TokenBuckets(rate=1.0, burst=1, max_keys=2, clock=FakeClock())
+        for user in ("a", "b", "c"):
+            buckets.take(user)
+
+        assert len(buckets) == 2
+        assert buckets.take("a") == 0.0  # Forgotten, so a full bucket again
+
+
+class TestAdmissionMiddleware:
+    def test_rate_limit_per_user(self):
+        client = TestClient(AdmissionMiddleware(
+            app, rate_limit=0.001, rate_limit_burst=2, rate_limit_paths=["/charge"],
+        ))
+
+        statuses = [client.post("/charge", json=CHARGE).status_code for _ in range(3)]
+        limited = client.post("/charge", json=CHARGE)
+        other_user = client.post("/charge", json={**CHARGE, "user_id": "someone-else"})
+
+        assert statuses == [200, 200, 429]
+        assert limited.status_code == 429
+        assert int(limited.headers["retry-after"]) >= 1
+        assert other_user.status_code == 200
+        assert "approved" in other_user.json()
+        # Other paths are not rate limited
+        assert client.get("/health").status_code == 200
+
+    def test_overload_is_shed_with_503(self):
+        release = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        middleware = AdmissionMiddleware(slow_app, limits=[("/charge", 1)], queue_size=1, max_wait=5.0)
+
+        async def request():
+            messages = []
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                messages.append(message)
+
+            await middleware({"type": "http", "path": "/charge"}, receive, send)
+            return messages[0]
+
+        async def scenario():
+            tasks = [asyncio.create_task(request()) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            limiter = middleware.limiters["/charge"]
+            depth = (limiter.active, limiter.queued)
+            release.set()
+            return depth, await asyncio.gather(*tasks)
+
+        depth, starts = asyncio.run(scenario())
+
+        assert depth == (1, 1)
+        assert [start["status"] for start in starts] == [200, 200, 503]
+        assert (b"retry-after", b"5") in starts[2]["headers"]
+
+        metrics = render_prometheus()
+        assert 'conto_admission_shed_total{path="/charge",reason="queue_full"} 1' in metrics
+        assert 'conto_admission_queue_depth{path="/charge"} 0' in metrics
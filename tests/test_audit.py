@@ -0,0 +1,153 @@
+"""Tests for the binary audit log of quote and charge decisions."""
+
+import os
+import time
+
+import pytest
+
+from app.core import audit
+from app.core.audit import (
+    KIND_CHARGE,
+    KIND_QUOTE,
+    AuditLog,
+    configure_audit_log,
+    iter_records,
+    read_segment,
+    segment_paths,
+    summarize,
+    user_key,
+)
+from app.core.instrumentation import render_prometheus
+from app.services import billing
+from app.services.fraud import FLAG_APAC_INVOICE_REVIEW, FLAG_HIGH_AMOUNT, FLAG_INVOICE_PAYMENT
+
+QUOTE = {"subtotal": 39.98, "discount": 4.0, "tax": 7.2, "total": 43.18, "currency": "USD"}
+ITEMS = [{"sku": "A", "qty": 2, "unit_price": 19.99}]
+
+
+@pytest.fixture
+def audit_dir(tmp_path):
+    directory = str(tmp_path / "audit")
+    configure_audit_log(directory, flush_interval=60.0)
+    yield directory
+    audit.close_audit_log()
+
+
+class TestAuditLog:
+    def test_records_round_trip(self, tmp_path):
+        log = AuditLog(str(tmp_path), flush_interval=60.0)
+        log.record_quote("alice", "pro", "EU", QUOTE)
+        log.record_charge(
+            "bob", "APAC", "invoice", 12000.5,
+            {"approved": False, "reason": "Transaction flagged for high risk", "risk_score": 0.87},
+            FLAG_HIGH_AMOUNT | FLAG_APAC_INVOICE_REVIEW,
+        )
+        log.close()
+
+        quote, charge = iter_records(str(tmp_path))
+
+        assert quote.kind == KIND_QUOTE
+        assert quote.user == user_key("alice")
+        assert (quote.subtotal, quote.discount, quote.tax, quote.total) == (3998, 400, 720, 4318)
+        assert (audit.TIERS[quote.tier], audit.REGIONS[quote.region]) == ("pro", "EU")
+        assert charge.kind == KIND_CHARGE
+        assert (charge.total, charge.risk_bp, charge.approved) == (1200050, 8700, 0)
+        assert charge.flags == FLAG_HIGH_AMOUNT | FLAG_APAC_INVOICE_REVIEW
+        assert audit.PAYMENT_METHODS[charge.payment_method] == "invoice"
+        assert (quote.seq, charge.seq) == (1, 2)
+        assert quote.timestamp_ns <= charge.timestamp_ns
+
+    def test_segments_rotate_and_are_truncated_on_close(self, tmp_path):
+        log = AuditLog(str(tmp_path), segment_records=4, flush_interval=60.0)
+        for n in range(10):
+            log.record_quote(f"user-{n}", "free", "US", QUOTE)
+        log.close()
+
+        paths = segment_paths(str(tmp_path))
+
+        assert [len(read_segment(path)) for path in paths] == [4, 4, 2]
+        assert os.path.getsize(paths[-1]) == audit.HEADER_SIZE + 2 * audit.RECORD.size
+        assert [record.seq for record in iter_records(str(tmp_path))] == list(range(1, 11))
+
+    def test_open_segment_is_readable_up_to_the_last_flush(self, tmp_path):
+        log = AuditLog(str(tmp_path), flush_interval=60.0)
+        log.record_quote("alice", "pro", "EU", QUOTE)
+        log.flush()
+        log.record_quote("alice", "pro", "EU", QUOTE)
+
+        assert len(read_segment(segment_paths(str(tmp_path))[0])) == 1
+        log.close()
+        assert len(read_segment(segment_paths(str(tmp_path))[0])) == 2
+
+    def test_writer_thread_flushes_full_batches(self, tmp_path):
+        log = AuditLog(str(tmp_path), flush_interval=60.0, batch_size=8)
+        for _ in range(8):
+            log.record_quote("alice", "pro", "EU", QUOTE)
+        deadline = time.monotonic() + 5
+        while log.written < 8 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert log.written == 8
+        log.close()
+
+    def test_queue_is_bounded_while_the_writer_fails(self, tmp_path, monkeypatch):
+        def unwritable(directory, capacity):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(audit, "_Segment", unwritable)
+        log = AuditLog(str(tmp_path), flush_interval=0.01, max_pending=4)
+        for n in range(10):
+            log.record_quote(f"user-{n}", "free", "US", QUOTE)
+        deadline = time.monotonic() + 5
+        while log.last_error is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert isinstance(log.last_error, OSError)
+        assert (log.pending(), log.dropped, log.written) == (4, 6, 0)
+        monkeypatch.undo()
+        log.close()
+        assert log.written == 4
+
+    def test_dropped_records_are_reported(self, audit_dir):
+        log = configure_audit_log(audit_dir, flush_interval=60.0, max_pending=2)
+        for _ in range(5):
+            log.record_quote("alice", "pro", "EU", QUOTE)
+
+        assert "conto_audit_dropped_total 3" in render_prometheus()
+        log.close()
+        assert len(list(iter_records(audit_dir))) == 2
+
+    def test_rejects_foreign_files(self, tmp_path):
+        path = tmp_path / "bogus.audit"
+        path.write_bytes(b"x" * 128)
+
+        with pytest.raises(ValueError):
+            read_segment(str(path))
+
+
+class TestBillingAudit:
+    def test_quotes_and_charges_are_recorded(self, audit_dir):
+        quote = billing.create_quote("carol", "enterprise", "US", ITEMS, "SAVE10")
+        billing.create_quote_batch([
+            {"user_id": "dave", "tier": "free", "region": "EU", "items": ITEMS, "coupon": None},
+        ])
+        result = billing.charge("carol", 250.0, "USD", "invoice", "US")
+        batch = billing.charge_batch([
+            {"user_id": "erin", "amount": 99.99, "currency": "USD", "payment_method": "card", "region": "EU"},
+        ])
+        audit.get_audit_log().flush()
+
+        records = list(iter_records(audit_dir))
+
+        assert [record.kind for record in records] == [KIND_QUOTE, KIND_QUOTE, KIND_CHARGE, KIND_CHARGE]
+        assert records[0].total == round(quote["total"] * 100)
+        assert records[2].approved == result["approved"]
+        assert records[2].risk_bp == round(result["risk_score"] * 10000)
+        assert records[2].flags & FLAG_INVOICE_PAYMENT
+        assert records[3].total == 9999
+        assert records[3].approved == batch[0]["approved"]
+
+        summary = summarize(audit_dir)
+        assert summary["quotes"]["records"] == 2
+        assert summary["charges"]["amount"] == 25000 + 9999
+        assert summarize(audit_dir, users=["carol"])["charges"]["records"] == 1
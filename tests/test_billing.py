@@ -11,7 +11,15 @@ from unittest.mock import patch
 
 import pytest
 
-from app.services.billing import charge, create_quote
+from app.core import pricing
+from app.services import billing
+from app.services.billing import (
+    QuoteCache,
+    charge,
+    configure_quote_cache,
+    create_quote,
+    quote_cache_stats,
+)
 
 
 class TestCreateQuote:
@@ -128,3 +136,109 @@ class TestCharge:
 
         # High amount should increase risk score
         assert result["risk_score"] > 0.0
+
+
+class TestQuoteCache:
+    """Tests for the create_quote result cache."""
+
+    ITEMS = [
+        {"sku": "ITEM-1", "qty": 2, "unit_price": 19.99},
+        {"sku": "ITEM-2", "qty": 1, "unit_price": 5.25},
+    ]
+
+    @pytest.fixture(autouse=True)
+    def small_cache(self):
+        configure_quote_cache(maxsize=2)
+        yield
+        configure_quote_cache(maxsize=billing.get_settings().quote_cache_size)
+
+    def quote(self, items=None, coupon="SAVE10", region="EU"):
+        return create_quote("user-1", "pro", region, items or self.ITEMS, coupon)
+
+    @patch("app.services.billing.datetime")
+    def test_repeat_quote_is_a_hit(self, mock_datetime):
+        mock_datetime.now.return_value.weekday.return_value = 2
+
+        first = self.quote()
+        second = self.quote()
+
+        assert first == second
+        assert first is not second
+        assert quote_cache_stats()["hits"] == 1
+        assert quote_cache_stats()["misses"] == 1
+
+    @patch("app.services.billing.datetime")
+    def test_key_ignores_skus_and_coupon_format(self, mock_datetime):
+        mock_datetime.now.return_value.weekday.return_value = 2
+
+        first = self.quote()
+        second = self.quote(items=[{**item, "sku": "OTHER"} for item in self.ITEMS], coupon=" save10 ")
+
+        assert first == second
+        assert quote_cache_stats()["hits"] == 1
+
+    @patch("app.services.billing.datetime")
+    def test_item_order_is_part_of_the_key(self, mock_datetime):
+        # The subtotal is summed in item order, so reordering can change a cent
+        mock_datetime.now.return_value.weekday.return_value = 2
+
+        self.quote()
+        self.quote(items=list(reversed(self.ITEMS)))
+
+        assert quote_cache_stats()["hits"] == 0
+
+    @patch("app.services.billing.datetime")
+    def test_weekday_is_part_of_the_key(self, mock_datetime):
+        mock_datetime.now.return_value.weekday.return_value = 2
+        weekday_quote = self.quote()
+        mock_datetime.now.return_value.weekday.return_value = 6
+        weekend_quote = self.quote()
+
+        assert weekend_quote["discount"] > weekday_quote["discount"]
+        assert quote_cache_stats()["hits"] == 0
+
+    @patch("app.services.billing.datetime")
+    def test_table_change_invalidates(self, mock_datetime, monkeypatch):
+        mock_datetime.now.return_value.weekday.return_value = 2
+        before = self.quote()
+
+        monkeypatch.setitem(pricing.TAX_RATES, "EU", 0.25)
+        after = self.quote()
+
+        assert after["tax"] > before["tax"]
+        assert quote_cache_stats()["invalidations"] == 1
+
+    @patch("app.services.billing.datetime")
+    def test_lru_eviction(self, mock_datetime):
+        mock_datetime.now.return_value.weekday.return_value = 2
+
+        self.quote(region="EU")
+        self.quote(region="US")
+        self.quote(region="EU")  # refreshes EU
+        self.quote(region="APAC")  # evicts US
+
+        stats = quote_cache_stats()
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+        self.quote(region="US")
+        assert quote_cache_stats()["misses"] == stats["misses"] + 1
+
+    def test_entries_expire_after_ttl(self):
+        now = [100.0]
+        cache = QuoteCache(maxsize=10, ttl=5.0, clock=lambda: now[0])
+        cache.get("key", ())
+        cache.put("key", {"total": 1.0}, ())
+
+        now[0] = 104.9
+        assert cache.get("key", ()) == {"total": 1.0}
+        now[0] = 105.0
+        assert cache.get("key", ()) is None
+        assert cache.stats()["expirations"] == 1
+
+    @patch("app.services.billing.datetime")
+    def test_disabled_cache(self, mock_datetime):
+        mock_datetime.now.return_value.weekday.return_value = 2
+        configure_quote_cache(maxsize=0)
+
+        assert self.quote() == self.quote()
+        assert quote_cache_stats()["hits"] == 0
@@ -0,0 +1,77 @@
+"""Tests for the compact Cart representation."""
+
+import pickle
+import random
+
+import pytest
+
+from app.api.routes import OrderItem
+from app.core.cart import Cart
+from app.core.pricing import calculate_subtotal, calculate_total
+from app.services.billing import quote_cache_key
+
+
+def random_items(rng, size):
+    return [
+        {"sku": f"SKU-{i}", "qty": rng.randint(1, 50), "unit_price": round(rng.uniform(0.01, 500), 2)}
+        for i in range(size)
+    ]
+
+
+class TestCart:
+    def test_from_order_items(self):
+        items = [OrderItem(sku="A", qty=2, unit_price=10.5), OrderItem(sku="B", qty=1, unit_price=3.0)]
+
+        cart = Cart.from_order_items(items)
+
+        assert len(cart) == 2
+        assert cart.qty.typecode == "q"
+        assert cart.unit_price.typecode == "d"
+        assert cart.to_items() == [item.model_dump() for item in items]
+
+    def test_huge_quantity_falls_back_to_float_column(self):
+        cart = Cart.from_order_items([OrderItem(sku="A", qty=2**70, unit_price=1.0)])
+
+        assert cart.qty.typecode == "d"
+        assert calculate_subtotal(cart) == calculate_subtotal([{"qty": 2**70, "unit_price": 1.0}])
+
+    def test_pricing_matches_dict_items(self):
+        rng = random.Random(11)
+        for size in (1, 3, 10, 250):
+            for _ in range(50):
+                items = random_items(rng, size)
+                cart = Cart.from_order_items([OrderItem(**item) for item in items])
+
+                assert calculate_subtotal(cart) == calculate_subtotal(items)
+                for tier, region, coupon, weekday in (
+                    ("pro", "EU", "SAVE10", 2),
+                    ("enterprise", "APAC", "VIP50", 6),
+                ):
+                    assert calculate_total(cart, tier, region, coupon, weekday) == calculate_total(
+                        items, tier, region, coupon, weekday
+                    )
+
+    def test_cache_key_matches_dict_items(self):
+        items = [{"sku": "A", "qty": 2, "unit_price": 9.99}, {"sku": "B", "qty": 1, "unit_price": 1.5}]
+        cart = Cart.from_order_items([OrderItem(**item) for item in items])
+
+        assert quote_cache_key("pro", "US", cart, "save10", 1) == quote_cache_key("pro", "US", items, "SAVE10", 1)
+
+    def test_from_lines_keeps_quantities_beyond_int64(self):
+        cart = Cart.from_lines([(10**20, 1.5), (2, 9.99)])
+
+        assert cart.qty.typecode == "d"
+        assert cart.lines() == [(1e20, 1.5), (2.0, 9.99)]
+
+    def test_pickle_round_trip(self):
+        cart = Cart.from_lines([(2, 9.99), (1, 1.5)])
+
+        restored = pickle.loads(pickle.dumps(cart))
+
+        assert restored.lines() == cart.lines()
+        assert restored.skus == ["", ""]
+
+    def test_columns_must_line_up(self):
+        empty = Cart.from_lines([])
+        with pytest.raises(ValueError):
+            Cart(["A"], empty.qty, empty.unit_price)
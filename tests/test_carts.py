@@ -0,0 +1,176 @@
+"""Tests for cart sessions and the /carts routes."""
+
+import random
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.pricing import calculate_subtotal_cents, calculate_total
+from app.main import app
+from app.services import carts
+from app.services.carts import CartStore, DuplicateLineError, configure_cart_store
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def fresh_store():
+    configure_cart_store(maxsize=100)
+    yield
+    configure_cart_store(maxsize=carts.get_settings().cart_store_size)
+
+
+class TestCartSession:
+    def test_quote_matches_calculate_total(self):
+        session = carts.get_cart_store().create("u1", "enterprise", "APAC", "VIP50")
+        session.add_line("A", 3, 19.99)
+        session.add_line("B", 1, 250.0)
+
+        expected = calculate_total(
+            [{"qty": 3, "unit_price": 19.99}, {"qty": 1, "unit_price": 250.0}],
+            "enterprise", "APAC", "VIP50", 6,
+        )
+        assert session.quote(weekday=6) == expected
+
+    def test_running_subtotal_survives_many_updates(self):
+        rng = random.Random(3)
+        session = carts.get_cart_store().create("u1", "pro", "US")
+        for step in range(5000):
+            sku = f"SKU-{rng.randrange(500)}"
+            if sku in session.lines and step % 4 == 0:
+                session.remove_line(sku)
+            else:
+                session.set_line(sku, rng.randint(1, 9), round(rng.uniform(0.01, 99), 2))
+
+        items = [{"qty": qty, "unit_price": price} for qty, price in session.lines.values()]
+        assert session.quote(weekday=1) == calculate_total(items, "pro", "US", None, 1)
+
+    def test_subtotal_matches_quote_where_exact_sum_differs(self):
+        # Summed left to right these come to 310.67; exactly rounded, 310.68
+        lines = [("A", 3, 24.656), ("B", 6, 6.497), ("C", 1, 48.652), ("D", 3, 49.691)]
+        session = carts.get_cart_store().create("u1", "free", "US", items=lines)
+        items = [{"qty": qty, "unit_price": price} for _, qty, price in lines]
+
+        assert session.quote(weekday=1) == calculate_total(items, "free", "US", None, 1)
+        assert session.quote(weekday=1)["subtotal"] == 310.67
+
+        session.set_line("B", 6, 6.497)  # The exact sum is on the half cent: re-summed in order
+        assert session.quote(weekday=1)["subtotal"] == 310.67
+
+    def test_every_change_matches_calculate_total(self):
+        # Prices with tenths of a cent put some subtotals on a half cent
+        rng = random.Random(4)
+        session = carts.get_cart_store().create("u1", "free", "EU")
+        for step in range(2000):
+            sku = f"SKU-{rng.randrange(40)}"
+            if sku in session.lines and step % 4 == 0:
+                session.remove_line(sku)
+            else:
+                session.set_line(sku, rng.randint(1, 9), round(rng.uniform(0.001, 99), 3))
+
+            items = [{"qty": qty, "unit_price": price} for qty, price in session.lines.values()]
+            assert session.subtotal_cents() == calculate_subtotal_cents(items)
+
+    def test_update_cost_does_not_grow_with_cart_size(self, monkeypatch):
+        resums = []
+        monkeypatch.setattr(carts._LineSum, "_resum", lambda self, lines: resums.append(1))
+        rng = random.Random(5)
+        lines = [(f"SKU-{n}", rng.randint(1, 20), round(rng.uniform(0.5, 200), 2)) for n in range(20_000)]
+        session = carts.get_cart_store().create("u1", "pro", "EU", items=lines)
+
+        for _ in range(500):
+            sku = f"SKU-{rng.randrange(20_000)}"
+            if sku in session.lines and rng.random() < 0.3:
+                session.remove_line(sku)
+            else:
+                session.set_line(sku, rng.randint(1, 20), round(rng.uniform(0.5, 200), 2))
+            session.quote(weekday=1)
+
+        assert resums == []
+        items = [{"qty": qty, "unit_price": price} for qty, price in session.lines.values()]
+        assert session.subtotal_cents() == calculate_subtotal_cents(items)
+
+    def test_duplicate_sku_rejected(self):
+        session = carts.get_cart_store().create("u1", "pro", "US", items=[("A", 1, 1.0)])
+        with pytest.raises(DuplicateLineError):
+            session.add_line("A", 2, 1.0)
+
+
+class TestCartStore:
+    def test_idle_sessions_are_evicted(self):
+        now = [0.0]
+        store = CartStore(maxsize=10, idle_seconds=60, clock=lambda: now[0])
+        first = store.create("u1", "pro", "US")
+        now[0] = 30.0
+        second = store.create("u2", "pro", "US")
+        now[0] = 61.0
+
+        assert store.get(first.cart_id) is None
+        assert store.get(second.cart_id) is second
+        assert store.stats()["evicted_idle"] == 1
+
+    def test_least_recently_used_evicted_when_full(self):
+        store = CartStore(maxsize=2, idle_seconds=60)
+        first = store.create("u1", "pro", "US")
+        second = store.create("u2", "pro", "US")
+        store.get(first.cart_id)
+        store.create("u3", "pro", "US")
+
+        assert store.get(second.cart_id) is None
+        assert store.get(first.cart_id) is first
+        assert len(store) == 2
+
+
+class TestCartRoutes:
+    @patch("app.services.carts.datetime")
+    def test_create_update_remove_flow(self, mock_datetime):
+        mock_datetime.now.return_value.weekday.return_value = 2
+
+        response = client.post("/carts", json={
+            "user_id": "user-1",
+            "tier": "pro",
+            "region": "US",
+            "items": [{"sku": "A", "qty": 10, "unit_price": 10.0}],
+            "coupon": "SAVE10",
+        })
+        assert response.status_code == 201
+        cart_id = response.json()["cart_id"]
+        assert response.json()["quote"]["total"] == 91.8
+
+        response = client.put(f"/carts/{cart_id}/lines/B", json={"qty": 2, "unit_price": 25.0})
+        assert response.json()["line_count"] == 2
+        assert response.json()["quote"]["subtotal"] == 150.0
+
+        response = client.put(f"/carts/{cart_id}/lines/A", json={"qty": 1, "unit_price": 10.0})
+        assert response.json()["quote"]["subtotal"] == 60.0
+
+        response = client.delete(f"/carts/{cart_id}/lines/B")
+        assert response.json()["quote"]["subtotal"] == 10.0
+
+        detail = client.get(f"/carts/{cart_id}").json()
+        assert detail["items"] == [{"sku": "A", "qty": 1, "unit_price": 10.0}]
+        assert detail["coupon"] == "SAVE10"
+        assert client.get(f"/carts/{cart_id}/quote").json() == detail["quote"]
+
+        assert client.delete(f"/carts/{cart_id}").status_code == 204
+        assert client.get(f"/carts/{cart_id}").status_code == 404
+
+    def test_unknown_cart_and_line(self):
+        assert client.get("/carts/nope/quote").status_code == 404
+        cart_id = client.post("/carts", json={"user_id": "u", "tier": "free", "region": "EU"}).json()["cart_id"]
+        assert client.delete(f"/carts/{cart_id}/lines/missing").status_code == 404
+
+    def test_duplicate_initial_sku_rejected(self):
+        response = client.post("/carts", json={
+            "user_id": "u",
+            "tier": "free",
+            "region": "EU",
+            "items": [{"sku": "A", "qty": 1, "unit_price": 1.0}, {"sku": "A", "qty": 2, "unit_price": 1.0}],
+        })
+        assert response.status_code == 400
+
+    def test_invalid_line_rejected(self):
+        cart_id = client.post("/carts", json={"user_id": "u", "tier": "free", "region": "EU"}).json()["cart_id"]
+        response = client.put(f"/carts/{cart_id}/lines/A", json={"qty": 0, "unit_price": 1.0})
+        assert response.status_code == 422
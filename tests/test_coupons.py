@@ -0,0 +1,159 @@
+"""Tests for the coupon catalog index and its use in pricing."""
+
+import os
+import sqlite3
+from array import array
+
+import pytest
+
+from app.core import coupons, policy
+from app.core.coupons import (
+    BloomFilter,
+    CouponIndex,
+    CouponReloader,
+    load_coupon_index,
+    read_coupon_file,
+)
+from app.core.policy import compute_discount, coupon_percentage, set_coupon_store
+from app.core.pricing import calculate_total
+
+
+@pytest.fixture
+def restore_coupon_store():
+    previous = policy.get_coupon_store()
+    yield
+    set_coupon_store(previous)
+
+
+class TestCouponIndex:
+    def test_lookup(self):
+        index = CouponIndex.build([("SAVE10", 10), (" spring24 ", 25.0), ("B2B-1", 10.0)])
+
+        assert index.get("SAVE10") == 10.0
+        assert index.get("SPRING24") == 25.0
+        assert index.get("NOPE") is None
+        assert len(index) == 3
+        assert sorted(index.percentages) == [10.0, 25.0]
+
+    def test_repeated_code_keeps_last_percentage(self):
+        index = CouponIndex.build([("A", 10.0), ("B", 20.0), ("A", 30.0)])
+
+        assert index.get("A") == 30.0
+        assert len(index) == 2
+
+    def test_compact_for_large_catalogs(self):
+        codes = [(f"CODE{n:07d}", 5.0 * (n % 4 + 1)) for n in range(100_000)]
+        index = CouponIndex.build(codes)
+
+        assert all(index.get(code) == pct for code, pct in codes[::997])
+        assert index.nbytes / len(index) < len("CODE0000000") + 16
+        rejected = sum(index.get(f"FAKE{n}") is None for n in range(10_000))
+        assert rejected == 10_000
+
+    def test_colliding_hashes_are_told_apart_by_code(self, monkeypatch):
+        # Every code hashes alike, as if crafted under a known PYTHONHASHSEED
+        monkeypatch.setattr(coupons, "hash", lambda code: 42, raising=False)
+        index = CouponIndex.build([("A", 10.0), ("B", 20.0), ("A", 30.0), ("C", 40.0)])
+
+        assert [index.get(code) for code in ("A", "B", "C")] == [30.0, 20.0, 40.0]
+        assert index.get("EVIL") is None
+        assert len(index) == 3
+
+    def test_many_distinct_percentages(self):
+        codes = [(f"CODE{n}", n / 100) for n in range(70_000)]
+        index = CouponIndex.build(codes)
+
+        assert all(index.get(code) == pct for code, pct in codes[::101])
+        assert index.get("CODE69999") == 699.99
+
+    def test_bloom_false_positive_rate(self):
+        bloom = BloomFilter(10_000, false_positive_rate=0.01)
+        for n in range(10_000):
+            bloom.add(hash(f"valid-{n}"))
+
+        assert all(hash(f"valid-{n}") in bloom for n in range(10_000))
+        false_positives = sum(hash(f"invalid-{n}") in bloom for n in range(20_000))
+        assert false_positives / 20_000 < 0.02
+
+    def test_bloom_add_many_sets_same_bits(self):
+        hashes = array("q", (hash(f"code-{n}") for n in range(1_000)))
+        one_by_one, batched = BloomFilter(1_000), BloomFilter(1_000)
+        for hashed in hashes:
+            one_by_one.add(hashed)
+        batched.add_many(hashes)
+
+        assert batched._bits == one_by_one._bits
+
+
+class TestCouponSources:
+    def test_text_file(self, tmp_path):
+        path = tmp_path / "coupons.csv"
+        path.write_text("# code,percentage\nSAVE10,10\n\nweird,code,12.5\n")
+
+        assert list(read_coupon_file(str(path))) == [("SAVE10", 10.0), ("weird,code", 12.5)]
+        assert load_coupon_index(str(path)).get("WEIRD,CODE") == 12.5
+
+    def test_malformed_line(self, tmp_path):
+        path = tmp_path / "coupons.csv"
+        path.write_text("SAVE10\n")
+
+        with pytest.raises(ValueError):
+            load_coupon_index(str(path))
+
+    def test_sqlite(self, tmp_path):
+        path = str(tmp_path / "my coupons #1?.db")
+        with sqlite3.connect(path) as connection:
+            connection.execute("CREATE TABLE coupons (code TEXT, percentage REAL)")
+            connection.executemany("INSERT INTO coupons VALUES (?, ?)", [("SQL5", 5.0), ("SQL7", 7.5)])
+        connection.close()
+
+        index = load_coupon_index(path)
+
+        assert index.get("SQL7") == 7.5
+        assert len(index) == 2
+
+
+class TestCouponStoreInPricing:
+    ITEMS = [{"sku": "A", "qty": 1, "unit_price": 100.0}]
+
+    def test_installed_store_replaces_builtin_codes(self, restore_coupon_store):
+        set_coupon_store(CouponIndex.build([("MEGA", 40.0), ("SAVE10", 12.0)]))
+
+        assert coupon_percentage(" mega ") == 40.0
+        assert coupon_percentage("WELCOME") is None
+        assert calculate_total(self.ITEMS, "pro", "US", "mega", 1)["discount"] == 45.0
+        assert calculate_total(self.ITEMS, "pro", "US", "SAVE10", 1)["discount"] == 17.0
+        assert compute_discount("pro", "US", 100.0, "SAVE10", 1) == 17.0
+        assert calculate_total(self.ITEMS, "pro", "US", "bogus", 1)["discount"] == 5.0
+
+        set_coupon_store(None)
+        assert calculate_total(self.ITEMS, "pro", "US", "SAVE10", 1)["discount"] == 15.0
+
+    def test_reloader_swaps_in_new_catalog(self, tmp_path, restore_coupon_store):
+        path = tmp_path / "coupons.csv"
+        path.write_text("FLASH,30\n")
+        set_coupon_store(load_coupon_index(str(path)))
+        reloader = CouponReloader(str(path), interval=60, install=set_coupon_store)
+
+        assert reloader.check() is False
+        path.write_text("FLASH,35\nNEW,20\n")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert reloader.check() is True
+        assert calculate_total(self.ITEMS, "free", "US", "flash", 1)["discount"] == 35.0
+        assert coupon_percentage("NEW") == 20.0
+
+    def test_failed_reload_keeps_current_catalog(self, tmp_path, restore_coupon_store):
+        path = tmp_path / "coupons.csv"
+        path.write_text("FLASH,30\n")
+        set_coupon_store(load_coupon_index(str(path)))
+        reloader = CouponReloader(str(path), interval=60, install=set_coupon_store)
+
+        path.write_text("broken line\n")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert reloader.check() is False
+        assert isinstance(reloader.last_error, ValueError)
+        assert coupon_percentage("FLASH") == 30.0
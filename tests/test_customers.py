@@ -0,0 +1,137 @@
+"""Tests for the SQLite customer profile store and its use in billing."""
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import billing
+from app.services.customers import CustomerProfile, CustomerStore, configure_customer_store
+
+ITEMS = [{"sku": "A", "qty": 1, "unit_price": 100.0}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CustomerStore(str(tmp_path / "customers.db"))
+    store.upsert_many([
+        CustomerProfile("alice", "pro", "EU", order_count=2, total_spent_cents=5000),
+        CustomerProfile("bob", "free", "US"),
+    ])
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def configured(tmp_path):
+    store = configure_customer_store(str(tmp_path / "customers.db"))
+    # grace is low risk, so her charges are approved
+    store.upsert_many([CustomerProfile("grace", "pro", "US", order_count=2)])
+    yield store
+    configure_customer_store(None)
+
+
+class TestCustomerStore:
+    def test_get_reads_through_the_cache(self, store):
+        assert store.get("alice") == CustomerProfile("alice", "pro", "EU", 2, 5000)
+        assert store.get("alice").tier == "pro"
+        assert store.get("nobody") is None
+        assert store.get("nobody") is None
+
+        assert (store.hits, store.misses) == (2, 2)
+
+    def test_get_many_returns_existing_profiles(self, store):
+        user_ids = ["bob", "missing", "alice", "bob"] + [f"other-{n}" for n in range(100)]
+
+        profiles = store.get_many(user_ids)
+
+        assert set(profiles) == {"alice", "bob"}
+        assert profiles["bob"] == CustomerProfile("bob", "free", "US", 0, 0)
+        assert store.get_many(["alice", "missing"]).keys() == {"alice"}
+        assert store.hits == 2
+
+    def test_writes_invalidate_cached_profiles(self, store):
+        assert store.get("alice").order_count == 2
+
+        store.record_orders([("alice", 1999), ("alice", 1), ("nobody", 500)])
+
+        assert store.get("alice") == CustomerProfile("alice", "pro", "EU", 4, 7000)
+        assert store.get("nobody") is None
+
+    def test_cached_entries_expire(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / "customers.db")
+        store = CustomerStore(path, cache_ttl=10.0, clock=clock)
+        other_process = CustomerStore(path, cache_size=0)
+        assert store.get("dave") is None
+
+        other_process.upsert_many([CustomerProfile("dave", "enterprise", "APAC")])
+        assert store.get("dave") is None
+        clock.now = 10.0
+
+        assert store.get("dave").tier == "enterprise"
+
+    def test_each_thread_gets_its_own_connection(self, tmp_path):
+        store = CustomerStore(str(tmp_path / "customers.db"), cache_size=0)
+        store.upsert_many([CustomerProfile("alice", "pro", "EU"), CustomerProfile("bob", "free", "US")])
+        results = []
+
+        def read():
+            results.append(store.get_many(["alice", "bob"]))
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert all(result.keys() == {"alice", "bob"} for result in results)
+        assert store.stats()["connections"] == 5  # Including this thread's
+        store.close()
+
+
+class TestBillingProfiles:
+    def test_quotes_report_promotion_eligibility(self, configured):
+        assert billing.create_quote("grace", "pro", "US", ITEMS)["promotion_eligible"] is False
+        assert "promotion_eligible" not in billing.create_quote("stranger", "pro", "US", ITEMS)
+
+        billing.charge("grace", 10.0, "USD", "card", "US")
+
+        assert configured.get("grace").order_count == 3
+        assert billing.create_quote("grace", "pro", "US", ITEMS)["promotion_eligible"] is True
+
+    def test_batch_endpoints_use_profiles(self, configured):
+        client = TestClient(app)
+        orders = [
+            {"user_id": user_id, "tier": "pro", "region": "US", "items": ITEMS}
+            for user_id in ("grace", "stranger")
+        ]
+
+        quotes = client.post("/quote/batch", json={"quotes": orders}).json()["quotes"]
+        single = client.post("/quote", json=orders[0]).json()
+
+        assert quotes[0]["promotion_eligible"] is False
+        assert "promotion_eligible" not in quotes[1]
+        assert single["promotion_eligible"] is False
+
+    def test_declined_charges_are_not_orders(self, configured):
+        # A large APAC invoice from mallory scores as high risk and is declined
+        configured.upsert_many([CustomerProfile("mallory", "free", "APAC")])
+
+        billing.charge_batch([
+            {"user_id": "mallory", "amount": 50000.0, "currency": "USD", "payment_method": "invoice",
+             "region": "APAC"},
+            {"user_id": "grace", "amount": 25.5, "currency": "USD", "payment_method": "card", "region": "US"},
+        ])
+
+        assert configured.get("mallory").order_count == 0
+        assert configured.get("grace") == CustomerProfile("grace", "pro", "US", 3, 2550)
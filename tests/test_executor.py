@@ -0,0 +1,99 @@
+"""Tests for the executor route handlers offload pricing and fraud work to."""
+
+import asyncio
+import dataclasses
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import executor
+from app.api.executor import get_executor, run_in_executor, shutdown_executor
+from app.main import app
+
+QUOTE = {
+    "user_id": "user-123",
+    "tier": "pro",
+    "region": "EU",
+    "items": [{"sku": "SKU-001", "qty": 3, "unit_price": 19.99}, {"sku": "SKU-002", "qty": 1, "unit_price": 250.0}],
+    "coupon": "SAVE10",
+}
+CHARGE = {"user_id": "user-123", "amount": 12000.0, "currency": "USD", "payment_method": "invoice", "region": "APAC"}
+
+
+def use_executor(monkeypatch, kind, workers=0):
+    settings = dataclasses.replace(executor.get_settings(), executor_kind=kind, executor_workers=workers)
+    monkeypatch.setattr(executor, "get_settings", lambda: settings)
+
+
+@pytest.fixture(autouse=True)
+def fresh_executor():
+    shutdown_executor()
+    yield
+    shutdown_executor()
+
+
+class TestExecutorKinds:
+    def test_inline_runs_on_the_event_loop(self, monkeypatch):
+        use_executor(monkeypatch, "inline")
+
+        assert get_executor() is None
+        response = TestClient(app).post("/quote", json=QUOTE)
+        assert response.status_code == 200
+        assert get_executor() is None
+
+    @pytest.mark.parametrize("kind, pool", [("thread", ThreadPoolExecutor), ("process", ProcessPoolExecutor)])
+    @patch("app.services.billing.datetime")
+    def test_routes_match_inline(self, mock_datetime, monkeypatch, kind, pool):
+        mock_datetime.now.return_value.weekday.return_value = 2
+        use_executor(monkeypatch, "inline")
+        client = TestClient(app)
+        expected = [client.post("/quote", json=QUOTE).json(), client.post("/charge", json=CHARGE).json()]
+
+        use_executor(monkeypatch, kind, workers=1)
+        responses = [client.post("/quote", json=QUOTE), client.post("/charge", json=CHARGE)]
+
+        assert [response.status_code for response in responses] == [200, 200]
+        assert [response.json() for response in responses] == expected
+        assert isinstance(get_executor(), pool)
+
+    def test_process_pool_round_trip(self, monkeypatch):
+        use_executor(monkeypatch, "process", workers=1)
+
+        pid = asyncio.run(run_in_executor(os.getpid))
+
+        assert pid != os.getpid()
+
+
+class TestShutdownExecutor:
+    @pytest.mark.parametrize("kind", ["thread", "process"])
+    def test_shutdown_drops_the_pool(self, monkeypatch, kind):
+        use_executor(monkeypatch, kind, workers=1)
+        pool = get_executor()
+
+        shutdown_executor()
+
+        with pytest.raises(RuntimeError):
+            pool.submit(os.getpid)
+        assert get_executor() is not pool
+        shutdown_executor()
+
+    def test_shutdown_without_a_pool(self, monkeypatch):
+        use_executor(monkeypatch, "inline")
+
+        shutdown_executor()
+
+        assert get_executor() is None
+
+    def test_app_shutdown_stops_the_pool(self, monkeypatch):
+        use_executor(monkeypatch, "thread", workers=1)
+
+        with TestClient(app) as client:
+            assert client.post("/charge", json=CHARGE).status_code == 200
+            pool = get_executor()
+
+        assert executor._executor is None
+        with pytest.raises(RuntimeError):
+            pool.submit(os.getpid)
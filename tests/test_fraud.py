@@ -0,0 +1,89 @@
+"""Tests for fraud risk-factor caching and batch scoring."""
+
+import itertools
+
+import pytest
+
+from app.services import fraud
+from app.services.fraud import (
+    FLAG_APAC_INVOICE_REVIEW,
+    FLAG_HIGH_AMOUNT,
+    FLAG_INVOICE_PAYMENT,
+    assess_risk,
+    assess_risk_many,
+    configure_risk_cache,
+    flags_from_mask,
+    preload_risk_factors,
+    risk_cache_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    configure_risk_cache(maxsize=4)
+    yield
+    configure_risk_cache(maxsize=fraud.get_settings().risk_cache_size)
+
+
+class TestRiskFactorCache:
+    def test_repeat_customer_hits_cache(self):
+        first = assess_risk("repeat-user", 100.0, "US", "card")
+        second = assess_risk("repeat-user", 100.0, "US", "card")
+
+        assert first == second
+        assert risk_cache_stats() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 4}
+
+    def test_matches_uncached_hash(self):
+        for user_id in ["a", "b", "user-123"]:
+            assert fraud._risk_factor(user_id) == fraud._hash_user_id(user_id)
+
+    def test_cache_is_bounded(self):
+        for i in range(10):
+            assess_risk(f"user-{i}", 100.0, "US", "card")
+
+        assert risk_cache_stats()["size"] == 4
+
+    def test_preload_from_file(self, tmp_path):
+        path = tmp_path / "users.txt"
+        path.write_text("user-1\nuser-2\n\nuser-3\n")
+
+        assert preload_risk_factors(str(path)) == 3
+
+        assess_risk("user-2", 100.0, "EU", "card")
+        stats = risk_cache_stats()
+        assert stats["size"] == 3
+        assert stats["hits"] == 1
+
+
+class TestAssessRiskMany:
+    def test_matches_assess_risk_for_every_branch(self):
+        rows = list(
+            itertools.product(
+                [f"user-{i}" for i in range(25)],
+                [1.0, 4999.99, 5000.0, 5000.01, 10000.0, 10000.01],
+                ["EU", "US", "APAC"],
+                ["card", "invoice"],
+            )
+        )
+        user_ids, amounts, regions, methods = zip(*rows)
+
+        result = assess_risk_many(user_ids, amounts, regions, methods, include_flags=True)
+
+        for i, row in enumerate(rows):
+            expected = assess_risk(*row)
+            assert result["risk_score"][i] == expected["risk_score"]
+            assert result["is_high_risk"][i] == expected["is_high_risk"]
+            assert result["is_medium_risk"][i] == expected["is_medium_risk"]
+            assert result["flag_mask"][i] == expected["flag_mask"]
+            assert result["flags"][i] == expected["flags"]
+
+    def test_flags_only_decoded_on_request(self):
+        result = assess_risk_many(["user-1"], [100.0], ["US"], ["card"])
+
+        assert "flags" not in result
+
+    def test_flags_from_mask(self):
+        mask = FLAG_HIGH_AMOUNT | FLAG_APAC_INVOICE_REVIEW | FLAG_INVOICE_PAYMENT
+
+        assert flags_from_mask(mask) == ["high_amount", "apac_invoice_review", "invoice_payment"]
+        assert flags_from_mask(0) == []
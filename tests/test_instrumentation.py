@@ -0,0 +1,110 @@
+"""Tests for opt-in request instrumentation."""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+from fastapi.testclient import TestClient
+
+from app.core.instrumentation import Histogram, server_timing, timed
+from app.main import app
+
+client = TestClient(app)
+
+
+class TestDisabledByDefault:
+    """Without CONTO_INSTRUMENTATION the hot path is left untouched."""
+
+    def test_timed_returns_function_unchanged(self):
+        def func():
+            return 1
+
+        assert timed("stage")(func) is func
+
+    def test_no_server_timing_header(self):
+        response = client.get("/health")
+        assert "server-timing" not in response.headers
+
+    def test_metrics_endpoint_serves_risk_cache_counters(self):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "conto_risk_cache_hits_total" in response.text
+
+
+class TestHistogram:
+    def test_render_is_cumulative(self):
+        histogram = Histogram("test_seconds", "Test.", label="stage", buckets=(0.1, 1.0))
+        histogram.observe("a", 0.05)
+        histogram.observe("a", 0.5)
+        histogram.observe("a", 5.0)
+
+        lines = histogram.render()
+
+        assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{stage="a",le="1.0"} 2' in lines
+        assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+        assert 'test_seconds_count{stage="a"} 3' in lines
+        assert lines[1] == "# TYPE test_seconds histogram"
+
+    def test_server_timing_format(self):
+        header = server_timing({"subtotal": 0.0015, "fraud": 0.0002})
+        assert header == "subtotal;dur=1.500, fraud;dur=0.200"
+
+
+class TestEnabledEndToEnd:
+    """Instrumentation is fixed at import time, so run the app in a subprocess."""
+
+    def test_stage_timings_metrics_and_profiles(self, tmp_path):
+        script = textwrap.dedent(
+            """
+            import json
+            from fastapi.testclient import TestClient
+            from app.main import app
+
+            client = TestClient(app)
+            quote = client.post("/quote", json={
+                "user_id": "u1", "tier": "pro", "region": "US",
+                "items": [{"sku": "A", "qty": 2, "unit_price": 10.0}],
+            })
+            charge = client.post("/charge", json={
+                "user_id": "u1", "amount": 100.0, "currency": "USD",
+                "payment_method": "card", "region": "US",
+            })
+            print(json.dumps({
+                "quote": quote.headers.get("server-timing"),
+                "charge": charge.headers.get("server-timing"),
+                "metrics": client.get("/metrics").text,
+            }))
+            """
+        )
+        env = {
+            **os.environ,
+            "CONTO_INSTRUMENTATION": "1",
+            "CONTO_PROFILE_EVERY": "2",
+            "CONTO_PROFILE_DIR": str(tmp_path),
+        }
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True,
+            text=True,
+            env=env,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            check=True,
+        )
+        output = json.loads(result.stdout.strip().splitlines()[-1])
+
+        for stage in ("validation", "quote", "pricing_rule", "subtotal", "discount", "rounding"):
+            assert f"{stage};dur=" in output["quote"]
+        for stage in ("validation", "charge", "fraud"):
+            assert f"{stage};dur=" in output["charge"]
+        assert 'conto_stage_duration_seconds_count{stage="serialization"} 2' in output["metrics"]
+        assert 'conto_stage_duration_seconds_count{stage="request"}' in output["metrics"]
+
+        # Only the second request (/charge) is sampled
+        profiles = os.listdir(tmp_path)
+        assert len(profiles) == 1
+        assert "charge" in profiles[0] and profiles[0].endswith(".prof")
+
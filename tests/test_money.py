@@ -0,0 +1,166 @@
+"""
+Differential tests for the integer-cents money path.
+
+Every result is checked against the original Decimal-based rounding
+(Decimal(str(value)).quantize(..., ROUND_HALF_UP)).
+"""
+
+import random
+from decimal import ROUND_HALF_UP, Decimal
+from unittest.mock import patch
+
+import pytest
+
+from app.core import policy, pricing, utils
+from app.core.money import from_cents, percentage_cents, scale_cents, to_cents
+from app.core.utils import round_half_up, round_money
+
+
+def decimal_round_money(value: float, decimals: int = 2) -> float:
+    """The original round_money implementation."""
+    d = Decimal(str(value))
+    return float(d.quantize(Decimal(10) ** -decimals, rounding=ROUND_HALF_UP))
+
+
+def decimal_calculate_total(items, tier, region, coupon, weekday) -> dict:
+    """calculate_total as composed before the cents path, on Decimal rounding."""
+    with patch.object(utils, "round_money", decimal_round_money), patch.object(
+        policy, "round_money", decimal_round_money
+    ), patch.object(pricing, "round_money", decimal_round_money):
+        subtotal = pricing.calculate_subtotal(items)
+        discount = policy.compute_discount(tier, region, subtotal, coupon, weekday)
+        taxable_amount = decimal_round_money(subtotal - discount)
+        tax = pricing.calculate_tax(taxable_amount, region)
+        return {
+            "subtotal": subtotal,
+            "discount": discount,
+            "tax": tax,
+            "total": decimal_round_money(taxable_amount + tax),
+            "currency": "USD",
+        }
+
+
+def _amounts(rng: random.Random, count: int):
+    generators = [
+        lambda: rng.randint(0, 10**9) / 1000,  # exact half-cent ties
+        lambda: rng.randint(0, 10**8) / 100 * rng.choice([0.05, 0.08, 0.1, 0.2, 0.6, 1.2]),
+        lambda: rng.uniform(0.0, 1e6),
+        lambda: rng.uniform(0.0, 1.0),
+        lambda: -rng.randint(0, 10**7) / 1000,
+    ]
+    for _ in range(count):
+        yield rng.choice(generators)()
+
+
+class TestRoundHalfUp:
+    def test_matches_decimal_over_millions_of_amounts(self):
+        rng = random.Random(20240601)
+
+        mismatches = [
+            value
+            for value in _amounts(rng, 2_000_000)
+            if from_cents(to_cents(value)) != decimal_round_money(value)
+        ]
+
+        assert mismatches == []
+
+    @pytest.mark.parametrize("decimals", [0, 1, 3, 4])
+    def test_matches_decimal_for_other_precisions(self, decimals):
+        rng = random.Random(decimals)
+
+        for value in _amounts(rng, 50_000):
+            assert round_money(value, decimals) == decimal_round_money(value, decimals)
+
+    def test_known_ties(self):
+        assert to_cents(1.005) == 101
+        assert to_cents(2.675) == 268
+        assert to_cents(-10.555) == -1056
+        assert round_half_up(10.5, decimals=0) == 11
+
+    def test_large_values_fall_back_to_decimal(self):
+        assert round_money(1e20) == decimal_round_money(1e20)
+        assert from_cents(to_cents(123456789012.675)) == decimal_round_money(123456789012.675)
+
+
+class TestCentsOperations:
+    def test_percentage_cents_matches_calculate_percentage(self):
+        rng = random.Random(7)
+        for _ in range(100_000):
+            cents = rng.randint(0, 10**7)
+            percentage = rng.choice([5.0, 10.0, 15.0, 20.0, 33.33, 50.0])
+            expected = utils.calculate_percentage(from_cents(cents), percentage)
+            assert from_cents(percentage_cents(cents, percentage)) == expected
+
+    def test_scale_cents(self):
+        assert scale_cents(1001, 0.6) == 601
+        assert scale_cents(0, 1.2) == 0
+
+
+class TestCalculateTotalCents:
+    @pytest.mark.parametrize("apac_multiplier", [1.2, 1.15, 1.25])
+    def test_matches_decimal_path(self, apac_multiplier):
+        rng = random.Random(int(apac_multiplier * 100))
+
+        with patch.dict(policy.REGION_MULTIPLIERS, {"APAC": apac_multiplier}):
+            for _ in range(20_000):
+                items = [
+                    {
+                        "qty": rng.randint(1, 9),
+                        "unit_price": rng.choice(
+                            [rng.randint(1, 99999) / 100, rng.randint(1, 99999) / 1000]
+                        ),
+                    }
+                    for _ in range(rng.randint(0, 4))
+                ]
+                args = (
+                    items,
+                    rng.choice(["free", "pro", "enterprise"]),
+                    rng.choice(["EU", "US", "APAC"]),
+                    rng.choice([None, "SAVE10", "vip50", "WELCOME", "BOGUS"]),
+                    rng.randint(0, 6),
+                )
+
+                assert pricing.calculate_total(*args) == decimal_calculate_total(*args)
+
+    @pytest.mark.parametrize("weekday", [1, 6])
+    def test_large_totals_match_decimal_and_batch_paths(self, weekday):
+        # Past EXACT_CENTS_LIMIT floats no longer hold every cent
+        rng = random.Random(weekday)
+        orders = [
+            {
+                "items": [
+                    {"qty": rng.randint(1, 5), "unit_price": round(10 ** rng.uniform(9, 16), rng.choice([2, 3]))}
+                    for _ in range(rng.randint(1, 3))
+                ],
+                "tier": rng.choice(["free", "pro", "enterprise"]),
+                "region": rng.choice(["EU", "US", "APAC"]),
+                "coupon": rng.choice([None, "SAVE10", "VIP50"]),
+            }
+            for _ in range(3000)
+        ]
+
+        batch = pricing.calculate_total_batch(orders, weekday)
+        for order, batch_result in zip(orders, batch):
+            tier, region, coupon = order["tier"], order["region"], order["coupon"]
+            expected = decimal_calculate_total(order["items"], tier, region, coupon, weekday)
+            assert pricing.calculate_total(order["items"], tier, region, coupon, weekday) == expected
+            assert batch_result == expected
+            discount = policy.compute_discount_cents(tier, region, to_cents(expected["subtotal"]), coupon, weekday)
+            assert discount == to_cents(expected["discount"])
+
+    def test_returns_integer_cents(self):
+        result = pricing.calculate_total_cents(
+            items=[{"qty": 10, "unit_price": 10.0}],
+            tier="pro",
+            region="US",
+            coupon="SAVE10",
+            weekday=1,
+        )
+
+        assert result == {
+            "subtotal": 10000,
+            "discount": 1500,
+            "tax": 680,
+            "total": 9180,
+            "currency": "USD",
+        }
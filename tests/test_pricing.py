@@ -0,0 +1,148 @@
+"""Tests for pricing calculations."""
+
+import itertools
+import random
+from unittest.mock import patch
+
+import pytest
+
+from app.core import policy, pricing
+from app.core.money import from_cents, to_cents
+from app.core.policy import apply_discount_percentages, compute_discount
+from app.core.pricing import (
+    calculate_subtotal,
+    calculate_subtotal_batch,
+    calculate_tax,
+    calculate_total,
+    calculate_total_batch,
+    compile_pricing_rules,
+    get_pricing_rule,
+)
+
+
+def _random_order(rng: random.Random) -> dict:
+    item_count = rng.choice([0, 1, 2, 3, 5, 10, 40])
+    return {
+        "items": [
+            {
+                "sku": f"SKU-{i}",
+                "qty": rng.randint(1, 20),
+                "unit_price": rng.choice(
+                    [
+                        round(rng.uniform(0.01, 500.0), 2),
+                        round(rng.uniform(0.01, 500.0), 3),
+                        rng.randint(1, 9999) / 200,  # exact half-cent prices
+                    ]
+                ),
+            }
+            for i in range(item_count)
+        ],
+        "tier": rng.choice(["free", "pro", "enterprise"]),
+        "region": rng.choice(["EU", "US", "APAC"]),
+        "coupon": rng.choice([None, "SAVE10", " vip50 ", "WELCOME", "BOGUS"]),
+        "weekday": rng.randint(0, 6),
+    }
+
+
+class TestCalculateTotalBatch:
+    def test_matches_calculate_total_for_random_orders(self):
+        rng = random.Random(1234)
+        orders = [_random_order(rng) for _ in range(5000)]
+
+        results = calculate_total_batch(orders, weekday=[o["weekday"] for o in orders])
+
+        for order, result in zip(orders, results):
+            expected = calculate_total(
+                items=order["items"],
+                tier=order["tier"],
+                region=order["region"],
+                coupon=order["coupon"],
+                weekday=order["weekday"],
+            )
+            assert result == expected
+
+    def test_shared_weekday(self):
+        order = {
+            "items": [{"sku": "ITEM-1", "qty": 10, "unit_price": 10.0}],
+            "tier": "pro",
+            "region": "US",
+            "coupon": "SAVE10",
+        }
+
+        results = calculate_total_batch([order, order], weekday=1)
+
+        assert results == [
+            {"subtotal": 100.0, "discount": 15.0, "tax": 6.8, "total": 91.8, "currency": "USD"}
+        ] * 2
+
+    def test_empty_batch(self):
+        assert calculate_total_batch([], weekday=0) == []
+
+
+class TestCalculateSubtotalBatch:
+    @pytest.mark.parametrize("sizes", [[1], [3, 0, 7], [1000, 1, 10]])
+    def test_matches_calculate_subtotal(self, sizes):
+        rng = random.Random(sum(sizes))
+        carts = [
+            [{"qty": rng.randint(1, 5), "unit_price": rng.uniform(0.01, 99.99)} for _ in range(size)]
+            for size in sizes
+        ]
+
+        assert calculate_subtotal_batch(carts).tolist() == [calculate_subtotal(c) for c in carts]
+
+
+class TestPricingRules:
+    SUBTOTALS = [0, 1, 999, 1001, 10000, 12345, 99999, 1234567]
+
+    def test_compiled_rules_match_branchy_code_for_every_combination(self):
+        tiers = list(policy.TIER_DISCOUNTS) + ["PRO", "unknown"]
+        regions = list(pricing.TAX_RATES) + ["MARS"]
+        coupons = [None, "", "  ", "bogus"] + [
+            variant
+            for code in policy.VALID_COUPONS
+            for variant in (code, code.lower(), f" {code} ")
+        ]
+
+        for tier, region, weekday, coupon in itertools.product(
+            tiers, regions, range(7), coupons
+        ):
+            rule = get_pricing_rule(tier, region, weekday, coupon)
+            for subtotal in self.SUBTOTALS:
+                discount = apply_discount_percentages(
+                    subtotal, rule.discount_percentages, rule.region_multiplier
+                )
+                expected = compute_discount(
+                    tier, region, from_cents(subtotal), coupon, weekday
+                )
+                assert from_cents(discount) == expected
+
+                taxable = subtotal - discount
+                tax = to_cents(from_cents(taxable) * rule.tax_rate)
+                assert from_cents(tax) == calculate_tax(from_cents(taxable), region)
+
+    def test_compiles_every_known_shape(self):
+        rules = compile_pricing_rules()
+
+        coupon_pcts = set(policy.VALID_COUPONS.values())
+        assert len(rules) == 3 * 3 * 2 * (len(coupon_pcts) + 1)
+        assert rules[("enterprise", "APAC", True, 50.0)].discount_percentages == (
+            15.0,
+            50.0,
+            5.0,
+        )
+
+    def test_rebuilds_when_tables_change(self):
+        items = [{"sku": "ITEM-1", "qty": 1, "unit_price": 100.0}]
+        assert calculate_total(items, "pro", "US", "SAVE10", 1)["discount"] == 15.0
+
+        with patch.dict(policy.VALID_COUPONS, {"SAVE10": 12.0, "NEW": 30.0}):
+            assert calculate_total(items, "pro", "US", "SAVE10", 1)["discount"] == 17.0
+            assert calculate_total(items, "pro", "US", "new", 1)["discount"] == 35.0
+
+        with patch.dict(pricing.TAX_RATES, {"US": 0.10}):
+            assert calculate_total(items, "pro", "US", None, 1)["tax"] == 9.5
+
+        with patch.object(policy, "TIER_DISCOUNTS", {"pro": 7.0}):
+            assert calculate_total(items, "pro", "US", None, 1)["discount"] == 7.0
+
+        assert calculate_total(items, "pro", "US", "SAVE10", 1)["discount"] == 15.0
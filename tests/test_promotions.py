@@ -0,0 +1,201 @@
+"""Tests for the promotion calendar and its use in pricing."""
+
+import itertools
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.core import promotions
+from app.core.policy import compute_discount
+from app.core.promotions import (
+    Promotion,
+    PromotionCalendar,
+    PromotionReloader,
+    load_promotion_calendar,
+    set_promotion_calendar,
+)
+from app.core.pricing import calculate_subtotal, calculate_total, calculate_total_batch
+from app.services import billing
+from app.services.simulation import simulate
+
+START = date(2026, 12, 1)  # A Tuesday
+
+RULES = [
+    {"name": "xmas", "start": "2026-12-20", "end": "2026-12-26", "percent": 10},
+    {"name": "eu-weekends", "start": "2026-12-01", "end": "2027-01-31", "percent": 2.5,
+     "regions": ["EU"], "weekdays": [5, 6]},
+    {"name": "apac-boxing-day", "start": "2026-12-26", "end": "2026-12-26", "percent": 7.5,
+     "regions": ["APAC"]},
+]
+
+ITEMS = [{"sku": "A", "qty": 3, "unit_price": 33.33}, {"sku": "B", "qty": 1, "unit_price": 0.99}]
+
+
+def calendar(days=31, start=START):
+    return PromotionCalendar([Promotion.from_dict(rule) for rule in RULES], start, days)
+
+
+@pytest.fixture
+def restore_calendar():
+    previous = promotions.get_promotion_calendar()
+    yield
+    set_promotion_calendar(previous)
+
+
+class TestPromotion:
+    def test_from_dict(self):
+        promotion = Promotion.from_dict(RULES[1])
+
+        assert promotion.start == date(2026, 12, 1)
+        assert promotion.percent == 2.5
+        assert (promotion.regions, promotion.weekdays) == (("EU",), (5, 6))
+
+    @pytest.mark.parametrize("rule", [
+        {"start": "2026-12-02", "end": "2026-12-01", "percent": 5},
+        {"start": "2026-12-01", "end": "2026-12-02", "percent": 0},
+        {"start": "2026-12-01", "end": "2026-12-02", "percent": 5, "weekdays": [7]},
+        {"start": "2026-12-01", "percent": 5},
+        {"start": "2026-12-01", "end": "2026-12-02", "percent": 5, "typo": 1},
+        {"start": 20261201, "end": "2026-12-02", "percent": 5},
+    ])
+    def test_rejects_invalid_rules(self, rule):
+        with pytest.raises(ValueError):
+            Promotion.from_dict(rule)
+
+
+class TestPromotionCalendar:
+    def test_lookup(self):
+        index = calendar()
+
+        assert index.adjustment("US", date(2026, 12, 19)) == 0.0
+        assert index.adjustment("EU", date(2026, 12, 19)) == 2.5  # Saturday
+        assert index.adjustment("US", date(2026, 12, 21)) == 10.0
+        assert index.adjustment("EU", date(2026, 12, 26)) == 12.5
+        assert index.adjustment("APAC", date(2026, 12, 26)) == 17.5
+        assert index.adjustment("MARS", date(2026, 12, 26)) == 10.0
+        assert index.end == date(2026, 12, 31)
+
+    def test_days_outside_the_window_match_the_table(self):
+        inside = calendar(days=62)
+        outside = calendar(days=1, start=date(2000, 1, 1))
+        days = [START + timedelta(days=offset) for offset in range(62)]
+
+        for region, day in itertools.product(["EU", "US", "APAC", "MARS"], days):
+            assert outside.adjustment(region, day) == inside.adjustment(region, day)
+
+    def test_vectorized_lookup_matches_scalar(self):
+        index = calendar()
+        rng = np.random.default_rng(0)
+        regions = rng.choice(["EU", "US", "APAC", "MARS"], 2000).tolist()
+        ordinals = START.toordinal() + rng.integers(-40, 80, 2000)
+
+        adjustments = index.adjustments(regions, ordinals)
+
+        assert adjustments.tolist() == [
+            index.adjustment(region, date.fromordinal(int(ordinal)))
+            for region, ordinal in zip(regions, ordinals)
+        ]
+        assert index.adjustments(["EU", "US"], date(2026, 12, 26).toordinal()).tolist() == [12.5, 10.0]
+
+    def test_no_promotions(self):
+        index = PromotionCalendar([], START, 10)
+
+        assert index.adjustment("EU", START) == 0.0
+        assert index.adjustments(["EU"], [1]).tolist() == [0.0]
+
+
+class TestPromotionPricing:
+    def test_matches_branchy_discount(self):
+        subtotal = calculate_subtotal(ITEMS)
+        for tier, region, weekday, coupon, promotion_pct in itertools.product(
+            ["free", "pro", "enterprise"], ["EU", "US", "APAC"], [2, 6], [None, "SAVE20"], [0.0, 2.5, 17.5]
+        ):
+            quote = calculate_total(ITEMS, tier, region, coupon, weekday, promotion_pct)
+            expected = compute_discount(tier, region, subtotal, coupon, weekday, promotion_pct)
+            assert quote["discount"] == expected
+
+    def test_batch_matches_single_quotes(self):
+        orders = [
+            {"tier": tier, "region": region, "items": ITEMS, "coupon": "SAVE10"}
+            for tier, region in itertools.product(["free", "pro", "enterprise"], ["EU", "US", "APAC"])
+        ]
+        promotion_pcts = [0.0, 2.5, 10.0, 12.5, 17.5, 0.0, 7.5, 10.0, 2.5]
+
+        batch = calculate_total_batch(orders, weekday=5, promotion_pct=promotion_pcts)
+
+        assert batch == [
+            calculate_total(order["items"], order["tier"], order["region"], order["coupon"], 5, pct)
+            for order, pct in zip(orders, promotion_pcts)
+        ]
+
+    def test_quotes_get_todays_promotions(self, restore_calendar):
+        today = date.today()
+        rules = [{"start": today.isoformat(), "end": today.isoformat(), "percent": 10, "regions": ["US"]}]
+        set_promotion_calendar(PromotionCalendar([Promotion.from_dict(rule) for rule in rules], today, 7))
+        order = {"user_id": "u1", "tier": "free", "items": ITEMS, "coupon": None}
+
+        us = billing.create_quote(region="US", **order)
+        eu = billing.create_quote(region="EU", **order)
+        batch = billing.create_quote_batch([{**order, "region": "US"}, {**order, "region": "EU"}])
+
+        weekday = today.weekday()
+        assert us["discount"] == compute_discount("free", "US", us["subtotal"], None, weekday, 10.0)
+        assert eu["discount"] == compute_discount("free", "EU", eu["subtotal"], None, weekday)
+        assert us["discount"] > eu["discount"]
+        assert batch == [us, eu]
+
+
+class TestPromotionReloader:
+    def test_rebuilds_when_the_file_or_the_day_changes(self, tmp_path):
+        path = tmp_path / "promotions.json"
+        path.write_text(json.dumps(RULES[:1]))
+        installed = []
+        today = [date(2026, 12, 19)]
+        reloader = PromotionReloader(str(path), 31, 60.0, installed.append, today=lambda: today[0])
+
+        assert not reloader.check()
+
+        path.write_text(json.dumps(RULES))
+        os.utime(path, ns=(1, 1))
+        assert reloader.check()
+        assert installed[-1].start == date(2026, 12, 19)
+        assert installed[-1].adjustment("APAC", date(2026, 12, 26)) == 17.5
+
+        today[0] = date(2026, 12, 20)
+        assert reloader.check()
+        assert installed[-1].start == date(2026, 12, 20)
+
+        path.write_text("not json")
+        os.utime(path, ns=(2, 2))
+        assert not reloader.check()
+        assert isinstance(reloader.last_error, ValueError)
+        assert len(installed) == 2
+
+    def test_load_promotion_calendar(self, tmp_path):
+        path = tmp_path / "promotions.json"
+        path.write_text(json.dumps(RULES))
+
+        index = load_promotion_calendar(str(path), 31, START)
+
+        assert index.adjustment("EU", date(2026, 12, 26)) == 12.5
+
+
+class TestSimulationPromotions:
+    def test_dated_orders_get_their_days_promotions(self, tmp_path, restore_calendar):
+        set_promotion_calendar(calendar())
+        orders = [
+            {"tier": "free", "region": "US", "items": ITEMS, "date": "2026-12-21"},
+            {"tier": "free", "region": "US", "items": ITEMS, "weekday": 0},
+        ]
+        path = tmp_path / "orders.ndjson"
+        path.write_text("".join(json.dumps(order) + "\n" for order in orders))
+
+        report = simulate(str(path), [])
+
+        # Only the dated order falls in the xmas promotion (both are Mondays)
+        dated = calculate_total(ITEMS, "free", "US", None, 0, 10.0)
+        undated = calculate_total(ITEMS, "free", "US", None, 0)
+        assert report["scenarios"][0]["discount"] == dated["discount"] + undated["discount"]
@@ -0,0 +1,219 @@
+"""Tests for the fraud risk rule engine."""
+
+import itertools
+import json
+import os
+import random
+
+import numpy as np
+import pytest
+
+from app.core.risk_rules import MAX_FLAGS, DecisionTable, RiskRule, RiskRuleReloader
+from app.core.utils import clamp, round_money
+from app.services import fraud
+from app.services.fraud import (
+    AMOUNT_THRESHOLDS,
+    FLAG_NAMES,
+    assess_risk,
+    assess_risk_many,
+    default_risk_rules,
+    set_risk_rules,
+)
+
+USERS = [f"user-{n}" for n in range(200)]
+AMOUNTS = [0.01, 4999.99, 5000.0, 5000.01, 9999.99, 10000.0, 10000.01, 1e9]
+REGIONS = ["EU", "US", "APAC", "MARS"]
+METHODS = ["card", "invoice", "wire"]
+
+
+def ladder(user_id, amount, region, payment_method):
+    """The if/elif ladder assess_risk used before risk rules."""
+    base_risk = fraud._hash_user_id(user_id)
+    flag_mask = 0
+    if amount > AMOUNT_THRESHOLDS.get(payment_method, 5000.0):
+        base_risk += 0.2
+        flag_mask |= 1
+    if region == "APAC" and payment_method == "invoice":
+        base_risk += 0.25
+        flag_mask |= 2
+    elif region == "APAC":
+        base_risk += 0.1
+        flag_mask |= 4
+    elif region == "EU":
+        base_risk -= 0.05
+    if payment_method == "invoice":
+        base_risk += 0.15
+        flag_mask |= 8
+    return round_money(clamp(base_risk, 0.0, 1.0)), flag_mask
+
+
+def walk(rules, region, payment_method, amount, risk_factor):
+    """Evaluate rules one by one, without a decision table."""
+    features = {"amount": amount, "risk_factor": risk_factor}
+    scores, flags = [], []
+    for rule in rules:
+        if (
+            (not rule.region or region in rule.region)
+            and region not in rule.region_not
+            and (not rule.payment_method or payment_method in rule.payment_method)
+            and payment_method not in rule.payment_method_not
+            and all(features[name] > threshold for name, threshold in rule.above)
+            and all(features[name] <= threshold for name, threshold in rule.at_most)
+        ):
+            scores.append(rule.score)
+            if rule.flag is not None:
+                flags.append(rule.flag)
+    return tuple(scores), flags
+
+
+def random_rules(count, seed=0):
+    rng = random.Random(seed)
+    flags = [None, None, "high_amount", "velocity", "new_device"]
+    rules = []
+    for n in range(count):
+        above = tuple((name, rng.choice(values)) for name, values in (
+            ("amount", [100.0, 1000.0, 5000.0, 5000.01]), ("risk_factor", [0.3, 0.5, 0.55]),
+        ) if rng.random() < 0.4)
+        at_most = tuple((name, rng.choice(values)) for name, values in (
+            ("amount", [2000.0, 10000.0]), ("risk_factor", [0.5, 0.9]),
+        ) if rng.random() < 0.3)
+        rules.append(RiskRule(
+            f"rule-{n}", rng.choice([0.05, 0.1, -0.05, 0.15]), rng.choice(flags),
+            region=tuple(rng.sample(REGIONS[:3], rng.randint(0, 2))),
+            region_not=tuple(rng.sample(REGIONS[:3], rng.randint(0, 1))),
+            payment_method=tuple(rng.sample(METHODS[:2], rng.randint(0, 1))),
+            payment_method_not=tuple(rng.sample(METHODS[:2], rng.randint(0, 1))),
+            above=above,
+            at_most=at_most,
+        ))
+    return rules
+
+
+@pytest.fixture
+def restore_rules():
+    yield
+    set_risk_rules(None)
+
+
+class TestDefaultRules:
+    def test_reproduce_the_original_ladder(self):
+        for row in itertools.product(USERS, AMOUNTS, REGIONS, METHODS):
+            result = assess_risk(*row)
+            assert (result["risk_score"], result["flag_mask"]) == ladder(*row)
+
+    def test_keep_the_flag_bits(self):
+        table = fraud.compile_risk_rules(default_risk_rules())
+
+        assert table.flag_names == FLAG_NAMES
+
+
+class TestRiskRule:
+    def test_from_dict(self):
+        rule = RiskRule.from_dict({
+            "name": "big-apac-card", "region": ["APAC"], "payment_method_not": ["invoice"],
+            "amount_above": 1000, "risk_factor_at_most": 0.5, "score": 0.3, "flag": "big_card",
+        })
+
+        assert rule == RiskRule(
+            "big-apac-card", 0.3, "big_card", region=("APAC",), payment_method_not=("invoice",),
+            above=(("amount", 1000.0),), at_most=(("risk_factor", 0.5),),
+        )
+
+    @pytest.mark.parametrize("data", [
+        {"region": ["EU"]},
+        {"score": 0.1, "amount_over": 5},
+        {"score": None},
+        {"score": 0.1, "region": "APAC"},
+        {"score": 0.1, "payment_method_not": "invoice"},
+        ["score", 0.1],
+    ])
+    def test_rejects_invalid_rules(self, data):
+        with pytest.raises(ValueError):
+            RiskRule.from_dict(data)
+
+
+class TestDecisionTable:
+    def test_matches_walking_the_rules(self):
+        rules = random_rules(300)
+        table = DecisionTable(rules)
+        rng = random.Random(1)
+        rows = [
+            (rng.choice(REGIONS), rng.choice(METHODS), rng.choice([50.0, 100.0, 2000.0, 5000.01, 7500.0, 20000.0]),
+             rng.choice([0.1, 0.3, 0.5, 0.55, 0.95]))
+            for _ in range(2000)
+        ]
+
+        for row in rows:
+            scores, flag_mask = table.evaluate(row[0], row[1], row[2:])
+            expected_scores, expected_flags = walk(rules, *row)
+            assert scores == expected_scores
+            assert table.flags_from_mask(flag_mask) == sorted(
+                set(expected_flags), key=lambda name: table.flag_bits[name]
+            )
+
+        regions, methods, amounts, factors = zip(*rows)
+        batch_scores, batch_masks = table.evaluate_many(regions, methods, (np.array(amounts), np.array(factors)))
+        for row, row_scores, flag_mask in zip(rows, batch_scores, batch_masks.tolist()):
+            scores, expected_mask = table.evaluate(row[0], row[1], row[2:])
+            assert row_scores.tolist() == [*scores, *[0.0] * (len(row_scores) - len(scores))]
+            assert flag_mask == expected_mask
+
+    def test_flags_get_bits_in_order(self):
+        table = DecisionTable([RiskRule("a", 0.1, "new"), RiskRule("b", 0.1, "first")], flags=["first"])
+
+        assert table.flag_bits == {"first": 1, "new": 2}
+
+    def test_rejects_too_many_flags(self):
+        rules = [RiskRule(f"rule-{n}", 0.1, f"flag-{n}") for n in range(MAX_FLAGS + 1)]
+
+        with pytest.raises(ValueError):
+            DecisionTable(rules)
+
+    def test_empty_rule_set(self):
+        table = DecisionTable([])
+
+        assert table.evaluate("EU", "card", (10.0, 0.5)) == ((), 0)
+        scores, masks = table.evaluate_many(["EU"], ["card"], (np.array([10.0]), np.array([0.5])))
+        assert scores.shape == (1, 0) and masks.tolist() == [0]
+
+
+class TestCustomRules:
+    def test_installed_rules_drive_assess_risk(self, restore_rules):
+        set_risk_rules([
+            RiskRule("risky-users", 0.5, "risky_user", above=(("risk_factor", 0.5),)),
+            RiskRule("eu", -0.05, region=("EU",)),
+        ])
+        risky = next(user for user in USERS if fraud._hash_user_id(user) > 0.5)
+        safe = next(user for user in USERS if fraud._hash_user_id(user) <= 0.5)
+
+        result = assess_risk(risky, 100.0, "EU", "invoice")
+        batch = assess_risk_many([risky, safe], [100.0, 100.0], ["EU", "EU"], ["invoice", "card"], include_flags=True)
+
+        assert result["flags"] == ["risky_user"]
+        assert result["flag_mask"] == 16
+        assert result["is_high_risk"]
+        assert batch["risk_score"].tolist() == [
+            result["risk_score"], round_money(fraud._hash_user_id(safe) - 0.05)
+        ]
+        assert batch["flags"] == [["risky_user"], []]
+
+
+class TestRiskRuleReloader:
+    def test_reloads_changed_files_and_keeps_rules_on_errors(self, tmp_path):
+        path = tmp_path / "rules.json"
+        path.write_text(json.dumps([{"score": 0.1}]))
+        installed = []
+        reloader = RiskRuleReloader(str(path), 60.0, installed.append)
+
+        assert not reloader.check()
+
+        path.write_text(json.dumps([{"name": "apac", "region": ["APAC"], "score": 0.2, "flag": "apac"}]))
+        os.utime(path, ns=(1, 1))
+        assert reloader.check()
+        assert installed[-1] == [RiskRule("apac", 0.2, "apac", region=("APAC",))]
+
+        path.write_text(json.dumps([{"region": ["APAC"]}]))
+        os.utime(path, ns=(2, 2))
+        assert not reloader.check()
+        assert isinstance(reloader.last_error, ValueError)
+        assert len(installed) == 1
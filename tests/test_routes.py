@@ -10,7 +10,10 @@ from unittest.mock import patch
 import pytest
 from fastapi.testclient import TestClient
 
+from app.api import responses, routes
+from app.core.pricing import calculate_total
 from app.main import app
+from app.services import billing
 
 client = TestClient(app)
 
@@ -103,6 +106,97 @@ class TestQuoteEndpoint:
         assert response.status_code == 422
 
 
+    @patch("app.services.billing.datetime")
+    def test_cached_quote_sums_items_in_request_order(self, mock_datetime):
+        """Test that cached quotes price items in the order they were sent."""
+        mock_datetime.now.return_value.weekday.return_value = 2
+        items = [
+            {"sku": "SKU-001", "qty": 2, "unit_price": 98.735},
+            {"sku": "SKU-002", "qty": 8, "unit_price": 11.861},
+            {"sku": "SKU-003", "qty": 6, "unit_price": 29.81},
+            {"sku": "SKU-004", "qty": 7, "unit_price": 40.211},
+        ]
+        body = {"user_id": "user-123", "tier": "free", "region": "US", "items": items}
+        expected = calculate_total(items, "free", "US", None, 2)
+
+        billing.configure_quote_cache(maxsize=100)
+        try:
+            first = client.post("/quote", json={**body, "items": sorted(items, key=lambda item: item["unit_price"])})
+            responses = [client.post("/quote", json=body).json() for _ in range(2)]
+        finally:
+            billing.configure_quote_cache(maxsize=billing.get_settings().quote_cache_size)
+        batch = client.post("/quote/batch", json={"quotes": [body]}).json()["quotes"][0]
+
+        assert first.status_code == 200
+        for data in [*responses, batch]:
+            assert (data["subtotal"], data["total"]) == (expected["subtotal"], expected["total"])
+        assert expected["subtotal"] == 752.69
+
+
+    @patch("app.services.billing.datetime")
+    def test_quantity_beyond_int64(self, mock_datetime):
+        """Test that a huge qty is priced like /quote/batch instead of failing."""
+        mock_datetime.now.return_value.weekday.return_value = 2
+        body = {
+            "user_id": "user-123", "tier": "free", "region": "US",
+            "items": [{"sku": "SKU-001", "qty": 10**20, "unit_price": 1.5}],
+        }
+
+        responses = [client.post("/quote", json=body) for _ in range(2)]
+        batch = client.post("/quote/batch", json={"quotes": [body]})
+
+        assert [response.status_code for response in responses] == [200, 200]
+        assert batch.status_code == 200
+        assert responses[0].json() == responses[1].json() == batch.json()["quotes"][0]
+
+
+class TestQuoteBatchEndpoint:
+    """Tests for POST /quote/batch endpoint."""
+
+    @patch("app.services.billing.datetime")
+    def test_batch_matches_single_quotes(self, mock_datetime):
+        """Test that batch quotes equal the individual /quote responses."""
+        mock_datetime.now.return_value.weekday.return_value = 6  # Sunday
+
+        quotes = [
+            {
+                "user_id": "user-123",
+                "tier": "free",
+                "region": "EU",
+                "items": [{"sku": "SKU-001", "qty": 2, "unit_price": 25.0}],
+            },
+            {
+                "user_id": "user-456",
+                "tier": "enterprise",
+                "region": "APAC",
+                "items": [
+                    {"sku": "SKU-002", "qty": 3, "unit_price": 19.99},
+                    {"sku": "SKU-003", "qty": 1, "unit_price": 250.0},
+                ],
+                "coupon": "welcome",
+            },
+        ]
+
+        response = client.post("/quote/batch", json={"quotes": quotes})
+
+        assert response.status_code == 200
+        expected = [client.post("/quote", json=quote).json() for quote in quotes]
+        assert response.json() == {"quotes": expected}
+
+    def test_batch_empty_items_rejected(self):
+        """Test that an order with no items rejects the batch."""
+        response = client.post(
+            "/quote/batch",
+            json={
+                "quotes": [
+                    {"user_id": "user-789", "tier": "free", "region": "EU", "items": []},
+                ]
+            },
+        )
+
+        assert response.status_code == 400
+
+
 class TestChargeEndpoint:
     """Tests for POST /charge endpoint."""
 
@@ -173,3 +267,90 @@ class TestChargeEndpoint:
         )
 
         assert response.status_code == 422
+
+
+class TestChargeBatchEndpoint:
+    """Tests for POST /charge/batch endpoint."""
+
+    CHARGES = [
+        {
+            "user_id": "safe-customer",
+            "amount": 50.0,
+            "payment_method": "card",
+            "region": "EU",
+        },
+        {
+            "user_id": "apac-customer",
+            "amount": 12000.0,
+            "payment_method": "invoice",
+            "region": "APAC",
+        },
+    ]
+
+    def test_batch_matches_single_charges(self):
+        """Test that batch results equal the individual /charge responses."""
+        response = client.post("/charge/batch", json={"charges": self.CHARGES})
+
+        assert response.status_code == 200
+        expected = [client.post("/charge", json=c).json() for c in self.CHARGES]
+        assert response.json() == {"charges": expected}
+
+    def test_batch_includes_flags_on_request(self):
+        """Test that risk flags are returned when requested."""
+        response = client.post(
+            "/charge/batch",
+            json={"charges": self.CHARGES, "include_flags": True},
+        )
+
+        assert response.status_code == 200
+        results = response.json()["charges"]
+        assert results[0]["flags"] == []
+        assert results[1]["flags"] == [
+            "high_amount",
+            "apac_invoice_review",
+            "invoice_payment",
+        ]
+
+
+class TestFastResponses:
+    """CONTO_FAST_RESPONSES returns the same JSON without response-model validation."""
+
+    REQUESTS = [
+        ("/quote", {
+            "user_id": "user-123",
+            "tier": "pro",
+            "region": "APAC",
+            "items": [{"sku": "SKU-001", "qty": 3, "unit_price": 19.99}],
+            "coupon": "SAVE10",
+        }),
+        ("/quote/batch", {"quotes": [
+            {"user_id": "u1", "tier": "free", "region": "EU",
+             "items": [{"sku": "A", "qty": 1, "unit_price": 10.0}]},
+            {"user_id": "u2", "tier": "enterprise", "region": "US",
+             "items": [{"sku": "B", "qty": 7, "unit_price": 0.35}], "coupon": "VIP50"},
+        ]}),
+        ("/charge", TestChargeBatchEndpoint.CHARGES[1]),
+        ("/charge/batch", {"charges": TestChargeBatchEndpoint.CHARGES}),
+        ("/charge/batch", {"charges": TestChargeBatchEndpoint.CHARGES, "include_flags": True}),
+    ]
+
+    @pytest.mark.parametrize("path,body", REQUESTS)
+    @patch("app.services.billing.datetime")
+    def test_same_json_as_validated_response(self, mock_datetime, monkeypatch, path, body):
+        mock_datetime.now.return_value.weekday.return_value = 5
+        expected = client.post(path, json=body)
+
+        monkeypatch.setattr(routes, "FAST_RESPONSES", True)
+        response = client.post(path, json=body)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == expected.json()
+
+    def test_pure_python_encoder_matches(self, monkeypatch):
+        content = {"total": 91.8, "reason": "Transaction approved", "flags": ["ü"], "ok": True}
+        encoded = responses.dumps(content)
+
+        monkeypatch.setattr(responses, "orjson", None)
+
+        assert responses.dumps(content) == encoded
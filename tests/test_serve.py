@@ -0,0 +1,58 @@
+"""Tests for the pre-forking server entry point."""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from app import main
+from app.core import pricing
+from app.serve import bind_socket, default_workers
+
+
+class TestServe:
+    def test_default_workers_is_positive(self):
+        assert default_workers() >= 1
+
+    def test_warm_caches_compiles_rules_once(self, monkeypatch):
+        monkeypatch.setattr(main, "_warmed", False)
+        monkeypatch.setattr(pricing, "_compiled_rules", ((), {}))
+
+        main.warm_caches()
+        compiled = pricing._compiled_rules
+        main.warm_caches()
+
+        assert compiled[1]
+        assert pricing._compiled_rules is compiled
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+    def test_forked_workers_serve_and_stop_on_sigterm(self):
+        with bind_socket("127.0.0.1", 0) as probe:
+            port = probe.getsockname()[1]
+        server = subprocess.Popen(
+            [sys.executable, "-m", "app.serve", "--workers", "2", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                        assert response.status == 200
+                        break
+                except OSError:
+                    assert time.monotonic() < deadline and server.poll() is None
+                    time.sleep(0.05)
+
+            children = f"/proc/{server.pid}/task/{server.pid}/children"
+            if os.path.exists(children):
+                with open(children) as f:
+                    assert len(f.read().split()) == 2
+        finally:
+            server.send_signal(signal.SIGTERM)
+            assert server.wait(timeout=30) == 0
@@ -0,0 +1,142 @@
+"""Tests for the what-if pricing simulator."""
+
+import json
+
+import pytest
+
+from app.cli import simulate as simulate_cli
+from app.core import policy, pricing
+from app.core.money import to_cents
+from app.core.pricing import calculate_total, pricing_rules_version
+from app.services.simulation import (
+    Scenario,
+    load_scenarios,
+    parse_order,
+    scenario_tables,
+    shard_ranges,
+    simulate,
+)
+
+ORDERS = [
+    {"tier": "free", "region": "EU", "items": [{"sku": "A", "qty": 2, "unit_price": 25.0}], "weekday": 2},
+    {"tier": "pro", "region": "US", "items": [{"sku": "B", "qty": 1, "unit_price": 100.0}],
+     "coupon": "SAVE10", "date": "2025-03-15"},
+    {"tier": "enterprise", "region": "APAC", "items": [{"sku": "C", "qty": 3, "unit_price": 19.99},
+     {"sku": "D", "qty": 1, "unit_price": 250.0}], "coupon": "VIP50", "weekday": 6},
+    {"tier": "pro", "region": "EU", "items": [{"sku": "E", "qty": 7, "unit_price": 0.35}],
+     "coupon": "bogus", "weekday": 0},
+]
+
+SCENARIOS = [
+    Scenario("vat-21", tax_rates={"EU": 0.21}),
+    Scenario("cap-40", tier_discounts={"enterprise": 20.0}, max_discount_rate=0.4),
+]
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "orders.ndjson"
+    path.write_text("".join(json.dumps(order) + "\n" for order in ORDERS * 25))
+    return str(path)
+
+
+def expected_totals(scenario):
+    """Sum calculate_total over ORDERS * 25 under a scenario, in cents."""
+    totals = dict.fromkeys(("subtotal", "discount", "tax", "total"), 0)
+    with scenario_tables(scenario):
+        for order in ORDERS:
+            quote = calculate_total(
+                items=order["items"],
+                tier=order["tier"],
+                region=order["region"],
+                coupon=order.get("coupon"),
+                weekday=parse_order(json.dumps(order).encode())["weekday"],
+            )
+            for amount in totals:
+                totals[amount] += to_cents(quote[amount]) * 25
+    return totals
+
+
+class TestScenarios:
+    def test_tables_are_overridden_and_restored(self):
+        original = (pricing.TAX_RATES, policy.TIER_DISCOUNTS, policy.MAX_DISCOUNT_RATE)
+        version = pricing_rules_version()
+
+        with scenario_tables(SCENARIOS[1]):
+            assert policy.TIER_DISCOUNTS["enterprise"] == 20.0
+            assert policy.TIER_DISCOUNTS["pro"] == 5.0
+            assert policy.compute_discount("free", "EU", 100.0, "VIP50", 6) == 40.0
+            assert pricing_rules_version() != version
+
+        assert (pricing.TAX_RATES, policy.TIER_DISCOUNTS, policy.MAX_DISCOUNT_RATE) == original
+        assert pricing_rules_version() == version
+
+    def test_load_scenarios(self, tmp_path):
+        path = tmp_path / "eu.json"
+        path.write_text(json.dumps({"tax_rates": {"EU": 0.19}}))
+
+        assert load_scenarios(str(path)) == [Scenario("eu", tax_rates={"EU": 0.19})]
+
+        path.write_text(json.dumps({"tax_rate": {"EU": 0.19}}))
+        with pytest.raises(ValueError):
+            load_scenarios(str(path))
+
+
+class TestSimulate:
+    def test_matches_calculate_total(self, dataset):
+        report = simulate(dataset, SCENARIOS, workers=1, chunk_size=7)
+
+        assert report["orders"] == 100
+        assert report["skipped"] == 0
+        for result, scenario in zip(report["scenarios"], [Scenario("baseline"), *SCENARIOS]):
+            assert result["name"] == scenario.name
+            expected = expected_totals(scenario)
+            assert {amount: to_cents(result[amount]) for amount in expected} == expected
+
+    def test_deltas_against_baseline(self, dataset):
+        baseline, vat, _ = simulate(dataset, SCENARIOS, workers=1)["scenarios"]
+
+        assert vat["delta"]["discount"] == 0.0
+        assert vat["delta"]["tax"] == pytest.approx(vat["tax"] - baseline["tax"])
+        assert vat["delta_pct"]["total"] > 0
+
+    def test_process_pool_matches_inline(self, dataset):
+        inline = simulate(dataset, SCENARIOS, workers=1)
+
+        assert simulate(dataset, SCENARIOS, workers=2, chunk_size=10) == inline
+
+    def test_invalid_lines_are_skipped(self, tmp_path):
+        path = tmp_path / "orders.ndjson"
+        path.write_text(
+            json.dumps(ORDERS[0]) + "\n\nnot json\n"
+            + json.dumps({**ORDERS[0], "weekday": 9}) + "\n"
+            + json.dumps({"tier": "pro", "region": "EU", "items": []}) + "\n"
+        )
+
+        report = simulate(str(path), [], workers=1)
+
+        assert (report["orders"], report["skipped"]) == (1, 3)
+        assert report["scenarios"][0]["subtotal"] == 50.0
+
+    def test_shard_ranges_split_on_lines(self, dataset):
+        with open(dataset, "rb") as f:
+            data = f.read()
+
+        ranges = shard_ranges(dataset, 8)
+
+        assert len(ranges) == 8
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+        assert all(data[start - 1:start] == b"\n" for start, _ in ranges[1:])
+
+    def test_cli_writes_json_report(self, dataset, tmp_path, capsys):
+        scenario_path = tmp_path / "scenarios.json"
+        scenario_path.write_text(json.dumps([{"name": "vat-21", "tax_rates": {"EU": 0.21}}]))
+        report_path = tmp_path / "report.json"
+
+        status = simulate_cli([dataset, "-s", str(scenario_path), "-w", "1", "--json", str(report_path)])
+
+        assert status == 0
+        assert "vat-21" in capsys.readouterr().out
+        report = json.loads(report_path.read_text())
+        assert [result["name"] for result in report["scenarios"]] == ["baseline", "vat-21"]
@@ -0,0 +1,183 @@
+"""Tests for single-flight coalescing and its use in billing, fraud and routes."""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.api import routes
+from app.core.singleflight import AsyncSingleFlight, SingleFlight
+from app.core.velocity import VelocityTracker
+from app.main import app
+from app.services import billing, fraud
+
+
+def run_concurrently(count, target):
+    """Run target() in `count` threads started together; return their results."""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = target()
+        except Exception as exc:
+            results[index] = exc
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class SlowCounter:
+    """Callable that counts calls and takes long enough for others to join."""
+
+    def __init__(self, result=None, delay=0.1):
+        self.calls = 0
+        self.result = result
+        self.delay = delay
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result if self.result is not None else {"args": args, **kwargs}
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_result(self):
+        flight = SingleFlight("test", share=dict)
+        work = SlowCounter({"value": 1})
+
+        results = run_concurrently(8, lambda: flight.do("key", work))
+
+        assert work.calls == 1
+        assert all(result == {"value": 1} for result in results)
+        assert len({id(result) for result in results}) == 8  # Shared results are copied
+        assert (flight.calls, flight.coalesced, flight.in_flight()) == (1, 7, 0)
+
+    def test_exception_reaches_every_caller(self):
+        flight = SingleFlight("test")
+        work = SlowCounter(ValueError("boom"))
+
+        results = run_concurrently(4, lambda: flight.do("key", work))
+
+        assert work.calls == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_nothing_is_cached_after_the_call(self):
+        flight = SingleFlight("test")
+        work = SlowCounter(delay=0)
+
+        flight.do("key", work, 1)
+        flight.do("key", work, 2)
+
+        assert work.calls == 2
+
+
+class TestAsyncSingleFlight:
+    def test_concurrent_awaits_share_one_call(self):
+        flight = AsyncSingleFlight("test")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        async def scenario():
+            return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+        assert asyncio.run(scenario()) == [1] * 5
+        assert (flight.calls, flight.coalesced, flight.in_flight()) == (1, 4, 0)
+
+    def test_cancelled_caller_does_not_cancel_the_others(self):
+        flight = AsyncSingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            return "done"
+
+        async def scenario():
+            first = asyncio.create_task(flight.do("key", work))
+            second = asyncio.create_task(flight.do("key", work))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(scenario()) == "done"
+
+
+@pytest.fixture
+def coalescing(monkeypatch):
+    for module in (billing, fraud, routes):
+        monkeypatch.setattr(module, "COALESCE", True)
+
+
+class TestCoalescedServices:
+    ITEMS = [{"sku": "A", "qty": 2, "unit_price": 19.99}, {"sku": "B", "qty": 1, "unit_price": 5.0}]
+
+    def test_identical_quotes_price_once(self, coalescing, monkeypatch):
+        monkeypatch.setattr(billing, "_quote_cache", None)
+        expected = billing.create_quote("u", "pro", "EU", self.ITEMS, "SAVE10")
+        pricing = SlowCounter(expected)
+        monkeypatch.setattr(billing, "calculate_total", pricing)
+
+        results = run_concurrently(6, lambda: billing.create_quote("u", "pro", "EU", self.ITEMS[::-1], "save10"))
+
+        assert pricing.calls == 1
+        assert results == [expected] * 6
+
+    def test_risk_results_are_independent_copies(self, coalescing):
+        results = run_concurrently(4, lambda: fraud.assess_risk("retrying-user", 12000.0, "APAC", "invoice"))
+
+        assert all(result == results[0] for result in results)
+        assert len({id(result["flags"]) for result in results}) == 4
+
+    def test_identical_requests_share_one_executor_call(self, coalescing, monkeypatch):
+        expected = {"subtotal": 1.0, "discount": 0.0, "tax": 0.2, "total": 1.2, "currency": "USD"}
+        create_quote = SlowCounter(expected, delay=0.05)
+        monkeypatch.setattr(routes, "create_quote", create_quote)
+        body = {"user_id": "u", "tier": "pro", "region": "EU", "items": self.ITEMS}
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(client.post("/quote", json=body) for _ in range(5)))
+
+        responses = asyncio.run(scenario())
+
+        assert create_quote.calls == 1
+        assert [response.json() for response in responses] == [expected] * 5
+
+    def test_tracked_charges_are_not_merged(self, coalescing, monkeypatch):
+        monkeypatch.setattr(fraud, "_velocity", VelocityTracker(300.0, 3600.0, 60.0, 100))
+        expected = {"approved": True, "reason": "Transaction approved", "risk_score": 0.1}
+        charge = SlowCounter(expected, delay=0.05)
+        monkeypatch.setattr(routes, "charge", charge)
+        body = {"user_id": "u", "amount": 10.0, "currency": "USD", "payment_method": "card", "region": "EU"}
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(client.post("/charge", json=body) for _ in range(5)))
+
+        responses = asyncio.run(scenario())
+
+        assert charge.calls == 5
+        assert [response.status_code for response in responses] == [200] * 5
+
+    def test_tracked_risk_assessments_are_each_recorded(self, coalescing, monkeypatch):
+        tracker = VelocityTracker(300.0, 3600.0, 60.0, 100)
+        monkeypatch.setattr(fraud, "_velocity", tracker)
+
+        run_concurrently(4, lambda: fraud.assess_risk("retrying-user", 12000.0, "APAC", "invoice"))
+
+        assert tracker.record("retrying-user", 0) == (5, 4_800_000)
@@ -0,0 +1,69 @@
+"""
+Cold-start tests.
+
+The startup budget defaults to 5 seconds from process launch to the first
+/health response; set CONTO_STARTUP_BUDGET_SECONDS to tighten or relax it.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+STARTUP_BUDGET_SECONDS = float(os.environ.get("CONTO_STARTUP_BUDGET_SECONDS", "5.0"))
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestColdStart:
+    def test_first_health_response_within_budget(self):
+        port = free_port()
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=REPO_ROOT,
+        )
+        try:
+            while True:
+                elapsed = time.perf_counter() - started
+                assert elapsed < STARTUP_BUDGET_SECONDS, (
+                    f"no /health response within {STARTUP_BUDGET_SECONDS}s"
+                )
+                assert server.poll() is None, "server exited during startup"
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                        assert response.status == 200
+                        break
+                except OSError:
+                    time.sleep(0.01)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    def test_importing_app_defers_numpy(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, app.main; print('numpy.linalg' in sys.modules)"],
+            capture_output=True,
+            text=True,
+            cwd=REPO_ROOT,
+            check=True,
+        )
+        assert result.stdout.strip() == "False"
+
+    def test_importing_app_defers_multiprocessing(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, app.main; print('multiprocessing' in sys.modules)"],
+            capture_output=True,
+            text=True,
+            cwd=REPO_ROOT,
+            check=True,
+        )
+        assert result.stdout.strip() == "False"
@@ -0,0 +1,174 @@
+"""Tests for streaming NDJSON quoting."""
+
+import asyncio
+import json
+import random
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.api.routes import parse_quote_line
+from app.cli import quote_stream
+from app.core.pricing import calculate_total
+from app.main import app
+from app.services.streaming import LineTooLongError, aiter_chunks, aiter_lines, quote_ndjson
+
+client = TestClient(app)
+
+ORDERS = [
+    {
+        "user_id": "user-1",
+        "tier": "free",
+        "region": "EU",
+        "items": [{"sku": "A", "qty": 2, "unit_price": 25.0}],
+    },
+    {
+        "user_id": "user-2",
+        "tier": "pro",
+        "region": "APAC",
+        "items": [{"sku": "B", "qty": 3, "unit_price": 19.99}],
+        "coupon": "SAVE10",
+    },
+    {"user_id": "user-3", "tier": "gold", "region": "EU", "items": []},
+    {
+        "user_id": "user-4",
+        "tier": "enterprise",
+        "region": "US",
+        "items": [{"sku": "C", "qty": 1, "unit_price": 999.99}],
+    },
+]
+
+
+def _ndjson(orders) -> bytes:
+    return b"".join(json.dumps(order).encode() + b"\n" for order in orders)
+
+
+def _expected(order: dict, weekday: int) -> dict:
+    return calculate_total(
+        order["items"], order["tier"], order["region"], order.get("coupon"), weekday
+    )
+
+
+@patch("app.services.billing.datetime")
+class TestQuoteNdjson:
+    def test_one_output_line_per_order_across_chunks(self, mock_datetime):
+        mock_datetime.now.return_value.weekday.return_value = 2
+
+        blocks = list(quote_ndjson(_ndjson(ORDERS).splitlines(), parse_quote_line, chunk_size=2))
+
+        assert len(blocks) == 2
+        results = [json.loads(line) for block in blocks for line in block.splitlines()]
+        assert results[0] == _expected(ORDERS[0], 2)
+        assert results[1] == _expected(ORDERS[1], 2)
+        assert "error" in results[2]
+        assert results[3] == _expected(ORDERS[3], 2)
+
+    def test_skips_blank_lines(self, mock_datetime):
+        mock_datetime.now.return_value.weekday.return_value = 2
+        lines = [b"", json.dumps(ORDERS[0]).encode(), b"   "]
+
+        output = b"".join(quote_ndjson(lines, parse_quote_line))
+
+        assert output.count(b"\n") == 1
+
+    def test_cli_streams_file(self, mock_datetime, tmp_path):
+        mock_datetime.now.return_value.weekday.return_value = 6
+        source = tmp_path / "orders.ndjson"
+        target = tmp_path / "quotes.ndjson"
+        source.write_bytes(_ndjson(ORDERS))
+
+        assert quote_stream([str(source), "-o", str(target), "--chunk-size", "3"]) == 0
+
+        results = [json.loads(line) for line in target.read_bytes().splitlines()]
+        assert len(results) == len(ORDERS)
+        assert results[1] == _expected(ORDERS[1], 6)
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+async def _stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _lines(chunks, max_line_bytes=1 << 20):
+    return asyncio.run(_collect(aiter_lines(_stream(chunks), max_line_bytes)))
+
+
+class TestAiterLines:
+    def test_matches_split_for_any_chunking(self):
+        rng = random.Random(4)
+        data = b"".join(b"x" * rng.randrange(0, 50) + b"\n" for _ in range(200)) + b"tail"
+        cuts = sorted(rng.sample(range(1, len(data)), 300))
+        chunks = [data[start:end] for start, end in zip([0, *cuts], [*cuts, len(data)])]
+
+        assert _lines(chunks) == data.split(b"\n")
+
+    def test_long_line_in_many_chunks_is_joined_once(self):
+        assert _lines([b"a" * 10] * 1000 + [b"\nb"]) == [b"a" * 10_000, b"b"]
+
+    @pytest.mark.parametrize("chunks", [[b"x" * 11], [b"x" * 6, b"x" * 5, b"\n"], [b"ok\n" + b"x" * 11 + b"\n"]])
+    def test_rejects_lines_over_the_limit(self, chunks):
+        with pytest.raises(LineTooLongError):
+            _lines(chunks, max_line_bytes=10)
+
+    def test_line_at_the_limit_is_accepted(self):
+        assert _lines([b"x" * 5, b"x" * 5 + b"\n"], max_line_bytes=10) == [b"x" * 10]
+
+    def test_chunks_before_a_long_line_are_still_yielded(self):
+        lines = aiter_lines(_stream([b"a\nb\n" + b"x" * 20]), max_line_bytes=10)
+
+        async def scenario():
+            chunks = []
+            with pytest.raises(LineTooLongError):
+                async for chunk in aiter_chunks(lines, chunk_size=10):
+                    chunks.append(chunk)
+            return chunks
+
+        assert asyncio.run(scenario()) == [[b"a", b"b"]]
+
+
+class TestQuoteStreamEndpoint:
+    @patch("app.services.billing.datetime")
+    def test_streams_quotes(self, mock_datetime):
+        mock_datetime.now.return_value.weekday.return_value = 1
+
+        response = client.post(
+            "/quote/stream?chunk_size=3",
+            content=_ndjson(ORDERS),
+            headers={"content-type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert len(results) == len(ORDERS)
+        assert results[0] == client.post("/quote", json=ORDERS[0]).json()
+        assert "error" in results[2]
+        assert results[3] == client.post("/quote", json=ORDERS[3]).json()
+
+    @patch("app.services.billing.datetime")
+    def test_long_line_ends_the_stream_with_an_error(self, mock_datetime, monkeypatch):
+        mock_datetime.now.return_value.weekday.return_value = 1
+        monkeypatch.setattr(routes, "STREAM_MAX_LINE_BYTES", 500)
+
+        response = client.post(
+            "/quote/stream",
+            content=_ndjson(ORDERS[:2]) + b"x" * 1000 + b"\n" + _ndjson(ORDERS[3:]),
+            headers={"content-type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert results[:2] == [client.post("/quote", json=order).json() for order in ORDERS[:2]]
+        assert results[2] == {"error": "Line longer than 500 bytes"}
+        assert len(results) == 3
+
+    def test_rejects_bad_chunk_size(self):
+        response = client.post("/quote/stream?chunk_size=0", content=b"")
+
+        assert response.status_code == 422
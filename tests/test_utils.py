@@ -1,5 +1,6 @@
 """Tests for utility functions - thoroughly tested module."""
 
+import numpy as np
 import pytest
 
 from app.core.utils import (
@@ -7,6 +8,7 @@ from app.core.utils import (
     clamp,
     normalize_coupon,
     round_money,
+    round_money_array,
     safe_float,
 )
 
@@ -27,6 +29,26 @@ class TestRoundMoney:
         assert round_money(-10.555) == -10.56  # ROUND_HALF_UP rounds away from zero
 
 
+class TestRoundMoneyArray:
+    def test_matches_round_money(self):
+        rng = np.random.default_rng(42)
+        values = np.concatenate(
+            [
+                rng.integers(0, 10**7, 100_000) / 1000,  # half-cent ties
+                rng.uniform(-1e6, 1e6, 100_000),
+                np.array([1.005, 2.675, 0.285, -10.555, 0.0, -0.0, 1e20]),
+            ]
+        )
+
+        expected = [round_money(v) for v in values.tolist()]
+
+        assert round_money_array(values).tolist() == expected
+
+    def test_rounds_to_specified_decimals(self):
+        assert round_money_array(np.array([10.5555]), decimals=3).tolist() == [10.556]
+        assert round_money_array(np.array([10.5]), decimals=0).tolist() == [11.0]
+
+
 class TestNormalizeCoupon:
     def test_normalizes_to_uppercase(self):
         assert normalize_coupon("save10") == "SAVE10"
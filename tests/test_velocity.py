@@ -0,0 +1,154 @@
+"""Tests for the charge velocity tracker and the velocity risk features."""
+
+import random
+from collections import deque
+
+import pytest
+
+from app.core.risk_rules import RiskRule
+from app.core.velocity import VelocityTracker
+from app.services import fraud
+from app.services.fraud import assess_risk, assess_risk_many, set_risk_rules, set_velocity_tracker
+from app.settings import Settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = FakeClock()
+    tracker = fraud.get_velocity_tracker()
+    set_velocity_tracker(VelocityTracker(300.0, 3600.0, 60.0, 1000, clock=clock))
+    yield clock
+    set_velocity_tracker(tracker)
+    set_risk_rules(None)
+
+
+class TestVelocityTracker:
+    def test_counts_and_amounts_within_windows(self):
+        clock = FakeClock()
+        tracker = VelocityTracker(300.0, 3600.0, 60.0, 10, clock=clock)
+
+        assert tracker.record("u", 1000) == (1, 1000)
+        assert tracker.record("u", 500) == (2, 1500)
+        clock.now = 299.0  # Bucket 4, still in the 5-bucket count window
+        assert tracker.record("u", 100) == (3, 1600)
+        clock.now = 300.0  # Bucket 5: bucket 0 left the count window
+        assert tracker.record("u", 100) == (2, 1700)
+        clock.now = 3600.0  # Bucket 60: bucket 0 left the amount window
+        assert tracker.record("u", 1) == (1, 201)
+        assert tracker.record("other", 7) == (1, 7)
+
+    def test_matches_keeping_every_charge(self):
+        rng = random.Random(5)
+        clock = FakeClock()
+        tracker = VelocityTracker(300.0, 3600.0, 60.0, 1000, clock=clock)
+        history = {}
+        for _ in range(5000):
+            clock.now += rng.expovariate(1 / 20)
+            user_id = f"user-{rng.randrange(20)}"
+            cents = rng.randrange(1, 100_000)
+            bucket = int(clock.now // 60)
+            charges = history.setdefault(user_id, deque())
+            charges.append((bucket, cents))
+
+            count = sum(1 for charge_bucket, _ in charges if charge_bucket > bucket - 5)
+            amount = sum(charge_cents for charge_bucket, charge_cents in charges if charge_bucket > bucket - 60)
+            assert tracker.record(user_id, cents) == (count, amount)
+
+    def test_idle_users_are_dropped(self):
+        clock = FakeClock()
+        tracker = VelocityTracker(300.0, 3600.0, 60.0, 10, clock=clock)
+        tracker.record("a", 100)
+        clock.now = 1800.0
+        tracker.record("b", 100)
+
+        clock.now = 3600.0
+        tracker.record("b", 100)
+        assert len(tracker) == 1
+        assert tracker.record("a", 100) == (1, 100)
+        assert tracker.stats()["evicted_idle"] == 1
+
+    def test_least_recently_charged_users_are_evicted(self):
+        tracker = VelocityTracker(300.0, 3600.0, 60.0, 2, clock=FakeClock())
+        for user_id in ("a", "b", "a", "c"):
+            tracker.record(user_id, 100)
+
+        assert len(tracker) == 2
+        assert tracker.stats()["evicted_full"] == 1
+        assert tracker.record("a", 100) == (3, 300)
+        assert tracker.record("b", 100) == (1, 100)  # Forgotten
+
+    def test_memory_follows_buckets_not_charges(self):
+        clock = FakeClock()
+        tracker = VelocityTracker(300.0, 3600.0, 60.0, 10, clock=clock)
+        for n in range(10_000):
+            clock.now = n * 1.0
+            tracker.record("u", 1)
+
+        assert len(tracker._users["u"]) == 1 + 3 * 60
+
+    @pytest.mark.parametrize("windows", [(30.0, 3600.0, 60.0), (600.0, 300.0, 60.0), (300.0, 3600.0, 0.0)])
+    def test_rejects_invalid_windows(self, windows):
+        with pytest.raises(ValueError):
+            VelocityTracker(*windows, maxsize=10)
+
+
+class TestVelocitySettings:
+    def test_tracking_is_opt_in(self, monkeypatch):
+        monkeypatch.delenv("CONTO_VELOCITY_USERS", raising=False)
+
+        assert Settings.from_env().velocity_users == 0
+
+    def test_enabled_from_the_environment(self, monkeypatch):
+        monkeypatch.setenv("CONTO_VELOCITY_USERS", "500")
+        monkeypatch.setattr(fraud, "get_settings", Settings.from_env)
+
+        tracker = fraud._velocity_tracker_from_settings()
+
+        assert (tracker.maxsize, tracker.count_seconds, tracker.amount_seconds) == (500, 300.0, 3600.0)
+
+
+class TestVelocityRules:
+    RULES = [
+        RiskRule("burst", 0.3, "velocity", above=(("recent_charges", 4.0),)),
+        RiskRule("big-hour", 0.2, "big_hour", above=(("recent_amount", 1000.0),)),
+    ]
+
+    def test_rules_see_recent_charges(self, clock):
+        set_risk_rules(self.RULES)
+
+        flags = [assess_risk("fast-user", 300.0, "US", "card")["flags"] for _ in range(5)]
+
+        assert flags == [[], [], [], ["big_hour"], ["velocity", "big_hour"]]
+        clock.now = 300.0
+        assert assess_risk("fast-user", 1.0, "US", "card")["flags"] == ["big_hour"]
+        clock.now = 3600.0
+        assert assess_risk("fast-user", 1.0, "US", "card")["flags"] == []
+
+    def test_batch_counts_earlier_rows(self, clock):
+        set_risk_rules(self.RULES)
+        rows = [("fast-user" if n % 2 else f"user-{n}", 300.0, "US", "card") for n in range(10)]
+
+        batch = assess_risk_many(*zip(*rows), include_flags=True)
+
+        assert batch["flags"][:6] == [[], [], [], [], [], []]
+        assert batch["flags"][7] == ["big_hour"]
+        assert batch["flags"][9] == ["velocity", "big_hour"]
+
+        set_velocity_tracker(VelocityTracker(300.0, 3600.0, 60.0, 1000, clock=clock))
+        for row, score, flag_mask in zip(rows, batch["risk_score"].tolist(), batch["flag_mask"].tolist()):
+            result = assess_risk(*row)
+            assert (result["risk_score"], result["flag_mask"]) == (score, flag_mask)
+
+    def test_untracked_velocity_is_zero(self, clock):
+        set_risk_rules([RiskRule("first", 0.1, "first_charge", at_most=(("recent_charges", 0.0),))])
+        set_velocity_tracker(None)
+
+        assert assess_risk("fast-user", 300.0, "US", "card")["flags"] == ["first_charge"]